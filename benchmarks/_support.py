@@ -0,0 +1,272 @@
+# _support.py
+# Utilidades compartidas por los benchmarks: carga de la skill con claves de prueba,
+# certificados autofirmados y un servidor HTTP(S) local que imita a los proveedores (OpenAI-compatible
+# y Gemini, JSON o SSE, con latencia, errores y 429 configurables por proveedor).
+
+import collections
+import json
+import math
+import os
+import random
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda")
+
+
+def load_skill(**config_overrides):
+    """Importa lambda_function con una clave de prueba (y overrides de config) para que haya proveedores"""
+    if LAMBDA_DIR not in sys.path:
+        sys.path.insert(0, LAMBDA_DIR)
+    import config
+    config_overrides.setdefault("GROQ_API_KEY", "bench-key")
+    # Las métricas EMF irían a stdout y se mezclarían con los resultados
+    config_overrides.setdefault("METRICS_SINK", None)
+    # La cuota gratuita en /tmp se arrastraría de una corrida a otra
+    config_overrides.setdefault("FREE_QUOTA_BACKEND", "memory")
+    # Las cubetas locales (RATE_LIMIT_RPM) frenarían a los benchmarks que repiten un mismo proveedor;
+    # bench_rate_limits y bench_free_quota las activan en cada corrida
+    config_overrides.setdefault("RATE_LIMIT_ENABLED", False)
+    for name, value in config_overrides.items():
+        setattr(config, name, value)
+    import lambda_function
+    return lambda_function
+
+
+def redirect_provider(lf, provider_name, url):
+    """Apunta un proveedor de la skill al servidor local (los registros del catálogo son inmutables)"""
+    providers = lf.provider_manager.providers
+    providers[provider_name] = providers[provider_name]._replace(url=url)
+
+
+def alexa_envelope(request, attributes=None, new=False):
+    """Envelope mínimo de Alexa como el que recibe lambda_handler"""
+    return {
+        "version": "1.0",
+        "session": {"new": new, "sessionId": "bench-session", "application": {"applicationId": "bench-app"},
+                    "attributes": attributes or {}, "user": {"userId": "bench-user"}},
+        "context": {"System": {"application": {"applicationId": "bench-app"}, "user": {"userId": "bench-user"},
+                               "device": {"deviceId": "bench-device"}, "apiEndpoint": "https://api.amazonalexa.com"}},
+        "request": request,
+    }
+
+
+def launch_request():
+    return {"type": "LaunchRequest", "requestId": "bench-launch", "timestamp": "2026-01-01T00:00:00Z",
+            "locale": "es-MX"}
+
+
+def intent_request(name, slots=None):
+    """IntentRequest con slots {nombre: valor}"""
+    return {"type": "IntentRequest", "requestId": f"bench-{name}", "timestamp": "2026-01-01T00:00:00Z",
+            "locale": "es-MX",
+            "intent": {"name": name, "confirmationStatus": "NONE",
+                       "slots": {slot: {"name": slot, "value": value, "confirmationStatus": "NONE"}
+                                 for slot, value in (slots or {}).items()}}}
+
+
+def query_request(text):
+    return intent_request("GptQueryIntent", {"query": text})
+
+
+def self_signed_cert(directory):
+    """Genera un certificado autofirmado para localhost con openssl y devuelve (cert, key)"""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return cert, key
+
+
+class ChatCompletionHandler(BaseHTTPRequestHandler):
+    """
+    Responde cualquier POST como un proveedor: JSON de /chat/completions, de Gemini generateContent,
+    o SSE token a token si la petición pide "stream" (o es streamGenerateContent).
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    answer = "La fotosíntesis es el proceso por el cual las plantas convierten la luz en energía."
+    token_delay = 0.0
+
+    def do_POST(self):
+        self.respond(self.read_request())
+
+    def read_request(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+    def respond(self, request):
+        """Respuesta correcta en el protocolo que corresponda a la ruta y a la petición"""
+        gemini = ":generateContent" in self.path or ":streamGenerateContent" in self.path
+        if request.get("stream") or ":streamGenerateContent" in self.path:
+            self._send_stream(request, gemini)
+            return
+        # Conteo de tokens aproximado (4 caracteres por token), como el "usage" de los proveedores reales
+        prompt_tokens = len(json.dumps(request.get("messages") or request.get("contents") or [])) // 4
+        completion_tokens = len(self.answer) // 4
+        if gemini:
+            self._send_json({"candidates": [{"content": {"parts": [{"text": self.answer}]}}],
+                             "usageMetadata": {"promptTokenCount": prompt_tokens,
+                                               "candidatesTokenCount": completion_tokens}})
+        else:
+            self._send_json({"choices": [{"message": {"content": self.answer}}],
+                             "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}})
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, request, gemini):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in self.tokens(request):
+                if self.token_delay:
+                    time.sleep(self.token_delay)
+                if gemini:
+                    event = {"candidates": [{"content": {"parts": [{"text": token}]}}]}
+                else:
+                    event = {"choices": [{"delta": {"content": token}, "finish_reason": None}]}
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            if not gemini:
+                self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente cortó el stream antes de tiempo
+            pass
+
+    def tokens(self, request):
+        """Tokens a emitir (palabras con su espacio); las subclases pueden generar respuestas largas"""
+        words = self.answer.split(" ")
+        return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+class ProviderBehavior:
+    """
+    Comportamiento simulado de un proveedor: latencia log-normal (mediana en segundos y
+    dispersión sigma), probabilidad de error 5xx, probabilidad de 429 (con Retry-After) y
+    pausa entre tokens cuando responde en streaming.
+    """
+
+    def __init__(self, latency=0.05, sigma=0.3, error_rate=0.0, rate_limit_rate=0.0, retry_after=1, token_delay=0.0):
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.token_delay = token_delay
+
+    def sample_latency(self, rng):
+        return self.latency * math.exp(rng.gauss(0, self.sigma)) if self.latency else 0.0
+
+
+class FakeProviderHandler(ChatCompletionHandler):
+    """
+    Servidor de proveedores simulados con una ruta por proveedor (/<proveedor>/<ruta original>,
+    ver route_providers). Cada proveedor se comporta según behaviors[nombre] o, si no está,
+    según default. attempts cuenta las peticiones recibidas por cada pregunta (el último mensaje
+    del usuario), lo que da la profundidad de fallback de cada turno.
+    """
+    behaviors = {}
+    default = ProviderBehavior()
+    rng = random.Random(0)
+    attempts = collections.Counter()
+    lock = threading.Lock()
+
+    @classmethod
+    def reset(cls, behaviors=None, default=None, seed=0):
+        cls.behaviors = behaviors or {}
+        cls.default = default or ProviderBehavior()
+        cls.rng = random.Random(seed)
+        cls.attempts = collections.Counter()
+
+    def do_POST(self):
+        request = self.read_request()
+        behavior = self.behaviors.get(self.path.split("/")[1], self.default)
+        with self.lock:
+            roll = self.rng.random()
+            delay = behavior.sample_latency(self.rng)
+            self.attempts[last_user_text(request)] += 1
+        time.sleep(delay)
+        try:
+            if roll < behavior.rate_limit_rate:
+                self._send_json({"error": {"message": "Rate limit exceeded", "code": 429}}, status=429,
+                                headers={"Retry-After": str(behavior.retry_after)})
+            elif roll < behavior.rate_limit_rate + behavior.error_rate:
+                self._send_json({"error": {"message": "Service unavailable", "code": 503}}, status=503)
+            else:
+                self.token_delay = behavior.token_delay
+                self.respond(request)
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente abandonó la petición (timeout o cancelación)
+            pass
+
+
+def last_user_text(request):
+    """Texto del último mensaje del usuario en una petición OpenAI-compatible o Gemini"""
+    if request.get("messages"):
+        return request["messages"][-1].get("content", "")
+    if request.get("contents"):
+        return " ".join(part.get("text", "") for part in request["contents"][-1].get("parts", []))
+    return ""
+
+
+def route_providers(manager, base):
+    """Apunta todos los proveedores de un ProviderManager a base/<proveedor>/<ruta original>"""
+    for name in manager.available_providers:
+        provider = manager.providers[name]
+        manager.providers[name] = provider._replace(url=f"{base}/{name}{urlsplit(provider.url).path}")
+
+
+def start_server(handler_cls=ChatCompletionHandler, tls=False):
+    """Levanta el servidor en un hilo y devuelve (server, url_base, ruta_cert_o_None)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_cls)
+    server.daemon_threads = True
+    cert = None
+    if tls:
+        tmpdir = tempfile.mkdtemp(prefix="bench-tls-")
+        cert, key = self_signed_cert(tmpdir)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scheme = "https" if tls else "http"
+    host = "localhost" if tls else "127.0.0.1"
+    return server, f"{scheme}://{host}:{server.server_address[1]}", cert
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(label, samples_ms):
+    """Imprime una línea con media, p50, p95 y p99 en milisegundos"""
+    print(f"{label:<32} n={len(samples_ms):<5} media={statistics.mean(samples_ms):8.2f}ms "
+          f"p50={percentile(samples_ms, 50):8.2f}ms p95={percentile(samples_ms, 95):8.2f}ms "
+          f"p99={percentile(samples_ms, 99):8.2f}ms")
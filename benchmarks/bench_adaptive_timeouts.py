@@ -0,0 +1,104 @@
+# bench_adaptive_timeouts.py
+# Timeouts por proveedor aprendidos de la latencia observada (lambda/adaptive_timeouts.py) frente
+# al timeout fijo del catálogo. Los proveedores simulados responden rápido pero una fracción de
+# las peticiones se queda colgada durante STALL segundos enviando keep-alives, como OpenRouter:
+# sin streaming, espacios antes del JSON; en streaming, comentarios ": PROCESSING" antes del primer
+# token. Como los bytes siguen llegando, el timeout por lectura del cliente no salta nunca: solo
+# los corta el límite total (o del primer token). Con el timeout fijo cada petición colgada se
+# come el turno; con el aprendido se corta al p99 × factor y se pasa a otro proveedor. Cada
+# configuración se calienta con unas sesiones que no se miden, para que el contenedor tenga
+# latencias aprendidas.
+#
+# Uso: python benchmarks/bench_adaptive_timeouts.py [sesiones] [turnos por sesión] [concurrencia] [tasa de cuelgues]
+
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _support import FakeProviderHandler, ProviderBehavior, last_user_text, load_skill, route_providers, start_server
+from bench_end_to_end import KEYS, replay_session, report
+
+STALL = 10.0
+
+
+class StallingHandler(FakeProviderHandler):
+    """FakeProviderHandler en el que una fracción de las peticiones se cuelga antes de responder"""
+    stall_rate = 0.0
+
+    def do_POST(self):
+        with self.lock:
+            stalled = self.rng.random() < self.stall_rate
+        if not stalled:
+            super().do_POST()
+            return
+        request = self.read_request()
+        with self.lock:
+            self.attempts[last_user_text(request)] += 1
+        stream = request.get("stream") or ":streamGenerateContent" in self.path
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream" if stream else "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for _ in range(int(STALL / 0.5)):
+                self._write_chunk(b": PROCESSING\n\n" if stream else b" ")
+                time.sleep(0.5)
+            if not stream:
+                self._write_chunk(json.dumps({"choices": [{"message": {"content": self.answer}}]}).encode())
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente abandonó la petición por timeout
+            pass
+
+
+def run(lf, base, adaptive, mode, sessions, turns, concurrency, warmup):
+    manager = lf.ProviderManager()
+    route_providers(manager, base)
+    manager.timeouts.enabled = adaptive
+    lf.provider_manager = manager
+    lf.response_generator = lf.create_response_generator(manager)
+    lf.response_generator.answer_cache = None
+    lf.FALLBACK_MODE = mode
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        list(callers.map(lambda s: replay_session(lf, s, turns), range(1000, 1000 + warmup)))
+        FakeProviderHandler.attempts.clear()
+        start = time.perf_counter()
+        results = [r for session in callers.map(lambda s: replay_session(lf, s, turns), range(sessions))
+                   for r in session]
+    return manager, results, time.perf_counter() - start
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    stall_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.05
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(StallingHandler)
+    lf = load_skill(STREAMING_PROVIDER_PREFIXES=["chutes", "gemini"], **KEYS)
+    from provider_catalog import DEFAULT_TIMEOUT
+    print(f"{sessions} sesiones de {turns} turnos, {concurrency} concurrentes, "
+          f"{len(lf.provider_manager.available_providers)} proveedores, {stall_rate:.0%} de peticiones colgadas "
+          f"{STALL:.0f}s (timeout del catálogo: {DEFAULT_TIMEOUT}s)")
+    for mode in ("sequential", "hedged"):
+        for adaptive in (False, True):
+            # reset() en FakeProviderHandler: report() lee FakeProviderHandler.attempts
+            FakeProviderHandler.reset(default=ProviderBehavior(latency=0.25, sigma=0.4, token_delay=0.002))
+            StallingHandler.stall_rate = stall_rate
+            manager, results, elapsed = run(lf, base, adaptive, mode, sessions, turns, concurrency, warmup=sessions)
+            report(f"{mode} / {'aprendido' if adaptive else 'fijo'}", results, elapsed)
+            if adaptive:
+                timeouts = manager.timeouts
+                providers = [manager.providers[name] for name in manager.available_providers]
+                stream = lf.response_generator._should_stream
+                learned = sum(1 for spec in providers if timeouts.learned(spec, stream(spec.name)))
+                classes = {name: state for name, state in timeouts.snapshot().items() if name in ("standard", "reasoning")}
+                print(f"{'':<32} proveedores con timeout aprendido: {learned}/{len(providers)}; "
+                      f"por clase: {json.dumps(classes)}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench_answer_cache.py
+# Clave de la caché de respuestas (answer_cache.normalize_query):
+# 1) Casos de regresión: preguntas que deben compartir clave y preguntas que no, porque la palabra
+#    que las distingue cambia el sentido ("con" / "sin", "té", "bueno").
+# 2) Cobertura sobre el corpus de paráfrasis (data/paraphrases_es.json): paráfrasis que caen en la
+#    misma clave que la primera pregunta de su grupo y preguntas distintas que colisionan con otra.
+# 3) Tiempo de normalize_query por pregunta.
+#
+# Uso: python benchmarks/bench_answer_cache.py [repeticiones]
+
+import json
+import os
+import sys
+import time
+
+from _support import LAMBDA_DIR, summarize
+
+sys.path.insert(0, LAMBDA_DIR)
+from answer_cache import normalize_query  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "paraphrases_es.json")
+
+SAME_KEY = [
+    ("¿Quién descubrió América?", "alexa quien descubrio america"),
+    ("¿Qué es la fotosíntesis?", "dime qué es la fotosíntesis por favor"),
+]
+DIFFERENT_KEY = [
+    ("¿Cómo preparar café con azúcar?", "¿Cómo preparar café sin azúcar?"),
+    ("¿Qué es el té?", "¿Qué es?"),
+    ("¿Qué es el té verde?", "¿Qué es el verde?"),
+    ("¿Es bueno el café?", "¿Es el café?"),
+]
+
+
+def check_regressions():
+    for first, second in SAME_KEY:
+        assert normalize_query(first) == normalize_query(second), (first, second)
+    for first, second in DIFFERENT_KEY:
+        assert normalize_query(first) != normalize_query(second), (first, second, normalize_query(first))
+    print(f"Casos de regresión: {len(SAME_KEY)} con la misma clave y {len(DIFFERENT_KEY)} con claves distintas, OK")
+
+
+def coverage():
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+    groups, negatives = corpus["groups"], corpus["negatives"]
+    keys = {normalize_query(group[0]): group_id for group_id, group in enumerate(groups)}
+    paraphrases = [(group_id, p) for group_id, group in enumerate(groups) for p in group[1:]]
+    hits = sum(1 for group_id, p in paraphrases if keys.get(normalize_query(p)) == group_id)
+    collisions = sum(1 for q in negatives if normalize_query(q) in keys)
+    print(f"Paráfrasis con la clave de su grupo: {hits}/{len(paraphrases)}, "
+          f"preguntas distintas que colisionan: {collisions}/{len(negatives)}")
+    return [group[0] for group in groups] + [p for _, p in paraphrases] + negatives
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    check_regressions()
+    questions = coverage()
+    samples = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        for question in questions:
+            normalize_query(question)
+        samples.append((time.perf_counter() - start) * 1000)
+    summarize(f"normalize_query x{len(questions)}", samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bench_async_engine.py
+# Rendimiento del motor síncrono (requests + hilos) frente al motor asyncio (httpx + un event loop)
+# en modo hedged, contra un servidor local donde un tercio de los proveedores tarda SLOW segundos
+# y el resto FAST. Con varios turnos concurrentes, el motor síncrono deja hilos del pool ocupados
+# con las peticiones perdedoras hasta que terminan; el asyncio las cancela en vuelo.
+# Se reportan turnos por segundo y la latencia por turno para 1 y N turnos concurrentes.
+#
+# Uso: python benchmarks/bench_async_engine.py [turnos] [concurrencia]
+
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _support import ChatCompletionHandler, load_skill, route_providers, start_server, summarize
+
+SLOW = 1.0
+FAST = 0.05
+HEDGE_DELAY = 0.1
+
+
+class LatencyHandler(ChatCompletionHandler):
+    """
+    Cada proveedor tiene su propia ruta; los de la lista lenta tardan SLOW segundos en contestar.
+    Cuenta las respuestas que el cliente ya no quiso leer (conexión cerrada al cancelar).
+    """
+    slow = set()
+    aborted = 0
+
+    def do_POST(self):
+        provider_name = self.path.split("/")[1]
+        time.sleep(SLOW if provider_name in self.slow else FAST)
+        try:
+            super().do_POST()
+        except (BrokenPipeError, ConnectionResetError):
+            LatencyHandler.aborted += 1
+
+
+def provider_manager(lf, base):
+    """ProviderManager nuevo (salud y latencias sin historial) con todos los proveedores en el servidor local"""
+    manager = lf.ProviderManager()
+    route_providers(manager, base)
+    return manager
+
+
+def run(generator, turns, concurrency):
+    """Lanza turnos sin contexto desde varios hilos; devuelve (latencias en ms, segundos totales, errores)"""
+    errors = []
+    lock = threading.Lock()
+
+    def turn(i):
+        session_attr = {"chat_history": [], "current_provider": None, "failed_providers": []}
+        start = time.perf_counter()
+        _, error_type = generator.generate_response(session_attr, f"Pregunta de prueba número {i}")
+        if error_type is not None:
+            with lock:
+                errors.append(error_type)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        samples = list(callers.map(turn, range(turns)))
+    return samples, time.perf_counter() - start, len(errors)
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(LatencyHandler)
+    lf = load_skill(OPENROUTER_API_KEY="bench-key", CEREBRAS_API_KEY="bench-key")
+    lf.FALLBACK_MODE = "hedged"
+    lf.HEDGE_DELAY = HEDGE_DELAY
+    LatencyHandler.slow = set(lf.provider_manager.available_providers[::3])
+    print(f"{len(LatencyHandler.slow)} de {len(lf.provider_manager.available_providers)} proveedores tardan {SLOW}s, "
+          f"el resto {FAST}s; HEDGE_DELAY={HEDGE_DELAY}s")
+
+    for workers in sorted({1, concurrency}):
+        for label, cls in (("sync", lf.ResponseGenerator), ("asyncio", lf.AsyncResponseGenerator)):
+            generator = cls(provider_manager(lf, base))
+            run(generator, 10, workers)  # Calentar conexiones
+            LatencyHandler.aborted = 0
+            samples, elapsed, errors = run(generator, turns, workers)
+            summarize(f"{label} x{workers}", samples)
+            print(f"{'':<32} {turns / elapsed:7.1f} turnos/s, errores={errors}, "
+                  f"peticiones perdedoras abortadas={LatencyHandler.aborted}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
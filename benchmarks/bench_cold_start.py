@@ -0,0 +1,108 @@
+# bench_cold_start.py
+# Arranque en frío de la skill, cada muestra en un proceso nuevo (como un contenedor de Lambda):
+#   - init: importar lambda_function (lo que Lambda hace antes de la primera invocación)
+#   - launch: la primera invocación (LaunchRequest) a través de lambda_handler
+#   - requests: importar requests/urllib3 al llegar la primera pregunta (ya pagado en "eager")
+#   - RSS máximo del proceso tras el LaunchRequest y tras importar requests
+# Se comparan STARTUP_MODE "eager" y "lazy", copiando el código de lambda/ a un directorio
+# temporal sin __pycache__ (como queda al desplegar un zip sin precompilar) y con los .pyc
+# generados por compileall. Al final se listan las importaciones más costosas según -X importtime.
+#
+# Uso: python benchmarks/bench_cold_start.py [procesos por variante]
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from _support import LAMBDA_DIR, alexa_envelope, launch_request
+
+CHILD = r"""
+import json, resource, sys, time
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import config
+config.GROQ_API_KEY = "bench-key"
+config.STARTUP_MODE = sys.argv[2]
+import lambda_function
+initialized = time.perf_counter()
+lambda_function.lambda_handler(json.loads(sys.argv[3]), None)
+launched = time.perf_counter()
+rss_launch = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+import http_transport
+http_transport.load_requests()
+loaded = time.perf_counter()
+print(json.dumps({
+    "init": (initialized - started) * 1000,
+    "launch": (launched - initialized) * 1000,
+    "requests": (loaded - launched) * 1000,
+    "rss_launch": rss_launch / 1024,
+    "rss_requests": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def copy_lambda(directory, precompile):
+    code_dir = os.path.join(directory, "precompilado" if precompile else "fuentes")
+    shutil.copytree(LAMBDA_DIR, code_dir, ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+    if precompile:
+        subprocess.run([sys.executable, "-m", "compileall", "-q", code_dir], check=True)
+    return code_dir
+
+
+def run_child(code_dir, mode, envelope, importtime=False):
+    # -B: no escribir .pyc, igual que en /var/task (solo lectura)
+    args = [sys.executable, "-B"] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD, code_dir, mode, envelope]
+    result = subprocess.run(args, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def top_imports(stderr, limit=8):
+    """Importaciones de primer nivel con mayor tiempo acumulado según -X importtime"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            rows.append((int(cumulative) / 1000.0, name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    envelope = json.dumps(alexa_envelope(launch_request(), new=True))
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-cold-") as directory:
+        code_dirs = {"sin .pyc": copy_lambda(directory, False), "con .pyc": copy_lambda(directory, True)}
+        for pyc, code_dir in code_dirs.items():
+            for mode in ("eager", "lazy"):
+                samples = [run_child(code_dir, mode, envelope)[0] for _ in range(runs)]
+                results[(mode, pyc)] = {k: statistics.median(s[k] for s in samples) for k in samples[0]}
+        importtimes = {mode: top_imports(run_child(code_dirs["con .pyc"], mode, envelope, importtime=True)[1])
+                       for mode in ("eager", "lazy")}
+
+    print(f"Medianas de {runs} procesos por variante (ms y MiB)")
+    print(f"{'variante':<20} {'init':>8} {'launch':>8} {'init+launch':>12} {'requests':>9} "
+          f"{'RSS launch':>11} {'RSS requests':>13}")
+    for (mode, pyc), r in results.items():
+        print(f"{mode + ', ' + pyc:<20} {r['init']:8.1f} {r['launch']:8.1f} {r['init'] + r['launch']:12.1f} "
+              f"{r['requests']:9.1f} {r['rss_launch']:11.1f} {r['rss_requests']:13.1f}")
+
+    baseline = results[("eager", "sin .pyc")]
+    best = results[("lazy", "con .pyc")]
+    print(f"Ahorro hasta responder al LaunchRequest (lazy con .pyc frente a eager sin .pyc): "
+          f"{baseline['init'] + baseline['launch'] - best['init'] - best['launch']:.1f}ms, "
+          f"RSS {baseline['rss_launch'] - best['rss_launch']:.1f} MiB")
+
+    for mode, rows in importtimes.items():
+        print(f"Importaciones de primer nivel más costosas ({mode}, con .pyc):")
+        for cumulative, name in rows:
+            print(f"  {cumulative:8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
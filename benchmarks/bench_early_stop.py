@@ -0,0 +1,114 @@
+# bench_early_stop.py
+# Latencia frente a completitud al cortar el stream en el primer fin de oración tras
+# SPOKEN_TARGET_WORDS palabras, contra un servidor local que emite tokens a ritmo fijo.
+# El servidor simula un modelo de razonamiento: primero un bloque <think> y luego una
+# respuesta larga (más de lo que Alexa debería leer). Mide también el coste del criterio de corte
+# por stream (incremental frente a recalcular sobre todo el texto en cada trozo) y comprueba que
+# ambos cortan en el mismo trozo.
+#
+# Uso: python benchmarks/bench_early_stop.py [turnos] [ms_por_token]
+
+import logging
+import random
+import re
+import sys
+import time
+
+from _support import ChatCompletionHandler, load_skill, redirect_provider, start_server, summarize
+
+PROVIDER = "chutes_deepseek_r1"
+SENTENCES = [
+    "La fotosíntesis es el proceso mediante el cual las plantas transforman la luz solar en energía química.",
+    "Ocurre principalmente en las hojas, dentro de unos organelos llamados cloroplastos.",
+    "Allí la clorofila captura la luz y la usa para separar las moléculas de agua.",
+    "El oxígeno que respiramos se libera precisamente como resultado de ese proceso.",
+    "Con el dióxido de carbono del aire, la planta fabrica glucosa que le sirve de alimento.",
+    "En Colombia, los cafetales y los bosques andinos son ejemplos muy claros de su importancia.",
+]
+
+
+class LongAnswerHandler(ChatCompletionHandler):
+    think_words = 120
+    answer_words = 320
+
+    def tokens(self, request):
+        rng = random.Random(7)
+        words = ["<think>"] + ["razonando"] * self.think_words + ["</think>"]
+        while len(words) < self.think_words + self.answer_words:
+            words.extend(rng.choice(SENTENCES).split(" "))
+        return [w + " " for w in words]
+
+
+def full_answer_words():
+    tokens = LongAnswerHandler.tokens(LongAnswerHandler, {})
+    return len(re.sub(r"<think>[\s\S]*?</think>", "", "".join(tokens)).split())
+
+
+def check_cost(lf, tokens, repetitions=20):
+    """Tiempo del criterio de corte en un stream completo: incremental frente a recalcular todo"""
+    from generation_budget import SpokenProgress, spoken_cutoff
+    from streaming import SpeakableFilter, speakable_text
+
+    def incremental():
+        speakable, progress = SpeakableFilter(), SpokenProgress(lf.SPOKEN_TARGET_WORDS)
+        for i, token in enumerate(tokens):
+            if progress.feed(speakable.feed(token)):
+                return i
+        return None
+
+    def full():
+        pieces = []
+        for i, token in enumerate(tokens):
+            pieces.append(token)
+            if spoken_cutoff(speakable_text("".join(pieces)), lf.SPOKEN_TARGET_WORDS) is not None:
+                return i
+        return None
+
+    assert incremental() == full()
+    timings = {}
+    for label, check in (("incremental", incremental), ("recalculando todo", full)):
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            check()
+        timings[label] = (time.perf_counter() - start) / repetitions * 1000
+    return timings
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    LongAnswerHandler.token_delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 4) / 1000.0
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(LongAnswerHandler)
+    lf = load_skill(CHUTES_API_KEY="bench-key")
+    redirect_provider(lf, PROVIDER, f"{base}/v1/chat/completions")
+    lf.STREAM_MAX_CHARS = 10 ** 9
+    total_words = full_answer_words()
+
+    for target in (None, 180, 150, 120, 60):
+        lf.SPOKEN_TARGET_WORDS = target or 10 ** 9
+        samples, words, complete = [], [], 0
+        for _ in range(turns):
+            start = time.perf_counter()
+            response, error_type = lf.response_generator._try_provider(PROVIDER, [], "¿Qué es la fotosíntesis?")
+            samples.append((time.perf_counter() - start) * 1000)
+            text = lf.remove_think_tags(response)
+            words.append(len(text.split()))
+            complete += text.rstrip().endswith((".", "!", "?"))
+        summarize(f"objetivo={target or 'sin corte'} palabras", samples)
+        print(f"{'':<32} palabras={sum(words) / len(words):.0f}/{total_words} "
+              f"termina_en_oración={complete}/{turns}")
+
+    # Coste del criterio de corte por stream, sin red: con el objetivo por defecto y sin corte
+    # (el peor caso: se revisa cada token de una respuesta de 2000)
+    long_tokens = LongAnswerHandler.tokens(LongAnswerHandler, {})
+    long_tokens += [w + " " for w in " ".join(SENTENCES * 40).split(" ")][:2000 - len(long_tokens)]
+    for target in (150, None):
+        lf.SPOKEN_TARGET_WORDS = target or 10 ** 9
+        timings = check_cost(lf, long_tokens)
+        print(f"criterio de corte, objetivo={target or 'sin corte'}, {len(long_tokens)} tokens: "
+              + ", ".join(f"{label} {ms:.2f}ms" for label, ms in timings.items()))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# bench_end_to_end.py
+# Latencia de extremo a extremo por turno: sesiones sintéticas de Alexa (LaunchRequest y varias
+# preguntas, arrastrando los atributos de sesión) a través de lambda_handler, contra un servidor
+# local que simula a todos los proveedores (OpenAI-compatible y Gemini, JSON y SSE) con latencias
+# log-normales, errores 5xx y 429 configurables por proveedor. Para cada escenario y modo de
+# fallback se reportan p50/p95/p99 por turno, turnos por segundo, turnos con respuesta y la
+# distribución de la profundidad de fallback (peticiones a proveedores por turno).
+#
+# Uso: python benchmarks/bench_end_to_end.py [sesiones] [turnos por sesión] [concurrencia] [escenario]
+
+import collections
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _support import (FakeProviderHandler, ProviderBehavior, alexa_envelope, launch_request, load_skill, query_request,
+                      route_providers, start_server, summarize)
+
+KEYS = {"OPENROUTER_API_KEY": "bench-key", "CEREBRAS_API_KEY": "bench-key", "GROQ_API_KEY": "bench-key",
+        "GEMINI_API_KEY": "bench-key", "CHUTES_API_KEY": "bench-key"}
+TOPICS = ["la fotosíntesis", "el café de Caldas", "los agujeros negros", "el río Magdalena", "la vacuna",
+          "García Márquez", "el sistema solar", "la independencia"]
+
+
+def prefixed(providers, prefixes, behavior):
+    return {name: behavior for name in providers if name.startswith(prefixes)}
+
+
+def scenarios(providers):
+    """Escenario -> (comportamiento por defecto, comportamientos por proveedor)"""
+    healthy = ProviderBehavior(latency=0.25, sigma=0.4, token_delay=0.002)
+    return {
+        "sano": (healthy, {}),
+        "openrouter caído": (healthy, prefixed(providers, ("openrouter",), ProviderBehavior(latency=0.05, error_rate=1.0))),
+        "cola lenta": (healthy, {**prefixed(providers, ("groq",), ProviderBehavior(latency=2.0, sigma=0.5)),
+                                 **prefixed(providers, ("cerebras",), ProviderBehavior(latency=0.2, error_rate=0.1))}),
+        "429": (healthy, prefixed(providers, ("groq", "cerebras"), ProviderBehavior(latency=0.1, rate_limit_rate=0.5))),
+    }
+
+
+def replay_session(lf, session, turns):
+    """Devuelve [(ms, pregunta, ssml)] de cada pregunta de la sesión"""
+    attributes = lf.lambda_handler(alexa_envelope(launch_request(), new=True), None).get("sessionAttributes", {})
+    results = []
+    for turn in range(turns):
+        question = f"Cuéntame algo sobre {TOPICS[(session + turn) % len(TOPICS)]} (sesión {session}, turno {turn})"
+        start = time.perf_counter()
+        result = lf.lambda_handler(alexa_envelope(query_request(question), attributes), None)
+        results.append(((time.perf_counter() - start) * 1000, question, result["response"]["outputSpeech"]["ssml"]))
+        attributes = result.get("sessionAttributes", {})
+    return results
+
+
+def run(lf, base, mode, sessions, turns, concurrency):
+    # Salud, latencias y generador nuevos en cada corrida para que no se arrastre lo aprendido
+    manager = lf.ProviderManager()
+    route_providers(manager, base)
+    lf.provider_manager = manager
+    lf.response_generator = lf.create_response_generator(manager)
+    lf.FALLBACK_MODE = mode
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        results = [r for session in callers.map(lambda s: replay_session(lf, s, turns), range(sessions))
+                   for r in session]
+    return results, time.perf_counter() - start
+
+
+def report(label, results, elapsed):
+    samples = [ms for ms, _, _ in results]
+    answered = sum(1 for _, _, ssml in results if FakeProviderHandler.answer in ssml)
+    depths = collections.Counter(min(FakeProviderHandler.attempts[question], 4) for _, question, _ in results)
+    summarize(label, samples)
+    print(f"{'':<32} {len(results) / elapsed:6.1f} turnos/s, con respuesta {answered}/{len(results)}, "
+          f"profundidad de fallback: " + " ".join(f"{d if d < 4 else '4+'}={depths[d]}" for d in sorted(depths)))
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    only = sys.argv[4] if len(sys.argv) > 4 else None
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(FakeProviderHandler)
+    lf = load_skill(**KEYS)
+    print(f"{sessions} sesiones de {turns} turnos, {concurrency} sesiones concurrentes, "
+          f"{len(lf.provider_manager.available_providers)} proveedores")
+    for name, (default, behaviors) in scenarios(lf.provider_manager.available_providers).items():
+        if only and name != only:
+            continue
+        for mode in ("sequential", "hedged"):
+            FakeProviderHandler.reset(behaviors, default)
+            results, elapsed = run(lf, base, mode, sessions, turns, concurrency)
+            report(f"{name} / {mode}", results, elapsed)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# bench_failure_domains.py
+# Fallback con dominios de fallo (FALLBACK_AVOID_FAILURE_DOMAINS) frente al fallback que solo
+# excluye los nombres que fallaron. Con OpenRouter caído (unos 25 proveedores en el mismo host) o
+# con un modelo caído en todos los hosts que lo sirven, se mide cuántas peticiones a proveedores
+# se gastan por turno antes de una respuesta útil, los turnos con respuesta y la latencia.
+# Reutiliza las sesiones sintéticas y el servidor simulado de bench_end_to_end.py.
+#
+# Uso: python benchmarks/bench_failure_domains.py [sesiones] [turnos por sesión] [concurrencia]
+
+import logging
+import sys
+
+from _support import FakeProviderHandler, ProviderBehavior, load_skill, start_server
+from bench_end_to_end import KEYS, prefixed, report, run
+
+
+def scenarios(lf):
+    providers = lf.provider_manager.available_providers
+    down = ProviderBehavior(latency=0.05, error_rate=1.0)
+    deepseek = [name for model in ("deepseek-r1", "deepseek-r1-0528", "deepseek-v3-0324")
+                for name in lf.provider_manager.providers_of_model(model) if name in providers]
+    return {
+        "openrouter caído": prefixed(providers, ("openrouter",), down),
+        "openrouter y deepseek caídos": {**prefixed(providers, ("openrouter",), down),
+                                         **{name: down for name in deepseek}},
+    }
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(FakeProviderHandler)
+    lf = load_skill(**KEYS)
+    healthy = ProviderBehavior(latency=0.25, sigma=0.4, token_delay=0.002)
+    print(f"{sessions} sesiones de {turns} turnos, {concurrency} sesiones concurrentes, "
+          f"{len(lf.provider_manager.available_providers)} proveedores")
+    for name, behaviors in scenarios(lf).items():
+        for mode in ("sequential", "hedged"):
+            for aware in (False, True):
+                lf.FALLBACK_AVOID_FAILURE_DOMAINS = aware
+                FakeProviderHandler.reset(behaviors, healthy)
+                results, elapsed = run(lf, base, mode, sessions, turns, concurrency)
+                report(f"{name} / {mode} / {'dominios' if aware else 'nombres'}", results, elapsed)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
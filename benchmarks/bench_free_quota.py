@@ -0,0 +1,164 @@
+# bench_free_quota.py
+# Cuota diaria de los modelos gratuitos (lambda/free_quota.py). El servidor simulado aplica a los
+# modelos ":free" de OpenRouter un tope diario por key y, al pasarlo, responde como OpenRouter
+# (429 "free-models-per-day" con X-RateLimit-Reset a medianoche UTC). Se comparan: sin control,
+# solo con el planificador de límites de uso (cuyo enfriamiento tiene un tope de una hora), con
+# la cuota aprendida del primer 429 y con el tope configurado. Cada configuración se repite "una
+# hora después" (enfriamientos vencidos, mismo día) y al final se simula el cambio de día para
+# comprobar que los modelos gratuitos vuelven a elegirse. Antes se comprueba que un fallo al
+# escribir los contadores (p. ej. throttling de DynamoDB) no pierde peticiones.
+#
+# Uso: python benchmarks/bench_free_quota.py [sesiones] [turnos por sesión] [tope diario]
+
+import datetime
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _support import (FakeProviderHandler, ProviderBehavior, last_user_text, load_skill, route_providers, start_server,
+                      summarize)
+from bench_end_to_end import replay_session
+
+KEYS = {"OPENROUTER_API_KEY": "bench-key", "GROQ_API_KEY": "bench-key"}
+
+
+class DailyQuotaHandler(FakeProviderHandler):
+    """FakeProviderHandler con un tope diario de peticiones a modelos gratuitos por key"""
+    free = set()
+    daily_limit = 30
+    used = 0
+    rejected = 0
+    free_served = 0
+    quota_lock = threading.Lock()
+
+    @classmethod
+    def reset_quota(cls, free, daily_limit):
+        cls.free, cls.daily_limit = free, daily_limit
+        cls.used, cls.rejected, cls.free_served = 0, 0, 0
+
+    def do_POST(self):
+        if self.path.split("/")[1] not in self.free:
+            super().do_POST()
+            return
+        with self.quota_lock:
+            DailyQuotaHandler.used += 1
+            over = self.used > self.daily_limit
+            if over:
+                DailyQuotaHandler.rejected += 1
+            else:
+                DailyQuotaHandler.free_served += 1
+        if not over:
+            super().do_POST()
+            return
+        request = self.read_request()
+        with self.lock:
+            self.attempts[last_user_text(request)] += 1
+        midnight = datetime.datetime.combine(datetime.datetime.now(datetime.timezone.utc).date()
+                                             + datetime.timedelta(days=1), datetime.time(),
+                                             tzinfo=datetime.timezone.utc)
+        headers = {"X-RateLimit-Limit": str(self.daily_limit), "X-RateLimit-Remaining": "0",
+                   "X-RateLimit-Reset": str(int(midnight.timestamp() * 1000))}
+        self._send_json({"error": {"message": "Rate limit exceeded: free-models-per-day. Add 10 credits to unlock "
+                                              "1000 free model requests per day", "code": 429,
+                                   "metadata": {"headers": headers}}}, status=429, headers=headers)
+
+
+def new_manager(lf, base, rate_limits, quota, per_key, daily_limit):
+    manager = lf.ProviderManager()
+    route_providers(manager, base)
+    manager.rate_limits.enabled = rate_limits
+    manager.free_quota.enabled = quota
+    manager.free_quota.per_key = per_key
+    DailyQuotaHandler.reset_quota({n for n in manager.available_providers if manager.providers[n].free},
+                                  daily_limit)
+    return manager
+
+
+def run(lf, manager, label, sessions, turns):
+    lf.provider_manager = manager
+    lf.response_generator = lf.create_response_generator(manager)
+    lf.response_generator.answer_cache = None
+    before = (DailyQuotaHandler.free_served, DailyQuotaHandler.rejected)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as callers:
+        results = [r for session in callers.map(lambda s: replay_session(lf, s, turns), range(sessions))
+                   for r in session]
+    elapsed = time.perf_counter() - start
+    answered = sum(1 for _, _, ssml in results if FakeProviderHandler.answer in ssml)
+    summarize(label, [ms for ms, _, _ in results])
+    print(f"{'':<32} {len(results) / elapsed:6.1f} turnos/s, con respuesta {answered}/{len(results)}, "
+          f"gratuitas servidas {DailyQuotaHandler.free_served - before[0]}, "
+          f"429 de cuota {DailyQuotaHandler.rejected - before[1]}")
+
+
+class FlakyStore:
+    """StateStore en memoria cuyo put falla las primeras "failures" veces"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def put(self, key, value):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("ProvisionedThroughputExceededException")
+        self.data[key] = json.loads(json.dumps(value))
+
+
+def check_failed_writes(lf, free_quota):
+    """Las peticiones contadas mientras el store falla se publican en la siguiente escritura correcta"""
+    spec = next(lf.provider_manager.providers[n] for n in lf.provider_manager.available_providers
+                if lf.provider_manager.providers[n].free)
+    store = FlakyStore(failures=2)
+    tracker = free_quota.FreeQuotaTracker(store=store, enabled=True, per_key={"openrouter": 50})
+    for _ in range(3):
+        tracker.record_request(spec)
+        tracker._sync(force=True)
+    published = store.data[free_quota.STATE_KEY]["counts"]["openrouter"]
+    assert published == 3, published
+    assert tracker.snapshot()["counters"]["openrouter"]["used"] == 3
+    print("Escrituras fallidas de los contadores: 2 de 3, peticiones publicadas 3/3, OK")
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    daily_limit = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(DailyQuotaHandler)
+    DailyQuotaHandler.reset(default=ProviderBehavior(latency=0.2, sigma=0.3))
+    lf = load_skill(**KEYS)
+    import free_quota  # después de load_skill, para que use FREE_QUOTA_BACKEND = "memory"
+    check_failed_writes(lf, free_quota)
+    providers = lf.provider_manager.available_providers
+    free = sum(1 for n in providers if lf.provider_manager.providers[n].free)
+    print(f"{sessions} sesiones de {turns} turnos, {len(providers)} proveedores ({free} gratuitos), "
+          f"tope diario de {daily_limit} peticiones gratuitas por key")
+    configurations = [("sin control", False, False, {}), ("límites de uso", True, False, {}),
+                      ("cuota aprendida", True, True, {}), ("tope configurado", True, True, {"openrouter": daily_limit})]
+    for label, rate_limits, quota, per_key in configurations:
+        manager = new_manager(lf, base, rate_limits, quota, per_key, daily_limit)
+        run(lf, manager, label, sessions, turns)
+        # Una hora después: vencen los enfriamientos de los límites de uso, la cuota sigue agotada
+        manager.rate_limits._cooldowns.clear()
+        run(lf, manager, f"{label} (+1h)", sessions, turns)
+    print("Contadores: " + json.dumps(manager.free_quota.snapshot()["counters"]["openrouter"]))
+
+    # Cambio de día: el servidor reinicia su cuota y la skill deja de considerar agotada la key
+    real_day = free_quota.quota_day
+    free_quota.quota_day = lambda now=None: "2099-01-01"
+    DailyQuotaHandler.used = 0
+    manager.rate_limits._cooldowns.clear()
+    run(lf, manager, "tras el reinicio diario", max(1, sessions // 4), turns)
+    free_quota.quota_day = real_day
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# bench_hedging.py
+# Compara la latencia por turno del fallback secuencial frente al modo hedged, con proveedores
+# simulados: la mayoría responde rápido, algunos se cuelgan hasta el timeout y otros fallan.
+#
+# Uso: python benchmarks/bench_hedging.py [turnos] [escala]
+# Los tiempos simulados se multiplican por "escala" (0.02 por defecto) para que el benchmark
+# tarde segundos; los resultados se reportan de vuelta en la escala real.
+
+import logging
+import random
+import sys
+import time
+
+from _support import load_skill, summarize
+
+TIMEOUT = 7.0
+
+
+def simulated_provider(scale, rng):
+    """Devuelve un _try_provider falso: 75% rápido, 15% colgado hasta el timeout, 10% falla rápido"""
+    def try_provider(provider_name, chat_history, new_question, deadline=None, summary=None, custom_data=None):
+        roll = rng.random()
+        if roll < 0.75:
+            time.sleep(rng.uniform(0.4, 1.5) * scale)
+            return "Respuesta simulada.", None
+        if roll < 0.90:
+            time.sleep(TIMEOUT * scale)
+            return f"Error: Tiempo de espera agotado para {provider_name}", "connection"
+        time.sleep(0.2 * scale)
+        return f"Error: Problema de conexión con {provider_name}", "connection"
+    return try_provider
+
+
+def run(lf, mode, turns, scale, with_deadline):
+    lf.FALLBACK_MODE = mode
+    lf.HEDGE_DELAY = 1.5 * scale
+    lf.response_generator._try_provider = simulated_provider(scale, random.Random(42))
+    # Siempre la misma pregunta: sin caché de respuestas para que cada turno llegue a los proveedores
+    lf.response_generator.answer_cache = None
+    samples = []
+    for _ in range(turns):
+        session_attr = {"chat_history": [], "current_provider": None, "failed_providers": []}
+        deadline = lf.TurnDeadline(budget=7.0 * scale, reserve=0.5 * scale, min_attempt=1.0 * scale) if with_deadline else None
+        start = time.perf_counter()
+        lf.response_generator.generate_response(session_attr, "¿Qué es la fotosíntesis?", deadline)
+        samples.append((time.perf_counter() - start) / scale * 1000)
+    return samples
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    logging.disable(logging.CRITICAL)
+    lf = load_skill(OPENROUTER_API_KEY="bench-key", CEREBRAS_API_KEY="bench-key")
+    for with_deadline in (False, True):
+        for mode in ("sequential", "hedged"):
+            label = f"{mode}{' + deadline 7s' if with_deadline else ''}"
+            samples = run(lf, mode, turns, scale, with_deadline)
+            summarize(label, samples)
+            print(f"{'':<32} turnos por encima de 8s: {sum(1 for ms in samples if ms > 8000)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_history_window.py
+# Tamaño del prompt frente a latencia con la ventana fija de las últimas 6 preguntas y respuestas
+# y con la ventana por presupuesto de tokens (HISTORY_TOKEN_BUDGET), contra un servidor local
+# cuyo tiempo hasta la respuesta crece con los tokens del prompt (como el "prefill" de un modelo).
+# Se prueban sesiones de turnos cortos, de respuestas habladas normales y de respuestas largas.
+#
+# Uso: python benchmarks/bench_history_window.py [turnos] [ms_por_1000_tokens_de_prompt]
+
+import json
+import logging
+import sys
+import time
+
+from _support import LAMBDA_DIR, ChatCompletionHandler, load_skill, redirect_provider, start_server, summarize
+
+sys.path.insert(0, LAMBDA_DIR)
+from history_window import estimate_tokens  # noqa: E402
+
+PROVIDER = "groq_llama4_maverick"
+SESSIONS = {
+    "turnos cortos": 6,       # palabras por respuesta
+    "respuestas habladas": 150,
+    "respuestas largas": 400,
+}
+SESSION_TURNS = 12
+
+
+class PrefillHandler(ChatCompletionHandler):
+    """Tarda en responder en proporción a los tokens (estimados) del prompt recibido"""
+    prefill_per_token = 0.0
+    prompt_tokens = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        messages = json.loads(body).get("messages", [])
+        tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        self.prompt_tokens.append(tokens)
+        time.sleep(tokens * self.prefill_per_token)
+        self._send_json({"choices": [{"message": {"content": self.answer}}]})
+
+
+def session_history(answer_words):
+    answer = " ".join(["palabra"] * (answer_words - 1) + ["final."])
+    return [(f"Pregunta número {i} sobre la historia de Colombia", answer) for i in range(SESSION_TURNS)]
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    PrefillHandler.prefill_per_token = (float(sys.argv[2]) if len(sys.argv) > 2 else 200) / 1000.0 / 1000.0
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(PrefillHandler)
+    # Timeout fijo: las latencias de los turnos cortos no deben cortar las peticiones de prompts largos
+    lf = load_skill(ADAPTIVE_TIMEOUTS_ENABLED=False)
+
+    redirect_provider(lf, PROVIDER, f"{base}/v1/chat/completions")
+    providers = lf.provider_manager.providers
+    budgeted = providers[PROVIDER]
+    print(f"Presupuesto de historial de {PROVIDER}: {budgeted.history_budget} tokens ({budgeted.tokenizer})")
+
+    for label, answer_words in SESSIONS.items():
+        history = session_history(answer_words)
+        variants = {
+            "últimos 6 turnos": (budgeted._replace(history_budget=10 ** 9), history[-6:]),
+            "presupuesto de tokens": (budgeted, history),
+        }
+        print(f"Sesión con {label} ({answer_words} palabras por respuesta, {SESSION_TURNS} turnos guardados)")
+        for name, (spec, chat_history) in variants.items():
+            providers[PROVIDER] = spec
+            PrefillHandler.prompt_tokens = []
+            samples = []
+            for _ in range(turns):
+                start = time.perf_counter()
+                _, error_type = lf.response_generator._try_provider(PROVIDER, chat_history, "¿Y qué pasó después?")
+                samples.append((time.perf_counter() - start) * 1000)
+                assert error_type is None, error_type
+            summarize(f"  {name}", samples)
+            print(f"  {'':<30} tokens de prompt={PrefillHandler.prompt_tokens[-1]}")
+        providers[PROVIDER] = budgeted
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# bench_keepalive.py
+# Mide la latencia por turno de ResponseGenerator contra un endpoint TLS local, comparando
+# una conexión nueva por turno (equivalente al antiguo requests.post) con el pool keep-alive.
+#
+# Uso: python benchmarks/bench_keepalive.py [turnos]
+# En loopback el RTT es ~0, así que el ahorro medido es solo el coste de CPU de TCP+TLS;
+# en Lambda hay que sumar 2-3 RTT de red hacia el proveedor por cada handshake evitado.
+
+import logging
+import os
+import sys
+import time
+
+from _support import load_skill, redirect_provider, start_server, summarize
+
+PROVIDER = "groq_llama4_maverick"
+
+
+def run_turns(lf, turns, reuse):
+    samples = []
+    for _ in range(turns):
+        if not reuse:
+            lf.http_transport.close_all_sessions()
+        start = time.perf_counter()
+        response, error_type = lf.response_generator._try_provider(PROVIDER, [], "¿Qué es la fotosíntesis?")
+        samples.append((time.perf_counter() - start) * 1000)
+        assert error_type is None, response
+    return samples
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    logging.disable(logging.CRITICAL)
+    server, base, cert = start_server(tls=True)
+    os.environ["REQUESTS_CA_BUNDLE"] = cert
+
+    lf = load_skill()
+    redirect_provider(lf, PROVIDER, f"{base}/openai/v1/chat/completions")
+
+    run_turns(lf, 10, reuse=True)  # calentamiento
+    cold = run_turns(lf, turns, reuse=False)
+    warm = run_turns(lf, turns, reuse=True)
+
+    summarize("conexión nueva por turno", cold)
+    summarize("keep-alive reutilizado", warm)
+    saved = sum(cold) / len(cold) - sum(warm) / len(warm)
+    print(f"Ahorro medio por turno: {saved:.2f}ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# bench_metrics.py
+# Métricas EMF: qué se obtiene y cuánto cuesta. Se reproducen sesiones vía lambda_handler contra
+# proveedores simulados (algunos lentos, con errores o con 429) usando el sink en memoria, y se
+# resumen las métricas por proveedor (intentos por resultado, p50/p95 de tiempo, TTFT y tokens).
+# Después se mide el costo por invocación de registrar y emitir (a /dev/null) frente a no medir.
+#
+# Uso: python benchmarks/bench_metrics.py [sesiones] [turnos por sesión]
+
+import collections
+import contextlib
+import logging
+import os
+import sys
+import time
+
+from _support import (FakeProviderHandler, ProviderBehavior, alexa_envelope, launch_request, load_skill, percentile,
+                      query_request, route_providers, start_server)
+
+KEYS = {"OPENROUTER_API_KEY": "bench-key", "CEREBRAS_API_KEY": "bench-key", "GROQ_API_KEY": "bench-key",
+        "GEMINI_API_KEY": "bench-key", "CHUTES_API_KEY": "bench-key"}
+
+
+def replay(lf, sessions, turns):
+    for session in range(sessions):
+        attributes = lf.lambda_handler(alexa_envelope(launch_request(), new=True), None).get("sessionAttributes", {})
+        for turn in range(turns):
+            envelope = alexa_envelope(query_request(f"Pregunta {turn} de la sesión {session}"), attributes)
+            attributes = lf.lambda_handler(envelope, None).get("sessionAttributes", {})
+
+
+def provider_table(sink):
+    """Proveedor -> resumen de sus métricas en los documentos emitidos"""
+    rows = collections.defaultdict(lambda: {"outcomes": collections.Counter(), "AttemptTime": [],
+                                            "TimeToFirstToken": [], "CompletionTokens": []})
+    for document in sink.documents:
+        provider = document.get("Provider")
+        if provider is None:
+            continue
+        # Los intentos correctos son los que no aparecen como fallo
+        if "Attempts" in document:
+            rows[provider]["outcomes"]["success"] += len(document["Attempts"])
+        if "Failures" in document:
+            rows[provider]["outcomes"]["success"] -= len(document["Failures"])
+            rows[provider]["outcomes"][document["Outcome"]] += len(document["Failures"])
+        for name in ("AttemptTime", "TimeToFirstToken", "CompletionTokens"):
+            rows[provider][name].extend(document.get(name, []))
+    return rows
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(FakeProviderHandler)
+    lf = load_skill(METRICS_SINK="memory", **KEYS)
+    route_providers(lf.provider_manager, base)
+    lf.response_generator.answer_cache = None
+    providers = lf.provider_manager.available_providers
+    FakeProviderHandler.reset({
+        **{name: ProviderBehavior(latency=0.3, error_rate=0.3) for name in providers if name.startswith("cerebras")},
+        **{name: ProviderBehavior(latency=0.05, rate_limit_rate=0.4) for name in providers if name.startswith("groq")},
+    }, ProviderBehavior(latency=0.1, sigma=0.4, token_delay=0.001))
+
+    sink = lf.metrics.registry.sink
+    replay(lf, sessions, turns)
+    print(f"{len(sink.documents)} documentos EMF de {sessions * (turns + 1)} invocaciones")
+    print(f"{'proveedor':<44} {'intentos por resultado':<36} {'p50 ms':>7} {'p95 ms':>7} {'TTFT p50':>9} {'tokens':>7}")
+    for provider, row in sorted(provider_table(sink).items()):
+        outcomes = " ".join(f"{k}={v}" for k, v in sorted(row["outcomes"].items()))
+        times, ttft, tokens = row["AttemptTime"], row["TimeToFirstToken"], row["CompletionTokens"]
+        print(f"{provider:<44} {outcomes:<36} {percentile(times, 50):>7.0f} {percentile(times, 95):>7.0f} "
+              f"{(f'{percentile(ttft, 50):.0f}' if ttft else '-'):>9} {(sum(tokens) if tokens else '-'):>7}")
+    depth = sink.values("FallbackDepth", Intent="GptQueryIntent")
+    print(f"Profundidad de fallback: {dict(sorted(collections.Counter(depth).items()))}")
+
+    # Costo por invocación: las métricas de un turno típico (un intento, la profundidad de
+    # fallback y el tiempo de la invocación) más el flush, sin métricas frente a EMF a /dev/null
+    registry = lf.metrics.registry
+    attempt = lf.ResponseGenerator._new_attempt("groq_llama4_maverick")
+    attempt.update(sent=True, latency=0.42, headers_time=0.1, ttft=0.2, tokens_per_second=80.0, prompt_tokens=900,
+                   completion_tokens=150)
+    repeats = 20000
+    costs = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for label, sink in (("sin métricas", None), ("EMF", lf.metrics.StdoutSink())):
+            registry.sink = sink
+            start = time.perf_counter()
+            for _ in range(repeats):
+                lf.ResponseGenerator._record_attempt_metrics(attempt, "success")
+                registry.record("FallbackDepth", 1, "Count", Intent="GptQueryIntent")
+                registry.record("InvocationTime", 512.3, Intent="GptQueryIntent")
+                registry.flush()
+            costs[label] = (time.perf_counter() - start) / repeats * 1e6
+    for label, us in costs.items():
+        print(f"{label:<14} {us:7.1f} µs por invocación")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench_phase_timing.py
+# Tiempos por fase y perfilado (lambda/profiling.py). Primero muestra el desglose por fase de
+# algunos turnos contra proveedores simulados sin latencia (lo que queda es el costo de la propia
+# skill), después compara el costo por invocación sin instrumentar, con PHASE_TIMING y con cada
+# modo de perfilado en todas las invocaciones, y por último enseña el resumen que iría al log.
+#
+# Uso: python benchmarks/bench_phase_timing.py [invocaciones]
+
+import logging
+import sys
+import tempfile
+import time
+
+from _support import (FakeProviderHandler, ProviderBehavior, alexa_envelope, launch_request, load_skill, percentile,
+                      query_request, route_providers, start_server)
+
+KEYS = {"OPENROUTER_API_KEY": "bench-key", "CEREBRAS_API_KEY": "bench-key", "GROQ_API_KEY": "bench-key",
+        "GEMINI_API_KEY": "bench-key", "CHUTES_API_KEY": "bench-key"}
+
+
+class Captured(logging.Handler):
+    """Guarda los mensajes del logger de profiling"""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def workload(count):
+    """Envelopes de una sesión que crece: LaunchRequest y luego preguntas con historial"""
+    envelopes = [alexa_envelope(launch_request(), new=True)]
+    history = [(f"Pregunta anterior {i}", "Respuesta anterior " * 20) for i in range(6)]
+    for i in range(count - 1):
+        envelopes.append(alexa_envelope(query_request(f"Pregunta {i}"), {"chat_history": history,
+                                                                         "current_provider": "groq_llama4_maverick"}))
+    return envelopes
+
+
+def run(handler, envelopes):
+    samples = []
+    for envelope in envelopes:
+        start = time.perf_counter()
+        handler(envelope, None)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def wrap(lf, phase_timing, mode, output="log"):
+    profiling = lf.profiling
+    profiling.PHASE_TIMING, profiling.PROFILE_MODE, profiling.PROFILE_SAMPLE_RATE = phase_timing, mode, 1.0
+    profiling.PROFILE_OUTPUT = output
+    return profiling.profiled_handler(lf.sb.lambda_handler(), lf.metrics.request_label)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    server, base, _ = start_server(FakeProviderHandler)
+    FakeProviderHandler.reset(default=ProviderBehavior(latency=0.0, sigma=0.0))
+    lf = load_skill(**KEYS)
+    route_providers(lf.provider_manager, base)
+    lf.response_generator.answer_cache = None
+    logging.disable(logging.NOTSET)
+    logging.getLogger().setLevel(logging.CRITICAL + 1)
+    captured = Captured()
+    profiling_logger = logging.getLogger("profiling")
+    profiling_logger.addHandler(captured)
+    profiling_logger.propagate = False
+    envelopes = workload(count)
+
+    run(wrap(lf, True, None), envelopes[:4])
+    print("Fases de algunas invocaciones:")
+    for message in captured.messages:
+        print("  " + message.split(": ", 1)[1])
+
+    configurations = [("sin instrumentar", False, None), ("PHASE_TIMING", True, None),
+                      ("cprofile (100%)", False, "cprofile"), ("sampling (100%)", False, "sampling")]
+    print(f"\n{'configuración':<20} {'p50 ms':>8} {'p95 ms':>8} {'media ms':>9}")
+    for label, phase_timing, mode in configurations:
+        handler = wrap(lf, phase_timing, mode)
+        run(handler, envelopes[:20])
+        samples = run(handler, envelopes)
+        print(f"{label:<20} {percentile(samples, 50):>8.2f} {percentile(samples, 95):>8.2f} "
+              f"{sum(samples) / len(samples):>9.2f}")
+
+    captured.messages.clear()
+    run(wrap(lf, False, "cprofile"), envelopes[1:2])
+    print("\nResumen de cProfile para el log:\n" + captured.messages[-1])
+    captured.messages.clear()
+    run(wrap(lf, False, "sampling"), envelopes[1:2])
+    print("\nResumen del muestreo para el log:\n" + captured.messages[-1])
+    with tempfile.TemporaryDirectory() as directory:
+        captured.messages.clear()
+        run(wrap(lf, False, "sampling", directory), envelopes[1:2])
+        print("\n" + captured.messages[-1])
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
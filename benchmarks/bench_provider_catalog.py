@@ -0,0 +1,115 @@
+# bench_provider_catalog.py
+# Costo de arranque (cold start) del registro de proveedores:
+#   - "dicts con lambdas": reproduce la construcción anterior de ProviderManager, un dict por
+#     proveedor con sus lambdas get_key/get_headers más la lista de disponibles aparte.
+#   - "catálogo compilado": compile_catalog + build_indexes sobre las tablas de provider_catalog.
+# Mide el tiempo de construcción, la memoria retenida y el costo por turno de leer la
+# configuración de un proveedor (key, headers, URL, modelo, timeout y límite de tokens, que antes
+# se clasificaba con una regex en cada turno y ahora viene precalculado).
+#
+# Uso: python benchmarks/bench_provider_catalog.py [repeticiones]
+
+import sys
+import time
+import tracemalloc
+
+from _support import LAMBDA_DIR, summarize
+
+sys.path.insert(0, LAMBDA_DIR)
+from provider_catalog import (PROVIDERS, FAMILIES, CONTENT_TYPE_JSON, OPENROUTER_REFERER,  # noqa: E402
+                              OPENROUTER_TITLE, DEFAULT_TIMEOUT, compile_catalog, build_indexes)
+from generation_budget import max_tokens_for  # noqa: E402
+
+KEYS = {family: f"bench-{family}-key" for family in FAMILIES}
+
+
+def legacy_configure(keys):
+    """Construcción equivalente a la anterior: closures por proveedor y headers creados en cada llamada"""
+    providers = {}
+    for name, family, model in PROVIDERS:
+        _, url, style = FAMILIES[family]
+        if style == "plain":
+            get_headers = lambda key: {"Content-Type": CONTENT_TYPE_JSON}  # noqa: E731
+        elif style == "openrouter":
+            get_headers = lambda key: {  # noqa: E731
+                "Authorization": f"Bearer {key}",
+                "Content-Type": CONTENT_TYPE_JSON,
+                "HTTP-Referer": OPENROUTER_REFERER,
+                "X-Title": OPENROUTER_TITLE
+            }
+        else:
+            get_headers = lambda key: {  # noqa: E731
+                "Authorization": f"Bearer {key}",
+                "Content-Type": CONTENT_TYPE_JSON
+            }
+        providers[name] = {
+            "url": url.format(model=model),
+            "model": model,
+            "get_headers": get_headers,
+            "get_key": (lambda family=family: keys[family]),
+            "timeout": DEFAULT_TIMEOUT
+        }
+    # La lista de disponibles se mantenía a mano por separado
+    available = [name for name, family, _ in PROVIDERS if keys.get(family)]
+    return providers, available
+
+
+def compiled_configure(keys):
+    providers = compile_catalog(keys)
+    available = [name for name, spec in providers.items() if spec.key]
+    indexes = build_indexes(providers.values())
+    return providers, available, indexes
+
+
+def time_build(build, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        build(KEYS)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def retained_kib(build):
+    tracemalloc.start()
+    result = build(KEYS)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1024
+
+
+def time_lookups(read, providers, turns=20000):
+    names = list(providers)
+    start = time.perf_counter()
+    for i in range(turns):
+        read(providers[names[i % len(names)]])
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def read_legacy(provider):
+    key = provider["get_key"]()
+    return (provider["get_headers"](key), provider["url"], provider["model"], provider.get("timeout", DEFAULT_TIMEOUT),
+            provider.get("max_tokens") or max_tokens_for(provider["model"]))
+
+
+def read_compiled(spec):
+    return spec.key, spec.headers, spec.url, spec.model, spec.timeout, spec.max_tokens
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"Proveedores en el catálogo: {len(PROVIDERS)}")
+    summarize("construcción con dicts y lambdas", time_build(legacy_configure, repeats))
+    summarize("catálogo compilado + índices", time_build(compiled_configure, repeats))
+    print(f"Memoria retenida: dicts con lambdas {retained_kib(legacy_configure):.1f} KiB, "
+          f"catálogo compilado {retained_kib(compiled_configure):.1f} KiB")
+    legacy_providers, _ = legacy_configure(KEYS)
+    compiled_providers, _, _ = compiled_configure(KEYS)
+    print(f"Lectura de configuración por turno: dicts con lambdas "
+          f"{time_lookups(read_legacy, legacy_providers):.2f}us, "
+          f"catálogo compilado {time_lookups(read_compiled, compiled_providers):.2f}us")
+
+
+if __name__ == "__main__":
+    main()
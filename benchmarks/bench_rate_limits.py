@@ -0,0 +1,122 @@
+# bench_rate_limits.py
+# Planificador de límites de uso (lambda/rate_limits.py) contra proveedores simulados que aplican
+# un límite real por ámbito (key, o key y modelo): N peticiones por ventana de W segundos, con
+# x-ratelimit-remaining-requests / x-ratelimit-reset-requests en cada respuesta y 429 con
+# Retry-After al pasarse. Se comparan sin planificador (se descubre el límite con cada 429), solo
+# con lo aprendido de las cabeceras, y con cabeceras más cubetas de tokens con el límite conocido.
+# Se reportan p50/p95/p99 por turno, turnos con respuesta, 429 recibidos y peticiones por turno.
+#
+# Uso: python benchmarks/bench_rate_limits.py [sesiones] [turnos por sesión] [concurrencia] [límite] [ventana]
+
+import collections
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _support import (LAMBDA_DIR, FakeProviderHandler, ProviderBehavior, load_skill, route_providers, start_server,
+                      summarize)
+from bench_end_to_end import KEYS, replay_session
+
+sys.path.insert(0, LAMBDA_DIR)
+from rate_limits import scope_for  # noqa: E402
+
+
+class QuotaProviderHandler(FakeProviderHandler):
+    """FakeProviderHandler con una ventana fija de peticiones por ámbito de límite"""
+    scopes = {}
+    limit = 10
+    window = 5.0
+    windows = {}
+    rejected = 0
+    served = 0
+    quota_lock = threading.Lock()
+
+    @classmethod
+    def reset_quota(cls, scopes, limit, window):
+        cls.scopes, cls.limit, cls.window = scopes, limit, window
+        cls.windows, cls.rejected, cls.served = {}, 0, 0
+
+    def do_POST(self):
+        scope = self.scopes.get(self.path.split("/")[1])
+        now = time.monotonic()
+        with self.quota_lock:
+            started, used = self.windows.get(scope, (now, 0))
+            if now - started >= self.window:
+                started, used = now, 0
+            used += 1
+            self.windows[scope] = (started, used)
+            reset = self.window - (now - started)
+            if used > self.limit:
+                QuotaProviderHandler.rejected += 1
+            else:
+                QuotaProviderHandler.served += 1
+        if used > self.limit:
+            body = self.read_request()
+            with self.lock:
+                self.attempts[_last_user_text(body)] += 1
+            self._send_json({"error": {"message": "Rate limit reached for requests", "code": 429}}, status=429,
+                            headers={"Retry-After": f"{reset:.0f}", "x-ratelimit-remaining-requests": "0",
+                                     "x-ratelimit-reset-requests": f"{reset:.2f}s"})
+            return
+        self.rate_headers = {"x-ratelimit-limit-requests": str(self.limit),
+                             "x-ratelimit-remaining-requests": str(self.limit - used),
+                             "x-ratelimit-reset-requests": f"{reset:.2f}s"}
+        super().do_POST()
+
+    def _send_json(self, payload, status=200, headers=None):
+        super()._send_json(payload, status, {**getattr(self, "rate_headers", {}), **(headers or {})})
+
+
+def _last_user_text(request):
+    from _support import last_user_text
+    return last_user_text(request)
+
+
+def run(lf, base, label, enabled, rpm, sessions, turns, concurrency, limit, window):
+    manager = lf.ProviderManager()
+    route_providers(manager, base)
+    manager.rate_limits.enabled = enabled
+    manager.rate_limits.rpm = rpm
+    lf.provider_manager = manager
+    lf.response_generator = lf.create_response_generator(manager)
+    lf.response_generator.answer_cache = None
+    scopes = {name: scope_for(manager.providers[name]) for name in manager.available_providers}
+    QuotaProviderHandler.reset(default=ProviderBehavior(latency=0.25, sigma=0.4))
+    QuotaProviderHandler.reset_quota(scopes, limit, window)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        results = [r for session in callers.map(lambda s: replay_session(lf, s, turns), range(sessions))
+                   for r in session]
+    elapsed = time.perf_counter() - start
+    answered = sum(1 for _, _, ssml in results if FakeProviderHandler.answer in ssml)
+    requests = QuotaProviderHandler.served + QuotaProviderHandler.rejected
+    summarize(label, [ms for ms, _, _ in results])
+    print(f"{'':<32} {len(results) / elapsed:6.1f} turnos/s, con respuesta {answered}/{len(results)}, "
+          f"429 recibidos {QuotaProviderHandler.rejected}, peticiones por turno {requests / len(results):.2f}")
+    depths = collections.Counter(min(QuotaProviderHandler.attempts[q], 4) for _, q, _ in results)
+    print(f"{'':<32} profundidad de fallback: " + " ".join(f"{d if d < 4 else '4+'}={depths[d]}" for d in sorted(depths)))
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    limit = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+    window = float(sys.argv[5]) if len(sys.argv) > 5 else 5.0
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(QuotaProviderHandler)
+    lf = load_skill(**KEYS)
+    print(f"{sessions} sesiones de {turns} turnos, {concurrency} concurrentes, límite de {limit} peticiones "
+          f"cada {window:.0f}s por ámbito, {len(lf.provider_manager.available_providers)} proveedores")
+    per_minute = limit * 60 / window
+    known = {family: per_minute for family in ("openrouter", "cerebras", "groq", "gemini", "chutes")}
+    for label, enabled, rpm in (("sin planificador", False, {}), ("cabeceras", True, {}),
+                                ("cabeceras + cubetas", True, known)):
+        run(lf, base, label, enabled, rpm, sessions, turns, concurrency, limit, window)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
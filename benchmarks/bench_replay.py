@@ -0,0 +1,206 @@
+# bench_replay.py
+# Reproduce sin conexión el tráfico grabado con TRAFFIC_RECORD_PATH (lambda/traffic_recorder.py)
+# para detectar regresiones de rendimiento en handlers y (de)serialización antes de desplegar.
+# Cada envelope grabado se pasa a lambda_handler; las peticiones a proveedores las contesta un
+# servidor local (en otro proceso) con las respuestas grabadas, buscadas por la huella del
+# último mensaje del usuario. Informa por intent de la latencia (p50/p95/p99) y de la memoria
+# asignada por invocación (pico y retenida, con tracemalloc en una pasada secuencial aparte).
+#
+# Uso:
+#   python benchmarks/bench_replay.py record <archivo.jsonl> [sesiones] [turnos]
+#       graba sesiones sintéticas contra proveedores simulados (para probar sin tráfico real)
+#   python benchmarks/bench_replay.py replay <archivo.jsonl> [velocidad] [concurrencia] [repeticiones]
+#       velocidad 0 sirve las respuestas sin esperas; 1 respeta los tiempos grabados
+
+import collections
+import itertools
+import json
+import logging
+import multiprocessing
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from _support import (LAMBDA_DIR, ChatCompletionHandler, FakeProviderHandler, ProviderBehavior, alexa_envelope,
+                      intent_request, launch_request, load_skill, percentile, query_request, route_providers,
+                      start_server)
+
+sys.path.insert(0, LAMBDA_DIR)
+from traffic_recorder import prompt_key  # noqa: E402
+
+KEYS = {"OPENROUTER_API_KEY": "bench-key", "CEREBRAS_API_KEY": "bench-key", "GROQ_API_KEY": "bench-key",
+        "GEMINI_API_KEY": "bench-key", "CHUTES_API_KEY": "bench-key"}
+QUESTIONS = ["¿Qué es la fotosíntesis?", "Háblame del café de Caldas", "¿Y por qué es tan famoso?",
+             "¿Quién fue García Márquez?", "Dame un ejemplo", "¿Cómo se forma un agujero negro?"]
+
+
+class RecordedProviderHandler(ChatCompletionHandler):
+    """Contesta cada petición con la siguiente respuesta grabada para su huella de prompt"""
+    recordings = {}
+    cursors = collections.Counter()
+    speed = 0.0
+    misses = None
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        key = prompt_key(body)
+        records = self.recordings.get(key)
+        if not records:
+            with self.misses.get_lock():
+                self.misses.value += 1
+            self._send_json({"error": {"message": "Sin respuesta grabada"}}, status=404)
+            return
+        self.record = records[self.cursors[key] % len(records)]
+        self.cursors[key] += 1
+        gemini = ":generateContent" in self.path or ":streamGenerateContent" in self.path
+        try:
+            if self.record["stream"] and self.record["status"] < 400:
+                time.sleep((self.record["ttft"] or 0) * self.speed)
+                tokens = self.tokens(None)
+                self.token_delay = max(0.0, self.record["latency"] - (self.record["ttft"] or 0)) / len(tokens) * self.speed
+                self._send_stream({}, gemini)
+            else:
+                time.sleep(self.record["latency"] * self.speed)
+                self._send_raw(self.record)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def tokens(self, request):
+        words = (self.record["body"] or "").split(" ")
+        return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+    def _send_raw(self, record):
+        body = (record["body"] or "").encode("utf-8")
+        self.send_response(record["status"])
+        for name, value in record["headers"].items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def load_recording(path):
+    envelopes, recordings = [], collections.defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "envelope":
+                envelopes.append(record["envelope"])
+            elif record["type"] == "provider":
+                recordings[record["key"]].append(record)
+    return envelopes, dict(recordings)
+
+
+def serve(recordings, speed, misses, ready):
+    """Proceso del servidor de respuestas grabadas: así tracemalloc solo ve a la skill"""
+    RecordedProviderHandler.recordings = recordings
+    RecordedProviderHandler.speed = speed
+    RecordedProviderHandler.misses = misses
+    server, base, _ = start_server(RecordedProviderHandler)
+    ready.put(base)
+    while True:
+        time.sleep(3600)
+
+
+def intent_label(envelope):
+    request = envelope["request"]
+    if request["type"] == "IntentRequest":
+        return request["intent"]["name"]
+    return request["type"]
+
+
+def invoke(lf, envelope):
+    start = time.perf_counter()
+    lf.lambda_handler(envelope, None)
+    return (time.perf_counter() - start) * 1000
+
+
+def record(path, sessions, turns):
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(FakeProviderHandler)
+    FakeProviderHandler.reset(default=ProviderBehavior(latency=0.1, sigma=0.4, error_rate=0.05, token_delay=0.002))
+    lf = load_skill(TRAFFIC_RECORD_PATH=path, **KEYS)
+    route_providers(lf.provider_manager, base)
+    for session in range(sessions):
+        attributes = lf.lambda_handler(alexa_envelope(launch_request(), new=True), None).get("sessionAttributes", {})
+        requests = [query_request(QUESTIONS[(session + t) % len(QUESTIONS)]) for t in range(turns)]
+        requests[turns // 2:turns // 2] = [intent_request("AMAZON.HelpIntent"), intent_request("NewTopicIntent")]
+        for request in requests + [intent_request("AMAZON.StopIntent")]:
+            attributes = lf.lambda_handler(alexa_envelope(request, attributes), None).get("sessionAttributes", {})
+    server.shutdown()
+    print(f"Grabadas {sessions} sesiones en {path}")
+
+
+def replay(path, speed, concurrency, repeats):
+    logging.disable(logging.CRITICAL)
+    envelopes, recordings = load_recording(path)
+    misses, ready = multiprocessing.Value("i", 0), multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(recordings, speed, misses, ready), daemon=True)
+    server.start()
+    base = ready.get()
+    lf = load_skill(**KEYS)
+    route_providers(lf.provider_manager, base)
+    # Reproducción determinista: misma secuencia de proveedores y de frases en cada corrida
+    random.seed(0)
+    lf.provider_manager.selector.rng = random.Random(0)
+    lf.response_generator.answer_cache = None
+
+    workload = envelopes * repeats
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        start = time.perf_counter()
+        latencies = list(callers.map(lambda envelope: invoke(lf, envelope), workload))
+        elapsed = time.perf_counter() - start
+
+    # Memoria: pasada secuencial aparte para que cada medición corresponda a una sola invocación
+    allocations = []
+    tracemalloc.start()
+    for envelope in envelopes:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        invoke(lf, envelope)
+        current, peak = tracemalloc.get_traced_memory()
+        allocations.append((peak - before, current - before))
+    tracemalloc.stop()
+    server.terminate()
+
+    by_intent = collections.defaultdict(lambda: {"ms": [], "peak": [], "retained": []})
+    for envelope, ms in zip(workload, latencies):
+        by_intent[intent_label(envelope)]["ms"].append(ms)
+    for envelope, (peak, retained) in zip(envelopes, allocations):
+        by_intent[intent_label(envelope)]["peak"].append(peak)
+        by_intent[intent_label(envelope)]["retained"].append(retained)
+
+    print(f"{len(workload)} invocaciones en {elapsed:.2f}s ({len(workload) / elapsed:.1f}/s), velocidad={speed}, "
+          f"concurrencia={concurrency}, respuestas no encontradas={misses.value}")
+    print(f"{'intent':<24} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'pico KiB':>9} {'retenida KiB':>13}")
+    for label, stats in sorted(by_intent.items()):
+        ms = stats["ms"]
+        print(f"{label:<24} {len(ms):>5} {percentile(ms, 50):>7.2f}ms {percentile(ms, 95):>7.2f}ms "
+              f"{percentile(ms, 99):>7.2f}ms {sum(stats['peak']) / len(stats['peak']) / 1024:>9.1f} "
+              f"{sum(stats['retained']) / len(stats['retained']) / 1024:>13.1f}")
+
+
+def usage():
+    """Devuelve el bloque "Uso:" de la cabecera de este archivo, sin los "#"."""
+    with open(__file__, encoding="utf-8") as f:
+        header = [line[2:].rstrip() for line in itertools.takewhile(lambda line: line.startswith("#"), f)]
+    return "\n".join(header[next(i for i, line in enumerate(header) if line.startswith("Uso:")):])
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "replay"):
+        print(usage(), file=sys.stderr)
+        sys.exit(2)
+    command, path = sys.argv[1], sys.argv[2]
+    if command == "record":
+        record(path, int(sys.argv[3]) if len(sys.argv) > 3 else 10, int(sys.argv[4]) if len(sys.argv) > 4 else 6)
+    else:
+        replay(path, float(sys.argv[3]) if len(sys.argv) > 3 else 0.0, int(sys.argv[4]) if len(sys.argv) > 4 else 1,
+               int(sys.argv[5]) if len(sys.argv) > 5 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench_request_payload.py
+# Costo por turno de construir el cuerpo de la petición a un proveedor:
+#   - "por turno": lo que se hacía antes en cada turno, generar el prompt del sistema con el
+#     f-string, recorrer _build_request_data y serializar todo el dict con json.dumps.
+#   - "plantilla": RequestTemplate.render, que solo codifica el historial y lo empalma entre los
+#     campos fijos y el mensaje del sistema ya codificados al arrancar; con json y con orjson.
+# Se verifica además que ambos cuerpos decodifican al mismo payload.
+#
+# Uso: python benchmarks/bench_request_payload.py [turnos]
+
+import json
+import sys
+import time
+
+from _support import load_skill
+
+PROVIDERS = ("groq_llama4_maverick", "openrouter_deepseek_r1", "github_openai_o4_mini", "gemini_25")
+HISTORY_TURNS = (0, 3, 6)
+
+
+def history(turns):
+    return [(f"Pregunta número {i} sobre la historia de Colombia", "Respuesta de unas ciento cincuenta palabras. " * 20)
+            for i in range(turns)]
+
+
+def legacy_body(generator, provider, chat_history, question):
+    """Construcción anterior: prompt, mensajes con el sistema incluido y json.dumps de todo el dict"""
+    system_prompt = generator._get_system_prompt()
+    if provider.api == "gemini":
+        contents = [{"role": "user", "parts": [{"text": system_prompt}]}]
+        contents += generator._build_chat_history(chat_history, question, format_type="gemini")
+        return json.dumps({"contents": contents, "generationConfig": generator._build_gemini_generation_config(provider)})
+    messages = [{"role": "system", "content": system_prompt}]
+    messages += generator._build_chat_history(chat_history, question, format_type="standard")
+    return json.dumps(generator._build_request_data(provider, provider.model, messages, provider.name))
+
+
+def template_body(generator, template, provider, chat_history, question):
+    format_type = "gemini" if provider.api == "gemini" else "standard"
+    return template.render(generator._build_chat_history(chat_history, question, format_type=format_type))
+
+
+def time_per_turn(build, turns):
+    start = time.perf_counter()
+    for _ in range(turns):
+        build()
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    keys = {name: "bench-key" for name in ("GROQ_API_KEY", "OPENROUTER_API_KEY", "GITHUB_TOKEN", "GEMINI_API_KEY")}
+    lf = load_skill(**keys)
+    import request_templates
+
+    generator = lf.response_generator
+    encoders = {"json": request_templates._json_dumps}
+    try:
+        import orjson
+        encoders["orjson"] = orjson.dumps
+    except ImportError:
+        print("orjson no está instalado: se omite esa variante")
+
+    # Un ResponseGenerator por codificador: sus plantillas se compilan con el codificador activo
+    generators = {}
+    for encoder_name, encoder in encoders.items():
+        request_templates.encode_json = encoder
+        start = time.perf_counter()
+        generators[encoder_name] = lf.ResponseGenerator(lf.provider_manager)
+        print(f"Compilación de {len(generators[encoder_name].templates)} plantillas ({encoder_name}): "
+              f"{(time.perf_counter() - start) * 1000:.2f}ms")
+
+    question = "¿Qué es la fotosíntesis?"
+    print(f"Construcción del cuerpo por turno (us), {turns} turnos por celda")
+    print(f"{'proveedor':<24} {'historial':>9} {'por turno':>11}" + "".join(f" {'plantilla ' + n:>17}" for n in encoders))
+    for name in PROVIDERS:
+        provider = lf.provider_manager.get_provider_config(name)
+        for n in HISTORY_TURNS:
+            chat_history = history(n)
+            expected = json.loads(legacy_body(generator, provider, chat_history, question))
+            row = f"{name:<24} {n:>9} {time_per_turn(lambda: legacy_body(generator, provider, chat_history, question), turns):11.2f}"
+            for templated in generators.values():
+                template = templated.templates[name]
+                assert json.loads(template_body(templated, template, provider, chat_history, question)) == expected, name
+                elapsed = time_per_turn(lambda: template_body(templated, template, provider, chat_history, question), turns)
+                row += f" {elapsed:17.2f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# bench_semantic_cache.py
+# 1) Latencia de búsqueda de la caché semántica con 10k, 100k y 1M entradas.
+# 2) Precisión y cobertura sobre un corpus de paráfrasis en español (data/paraphrases_es.json):
+#    se cachea la primera pregunta de cada grupo y se consultan sus paráfrasis (deben acertar)
+#    y preguntas distintas pero de vocabulario parecido (no deben acertar).
+#
+# Uso: python benchmarks/bench_semantic_cache.py [tamaños separados por coma]
+# Requiere numpy. Con la dimensión por defecto (256), 1M entradas ocupan ~1 GB.
+
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+from _support import LAMBDA_DIR, summarize
+
+sys.path.insert(0, LAMBDA_DIR)
+from semantic_cache import SemanticCache  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "paraphrases_es.json")
+
+
+def bench_lookup(sizes, queries=200):
+    rng = np.random.default_rng(0)
+    for size in sizes:
+        cache = SemanticCache(max_entries=size)
+        # Vectores aleatorios normalizados: el coste de la búsqueda no depende del contenido
+        block = rng.standard_normal((size, cache.dim)).astype(np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        cache.vectors[:] = block
+        cache.size = size
+        cache.expires_at[:] = time.time() + 3600
+        samples = []
+        for i in range(queries):
+            start = time.perf_counter()
+            cache.get(f"pregunta de prueba número {i}")
+            samples.append((time.perf_counter() - start) * 1000)
+        summarize(f"búsqueda con {size} entradas", samples)
+        print(f"{'':<32} memoria={cache.vectors.nbytes / 2 ** 20:.0f} MB")
+        del cache, block
+
+
+def bench_precision(thresholds=(0.6, 0.7, 0.75, 0.8, 0.85, 0.9)):
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+    groups, negatives = corpus["groups"], corpus["negatives"]
+    for threshold in thresholds:
+        cache = SemanticCache(max_entries=1000, threshold=threshold)
+        for group_id, group in enumerate(groups):
+            cache.put(group[0], str(group_id))
+        correct = wrong = missed = false_hits = 0
+        for group_id, group in enumerate(groups):
+            for paraphrase in group[1:]:
+                answer = cache.get(paraphrase)
+                if answer is None:
+                    missed += 1
+                elif answer == str(group_id):
+                    correct += 1
+                else:
+                    wrong += 1
+        for question in negatives:
+            if cache.get(question) is not None:
+                false_hits += 1
+        hits = correct + wrong + false_hits
+        precision = correct / hits if hits else 1.0
+        recall = correct / (correct + wrong + missed)
+        print(f"umbral={threshold:.2f} precisión={precision:.3f} cobertura={recall:.3f} "
+              f"aciertos={correct} erróneos={wrong} perdidos={missed} falsos_positivos={false_hits}/{len(negatives)}")
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10_000, 100_000, 1_000_000]
+    bench_lookup(sizes)
+    bench_precision()
+
+
+if __name__ == "__main__":
+    main()
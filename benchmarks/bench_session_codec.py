@@ -0,0 +1,77 @@
+# bench_session_codec.py
+# Tamaño del envelope de Alexa y tiempo de (de)serialización de los atributos de sesión para
+# sesiones de 1 a 50 turnos, con el estado en JSON plano y con session_codec (zlib + base64):
+#   - petición: json.loads del envelope completo (lo que hace el SDK al recibirlo)
+#   - handler con estado: además decode_state + encode_state del blob
+#   - respuesta: json.dumps de los atributos de sesión
+# Un handler que no usa el estado (ayuda, cancelar...) solo paga el json.loads del blob como texto.
+#
+# Uso: python benchmarks/bench_session_codec.py [repeticiones]
+
+import json
+import random
+import sys
+import time
+
+from _support import LAMBDA_DIR, alexa_envelope, query_request
+
+sys.path.insert(0, LAMBDA_DIR)
+from session_codec import STATE_KEY, decode_state, encode_state  # noqa: E402
+
+TURNS = (1, 5, 10, 20, 50)
+SYLLABLES = ["ca", "fé", "sol", "luz", "ma", "ri", "po", "te", "na", "dió", "ción", "es", "tra", "gua", "lo", "bo",
+             "que", "ver", "di", "mon", "ta", "ña", "río", "sa", "ble", "men", "to", "cu", "ra", "ción"]
+
+
+def answer(rng, words=150):
+    """Texto con la entropía aproximada de una respuesta real (sin frases repetidas que zlib comprima de más)"""
+    text = " ".join("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(words))
+    return text.replace(" ca ", ". Ca ")
+
+
+def plain_state(turns):
+    rng = random.Random(turns)
+    return {
+        "chat_history": [[f"Pregunta número {i} sobre ciencia en Colombia", answer(rng)] for i in range(turns)],
+        "current_provider": "openrouter_deepseek_chat_v3_free",
+        "failed_providers": ["groq_llama4_maverick"],
+    }
+
+
+def time_us(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"{'turnos':>6} {'envelope plano':>15} {'envelope zlib':>14} {'ahorro':>7} "
+          f"{'plano ida+vuelta':>17} {'zlib ida+vuelta':>16} {'zlib sin decodificar':>21}")
+    for turns in TURNS:
+        state = plain_state(turns)
+        plain = json.dumps(alexa_envelope(query_request("¿Y qué más?"), state))
+        packed = json.dumps(alexa_envelope(query_request("¿Y qué más?"), {STATE_KEY: encode_state(state)}))
+
+        def plain_round_trip():
+            attributes = json.loads(plain)["session"]["attributes"]
+            json.dumps(attributes)
+
+        def packed_round_trip():
+            attributes = json.loads(packed)["session"]["attributes"]
+            decoded = decode_state(attributes[STATE_KEY])
+            json.dumps({STATE_KEY: encode_state(decoded)})
+
+        def packed_untouched():
+            attributes = json.loads(packed)["session"]["attributes"]
+            json.dumps(attributes)
+
+        assert decode_state(json.loads(packed)["session"]["attributes"][STATE_KEY]) == state
+        print(f"{turns:>6} {len(plain):>13}B {len(packed):>12}B {1 - len(packed) / len(plain):>7.0%} "
+              f"{time_us(plain_round_trip, repeats):>15.1f}us {time_us(packed_round_trip, repeats):>14.1f}us "
+              f"{time_us(packed_untouched, repeats):>19.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# bench_summary.py
+# Tokens de prompt en sesiones largas de "modo chat" con y sin resumen incremental. Se reproduce
+# una sesión de varios turnos a través de lambda_handler (arrastrando los atributos de sesión
+# de un turno al siguiente) contra un servidor local que contesta respuestas habladas de ~150
+# palabras y resúmenes de ~60. El servidor estima los tokens de cada prompt recibido y de cada
+# respuesta. El balance neto suma los tokens de entrada y salida de las llamadas de resumen.
+#
+# Uso: python benchmarks/bench_summary.py [turnos por sesión] [sesiones] [SUMMARY_TRIGGER_TOKENS] [SUMMARY_KEEP_TURNS]
+
+import json
+import logging
+import sys
+
+from _support import (LAMBDA_DIR, ChatCompletionHandler, alexa_envelope, launch_request, load_skill, query_request,
+                      redirect_provider, start_server)
+
+sys.path.insert(0, LAMBDA_DIR)
+from history_window import estimate_tokens  # noqa: E402
+
+TOPICS = ["la independencia de Colombia", "la fotosíntesis", "el café de Caldas", "los agujeros negros",
+          "la obra de García Márquez", "el río Magdalena", "la vacuna contra la viruela", "el sistema solar"]
+FOLLOW_UPS = ["¿Y qué pasó después?", "¿Por qué fue tan importante?", "Dame un ejemplo concreto",
+              "¿Quiénes participaron?"]
+
+
+class ReplayHandler(ChatCompletionHandler):
+    """Distingue las peticiones de resumen de las de respuesta y anota los tokens de cada prompt"""
+    answer = " ".join(["La respuesta continúa con datos concretos sobre el tema."] * 17)
+    summary = " ".join(["El usuario preguntó por varios temas y se dieron datos clave."] * 6)
+    prompts = {"answer": [], "summary": []}
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        messages = request.get("messages", [])
+        kind = "summary" if messages and messages[0]["content"].startswith("Resumes conversaciones") else "answer"
+        self.prompts[kind].append(sum(estimate_tokens(m["content"]) for m in messages))
+        self._send_json({"choices": [{"message": {"content": self.summary if kind == "summary" else self.answer}}]})
+
+
+def questions(session, turns):
+    for turn in range(turns):
+        if turn % 3 == 0:
+            yield f"Háblame de {TOPICS[(session + turn // 3) % len(TOPICS)]}"
+        else:
+            yield FOLLOW_UPS[(session + turn) % len(FOLLOW_UPS)]
+
+
+def replay(lf, session, turns):
+    """Reproduce la sesión; devuelve los atributos finales y cuántos turnos recibieron la respuesta del proveedor"""
+    attributes = lf.lambda_handler(alexa_envelope(launch_request(), new=True), None).get("sessionAttributes", {})
+    answered = 0
+    for question in questions(session, turns):
+        result = lf.lambda_handler(alexa_envelope(query_request(question), attributes), None)
+        attributes = result.get("sessionAttributes", {})
+        ssml = result.get("response", {}).get("outputSpeech", {}).get("ssml", "")
+        answered += ReplayHandler.answer.split(".")[0] in ssml
+    return attributes, answered
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    overrides = {}
+    if len(sys.argv) > 3:
+        overrides["SUMMARY_TRIGGER_TOKENS"] = int(sys.argv[3])
+    if len(sys.argv) > 4:
+        overrides["SUMMARY_KEEP_TURNS"] = int(sys.argv[4])
+    logging.disable(logging.CRITICAL)
+    server, base, _ = start_server(ReplayHandler)
+    # Un único proveedor de respuestas para que ambas variantes usen el mismo presupuesto de historial
+    lf = load_skill(FORCED_PROVIDER="groq_llama4_maverick", **overrides)
+    import config
+    print(f"SUMMARY_TRIGGER_TOKENS={config.SUMMARY_TRIGGER_TOKENS} SUMMARY_KEEP_TURNS={config.SUMMARY_KEEP_TURNS}")
+    # Sin caché de respuestas, para que ambas variantes envíen las mismas preguntas al proveedor
+    lf.response_generator.answer_cache = None
+    for name in lf.provider_manager.available_providers:
+        redirect_provider(lf, name, f"{base}/v1/chat/completions")
+
+    print(f"{sessions} sesiones de {turns} turnos")
+    results = {}
+    for enabled in (False, True):
+        lf.SUMMARY_ENABLED = enabled
+        ReplayHandler.prompts = {"answer": [], "summary": []}
+        sizes = []
+        answered = 0
+        for session in range(sessions):
+            attributes, session_answered = replay(lf, session, turns)
+            sizes.append(len(json.dumps(attributes)))
+            answered += session_answered
+        answer, summary = ReplayHandler.prompts["answer"], ReplayHandler.prompts["summary"]
+        label = "con resumen" if enabled else "sin resumen"
+        # Una variante con turnos sin respuesta (o con reintentos) no es comparable con la otra
+        assert answered == len(answer) == sessions * turns, (label, answered, len(answer))
+        # Cada resumen cuesta su prompt más el texto generado
+        summary_tokens = sum(summary) + len(summary) * estimate_tokens(ReplayHandler.summary)
+        results[enabled] = (answer, sum(answer) + summary_tokens)
+        print(f"{label:<12} prompts de respuesta: media={sum(answer) / len(answer):7.0f} máx={max(answer):6} tokens | "
+              f"resúmenes: {len(summary):3} llamadas, {summary_tokens:7} tokens | "
+              f"atributos de sesión al final: {sum(sizes) / len(sizes):7.0f} bytes")
+        last_turns = answer[-(turns // 2):]
+        print(f"{'':<12} media en la segunda mitad de la última sesión: {sum(last_turns) / len(last_turns):7.0f} tokens")
+    # Los resúmenes van en paralelo a la respuesta: solo los prompts de respuesta afectan al tiempo
+    # hasta el primer token, pero todos los tokens cuentan en el gasto
+    (plain, plain_total), (folded, folded_total) = results[False], results[True]
+    saved = 1 - (sum(folded) / len(folded)) / (sum(plain) / len(plain))
+    print(f"Reducción de tokens en los prompts de respuesta: {saved * 100:.1f}%")
+    print(f"Tokens totales (respuestas + resúmenes): {plain_total} sin resumen, {folded_total} con resumen "
+          f"({(folded_total - plain_total) / plain_total * 100:+.1f}%)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
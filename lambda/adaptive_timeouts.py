@@ -0,0 +1,133 @@
+# adaptive_timeouts.py
+# Timeouts por proveedor aprendidos de la latencia observada. Un timeout fijo (DEFAULT_TIMEOUT)
+# es demasiado largo para Groq o Cerebras, que suelen responder en menos de un segundo, y
+# demasiado corto para algunos modelos de razonamiento. Se guarda una ventana de latencias
+# recientes de cada proveedor y el timeout es el cuantil TIMEOUT_QUANTILE por TIMEOUT_FACTOR,
+# recortado al tiempo restante del turno:
+# - Conexión (TCP + TLS) y lectura por separado: la conexión no depende del modelo, así que
+#   TIMEOUT_CONNECT se aplica desde la primera petición y un timeout al conectar no se anota.
+# - Sin streaming, la lectura es la espera de la respuesta completa (latencia total). El límite es
+#   total: requests y httpx solo limitan cada lectura del socket, y un proveedor que envía bytes
+#   poco a poco (espacios keep-alive) no lo agotaría nunca, así que el transporte corta la
+#   respuesta cuando pasa ese límite desde el envío.
+# - En streaming, el límite es el del primer token (TTFB): lo que tarde el resto del stream lo
+#   acota el presupuesto del turno.
+# Tras un timeout la latencia real es desconocida pero mayor que el límite: se anota el propio
+# límite, así el siguiente crece (por TIMEOUT_FACTOR) en lugar de quedar fijado por las respuestas
+# rápidas.
+# Cada intento se anota en la ventana del proveedor, en la de su familia y clase de modelo
+# (p. ej. "openrouter/standard") y en la de su clase ("standard"). Con decenas de proveedores, pocos
+# llegan a TIMEOUT_MIN_SAMPLES por sí solos: mientras tanto se usa la primera ventana, de la más
+# específica a la más general, que tenga mediciones suficientes.
+# Las ventanas son locales del contenedor, igual que las latencias del LatencySelector.
+
+import threading
+from collections import deque, namedtuple
+
+from config import (ADAPTIVE_TIMEOUTS_ENABLED, TIMEOUT_WINDOW, TIMEOUT_QUANTILE, TIMEOUT_FACTOR, TIMEOUT_MIN_SAMPLES,
+                    TIMEOUT_MIN, TIMEOUT_MAX, TIMEOUT_CONNECT)
+
+# connect y read en segundos (la tupla que aceptan requests y, convertida, httpx); first_token es
+# el límite hasta el primer token en streaming (None sin streaming); limit es el timeout antes de
+# recortarlo al tiempo del turno y learned indica si es aprendido o el del catálogo
+AttemptTimeouts = namedtuple("AttemptTimeouts", ["connect", "read", "first_token", "limit", "learned"])
+
+
+def quantile(values, q):
+    """Cuantil por rango más cercano de una lista de valores"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class TimeoutEstimator:
+    """Ventanas de latencia total y de primer token por proveedor, y los timeouts que se derivan"""
+
+    def __init__(self, enabled=ADAPTIVE_TIMEOUTS_ENABLED, window=TIMEOUT_WINDOW, q=TIMEOUT_QUANTILE,
+                 factor=TIMEOUT_FACTOR, min_samples=TIMEOUT_MIN_SAMPLES):
+        self.enabled = enabled
+        self.window = window
+        self.q = q
+        self.factor = factor
+        self.min_samples = min_samples
+        # (proveedor, "familia/clase" o clase, "latency" | "ttft") -> deque de segundos
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def _window(self, provider_name, kind):
+        samples = self._samples.get((provider_name, kind))
+        if samples is None:
+            samples = self._samples[(provider_name, kind)] = deque(maxlen=self.window)
+        return samples
+
+    @staticmethod
+    def windows_of(spec):
+        """Ventanas en las que se anota el proveedor, de la más específica a la más general"""
+        return spec.name, f"{spec.family}/{spec.model_class}", spec.model_class
+
+    def _learned(self, name, kind):
+        with self._lock:
+            samples = self._samples.get((name, kind))
+            if not samples or len(samples) < self.min_samples:
+                return None
+            value = quantile(samples, self.q) * self.factor
+        return min(max(value, TIMEOUT_MIN), TIMEOUT_MAX)
+
+    def learned(self, spec, stream=False):
+        """
+        Timeout aprendido (s) de la espera que corresponda: el del proveedor o, sin mediciones
+        suficientes, el de su familia y clase o el de su clase; None si ninguno las tiene
+        """
+        kind = "ttft" if stream else "latency"
+        for name in self.windows_of(spec):
+            limit = self._learned(name, kind)
+            if limit is not None:
+                return limit
+        return None
+
+    def timeouts_for(self, spec, stream, deadline, adaptive=True):
+        """
+        Timeouts de un intento. Sin aprendizaje (desactivado, sin mediciones o adaptive=False, que
+        usan los resúmenes) la lectura usa el timeout del catálogo; la conexión, siempre TIMEOUT_CONNECT.
+        """
+        limit = self.learned(spec, stream) if self.enabled and adaptive else None
+        learned = limit is not None
+        if not learned:
+            limit = spec.timeout
+        read = deadline.timeout_for(limit)
+        return AttemptTimeouts(min(TIMEOUT_CONNECT, read), read, read if stream else None, limit, learned)
+
+    def observe(self, spec, timeouts, latency, ttft=None, timed_out=False):
+        """
+        Anota un intento: la latencia total (sin streaming) o hasta el primer token (en streaming).
+        Solo se llama con respuestas correctas y timeouts de lectura. Un timeout solo se anota si lo
+        cortó el límite del proveedor y no el tiempo restante del turno.
+        """
+        if not self.enabled:
+            return
+        stream = timeouts.first_token is not None
+        if timed_out:
+            applied = timeouts.first_token if stream else timeouts.read
+            if applied < timeouts.limit:
+                return
+            value = timeouts.limit
+        else:
+            value = ttft if stream else latency
+            if value is None:
+                return
+        kind = "ttft" if stream else "latency"
+        with self._lock:
+            for name in self.windows_of(spec):
+                self._window(name, kind).append(value)
+
+    def snapshot(self):
+        """Timeout aprendido en milisegundos y mediciones por ventana (para logs y métricas)"""
+        with self._lock:
+            keys = sorted(self._samples)
+        state = {}
+        for name, kind in keys:
+            limit = self._learned(name, kind)
+            state.setdefault(name, {})[kind] = {
+                "timeout_ms": round(limit * 1000) if limit is not None else None,
+                "samples": len(self._samples[(name, kind)])}
+        return state
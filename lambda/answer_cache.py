@@ -0,0 +1,156 @@
+# answer_cache.py
+# Caché de respuestas para preguntas sin contexto de conversación. La clave es la pregunta
+# normalizada (sin tildes, mayúsculas, signos, palabras vacías ni muletillas del ASR), de modo
+# que "¿Quién descubrió América?" y "alexa quien descubrio america" comparten respuesta.
+
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Artículos, preposiciones y muletillas que no cambian el sentido de la pregunta.
+# Los interrogativos (qué, quién, cómo, cuándo...) se conservan porque sí lo cambian, igual que
+# "con" / "sin" ("café con azúcar" no es "café sin azúcar"), "te" (sin tildes, también "té") y
+# "bueno", que puede ser parte de la pregunta.
+STOP_WORDS = frozenset("""
+el la los las lo un una unos unas de del al a en y o e u por para sobre
+me se nos le les mi tu su
+alexa oye eh em este pues entonces favor dime dinos cuentame explicame
+puedes podrias sabes quiero queria saber decirme
+""".split())
+
+# Preguntas cuya respuesta cambia con el tiempo: nunca se cachean
+TIME_SENSITIVE_WORDS = frozenset("""
+hoy ahora hora ayer mañana actual actualmente ultimo ultima ultimos ultimas reciente
+clima noticias fecha semana
+""".split())
+
+_NON_WORD = re.compile(r"[^a-z0-9ñ ]+")
+
+
+def _strip_accents(text):
+    # Se preserva la ñ: "año" y "ano" no son la misma palabra
+    text = text.replace("ñ", "\0")
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return text.replace("\0", "ñ")
+
+
+def normalize_query(question):
+    """Forma canónica de una pregunta, o None si no debe cachearse"""
+    if not question:
+        return None
+    text = _strip_accents(question.lower())
+    words = _NON_WORD.sub(" ", text).split()
+    if any(w in TIME_SENSITIVE_WORDS for w in words):
+        return None
+    words = [w for w in words if w not in STOP_WORDS]
+    return " ".join(words) or None
+
+
+class TTLLRUCache:
+    """Caché en memoria con caducidad por entrada y expulsión LRU al superar el tamaño máximo"""
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, now=None):
+        now = now or time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value, expires_at=None):
+        with self._lock:
+            self._data[key] = (value, expires_at or time.time() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class AnswerCache:
+    """Caché de dos niveles: memoria del contenedor y, opcionalmente, un StateStore compartido"""
+
+    def __init__(self, shared_store=None, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL):
+        self.local = TTLLRUCache(max_entries, ttl)
+        self.shared_store = shared_store
+        self.ttl = ttl
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _shared_key(normalized):
+        import hashlib  # solo con caché compartida: se evita su importación en el arranque en frío
+
+        return "answer:" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:20]
+
+    def get(self, question):
+        """Devuelve la respuesta cacheada para la pregunta, o None"""
+        normalized = normalize_query(question)
+        if normalized is None:
+            return None
+        answer = self.local.get(normalized)
+        if answer is not None:
+            self.hits += 1
+            return answer
+        if self.shared_store is not None:
+            try:
+                entry = self.shared_store.get(self._shared_key(normalized))
+            except Exception as e:
+                logger.warning(f"No se pudo leer la caché compartida: {str(e)}")
+                entry = None
+            if entry and entry.get("q") == normalized and entry.get("expires_at", 0) > time.time():
+                self.local.put(normalized, entry["a"], entry["expires_at"])
+                self.hits += 1
+                self.shared_hits += 1
+                return entry["a"]
+        self.misses += 1
+        return None
+
+    def put(self, question, answer):
+        normalized = normalize_query(question)
+        if normalized is None or not answer:
+            return
+        expires_at = time.time() + self.ttl
+        self.local.put(normalized, answer, expires_at)
+        if self.shared_store is not None:
+            try:
+                self.shared_store.put(self._shared_key(normalized), {"q": normalized, "a": answer, "expires_at": expires_at})
+            except Exception as e:
+                logger.warning(f"No se pudo escribir en la caché compartida: {str(e)}")
+
+    def stats(self):
+        """Contadores de aciertos y fallos (para logs y planificación de capacidad)"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self.local),
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+        }
@@ -0,0 +1,145 @@
+# async_transport.py
+# Transporte HTTP asíncrono del motor asyncio (PROVIDER_ENGINE = "asyncio"). Un único event loop
+# corre en un hilo en segundo plano y se reutiliza entre invocaciones "warm" (Lambda congela el
+# hilo junto con el proceso); sobre él, un httpx.AsyncClient con pool keep-alive compartido por
+# todos los proveedores. Las peticiones se lanzan con submit(), que devuelve un
+# concurrent.futures.Future: cancelarlo aborta la petición en vuelo y cierra su conexión.
+# httpx es una dependencia opcional y se importa al crear el motor.
+
+import asyncio
+import logging
+import threading
+
+from config import HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES, HTTP_IDLE_TIMEOUT
+from streaming import StreamReader
+
+logger = logging.getLogger(__name__)
+
+httpx = None
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def load_httpx():
+    """Importa httpx la primera vez que se necesita y devuelve el módulo (ImportError si no está instalado)"""
+    global httpx
+    if httpx is None:
+        import httpx as httpx_module
+        httpx = httpx_module
+    return httpx
+
+
+class BufferedResponse:
+    """
+    Respuesta httpx ya leída con la interfaz de requests que usan los procesadores de respuesta
+    (ok, status_code, text, json()).
+    """
+
+    __slots__ = ("_response",)
+
+    def __init__(self, response):
+        self._response = response
+
+    @property
+    def ok(self):
+        return self._response.status_code < 400
+
+    @property
+    def status_code(self):
+        return self._response.status_code
+
+    @property
+    def text(self):
+        return self._response.text
+
+    def json(self):
+        # httpx usa json.loads: los errores son json.JSONDecodeError, igual que con requests
+        return self._response.json()
+
+
+class AsyncEngine:
+    """Event loop en un hilo propio más el cliente HTTP asíncrono que vive en él"""
+
+    def __init__(self, max_connections=HTTP_POOL_MAXSIZE * 4, max_keepalive=HTTP_POOL_MAXSIZE,
+                 retries=HTTP_MAX_RETRIES, keepalive_expiry=HTTP_IDLE_TIMEOUT):
+        load_httpx()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="async-engine", daemon=True)
+        self._thread.start()
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                              keepalive_expiry=keepalive_expiry)
+        # Igual que en http_transport, solo se reintentan los fallos al conectar
+        transport = httpx.AsyncHTTPTransport(retries=retries, limits=limits)
+        self.client = self.run(self._create_client(transport))
+
+    @staticmethod
+    async def _create_client(transport):
+        return httpx.AsyncClient(transport=transport)
+
+    def submit(self, coroutine):
+        """Programa la corrutina en el loop del motor y devuelve un concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None):
+        """Ejecuta la corrutina en el loop del motor y espera su resultado"""
+        return self.submit(coroutine).result(timeout)
+
+    async def send(self, url, headers, body, timeout, stream=False, total_timeout=None):
+        """
+        POST con el pool compartido; si stream es True la respuesta queda abierta para leerla por trozos.
+        timeout puede ser un número o, como en requests, una tupla (conexión, lectura). total_timeout
+        (solo sin stream) limita la respuesta completa, como en http_transport.post
+        """
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        request = self.client.build_request("POST", url, headers=headers, content=body, timeout=timeout)
+        if total_timeout is None or stream:
+            return await self.client.send(request, stream=stream)
+        try:
+            return await asyncio.wait_for(self.client.send(request), total_timeout)
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout(f"Respuesta tras {total_timeout:.1f}s: {url}", request=request) from None
+
+    def close(self):
+        """Cierra el cliente y detiene el loop (útil en pruebas y benchmarks)"""
+        self.run(self.client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+async def read_stream_async(response, extract_delta, started_at, should_stop=None, first_token_timeout=None):
+    """Equivalente asíncrono de streaming.read_stream para una respuesta httpx abierta en streaming"""
+    reader = StreamReader(extract_delta, started_at, should_stop, first_token_timeout)
+    try:
+        async for chunk in response.aiter_bytes():
+            if reader.feed(chunk):
+                break
+        else:
+            reader.flush()
+    finally:
+        # Cerrar libera la conexión; si cortamos antes de tiempo, el proveedor deja de generar
+        await response.aclose()
+    return reader.finish()
+
+
+def get_engine():
+    """Motor compartido por el contenedor; se crea en la primera llamada"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AsyncEngine()
+                logger.info("Motor asyncio iniciado")
+    return _engine
+
+
+def close_engine():
+    """Detiene el motor compartido, si existe"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+            _engine = None
@@ -1,6 +1,7 @@
 # config.py
 # Archivo de configuración para las API keys y otros parámetros sensibles
 
+import os
 
 API_KEY = 'OPENAI_API_KEY'
 GITHUB_TOKEN = 'GITHUB_TOKEN'
@@ -8,6 +9,7 @@ OPENROUTER_API_KEY = 'OPENROUTER_API_KEY'
 CEREBRAS_API_KEY = 'CEREBRAS_API_KEY'
 GEMINI_API_KEY = 'GEMINI_API_KEY'
 DEEPINFRA_API_KEY = 'DEEPINFRA_API_KEY'
+DEEPSEEK_API_KEY = 'DEEPSEEK_API_KEY'
 MOONSHOT_API_KEY = 'MOONSHOT_API_KEY'
 CHUTES_API_KEY = 'CHUTES_API_KEY'
 GROQ_API_KEY = 'GROQ_API_KEY'
@@ -18,3 +20,178 @@ FORCED_PROVIDER = None  # Ejemplo: 'openai', 'cerebras_llama4_scout', 'deepseek_
 # Personalización de país y tono
 COUNTRY = "Colombia"
 TONE = "colombiano"
+
+# Transporte HTTP: pool de conexiones keep-alive reutilizado entre invocaciones "warm"
+HTTP_POOL_MAXSIZE = 8          # Conexiones keep-alive por host (una Session por URL base)
+HTTP_MAX_RETRIES = 1           # Reintentos solo ante fallos de conexión (la petición no llegó a enviarse)
+HTTP_RETRY_BACKOFF = 0.1       # Segundos base de espera entre reintentos
+HTTP_IDLE_TIMEOUT = 50         # Segundos sin uso tras los cuales se descartan las conexiones de un host
+
+# Estrategia de fallback entre proveedores:
+#   "sequential": prueba un proveedor tras otro (comportamiento clásico)
+#   "hedged": si el proveedor principal no responde en HEDGE_DELAY segundos, lanza otro en paralelo
+#             y se queda con la primera respuesta válida
+FALLBACK_MODE = "sequential"
+HEDGE_DELAY = 1.5              # Segundos de espera antes de lanzar la siguiente petición en paralelo
+HEDGE_MAX_IN_FLIGHT = 2        # Peticiones simultáneas como máximo (2 o 3)
+HEDGE_MAX_ATTEMPTS = 4         # Proveedores distintos a intentar por turno (igual que 1 + 3 fallbacks)
+# Dominios de fallo: tras un error de conexión o 5xx el siguiente proveedor se busca primero en
+# otro host y con otro modelo subyacente (provider_catalog.base_model), para no repetir el mismo
+# host caído ni el mismo modelo servido con otro nombre. False elige entre todos los no fallados
+FALLBACK_AVOID_FAILURE_DOMAINS = True
+
+# Motor de peticiones a los proveedores:
+#   "sync": requests con un hilo por petición en paralelo (comportamiento clásico)
+#   "asyncio": un event loop compartido con un cliente httpx asíncrono (dependencia opcional);
+#              en modo hedged las peticiones perdedoras se cancelan en vuelo
+PROVIDER_ENGINE = "sync"
+
+# Presupuesto de tiempo por turno (Alexa corta la respuesta a los ~8 segundos)
+TURN_BUDGET = 7.0              # Segundos disponibles desde que llega la petición
+TURN_RESPONSE_RESERVE = 0.5    # Segundos reservados para construir y enviar la respuesta
+MIN_ATTEMPT_TIME = 1.0         # No se lanza un proveedor si quedan menos segundos que esto
+
+# Timeouts por proveedor aprendidos de la latencia observada (adaptive_timeouts.py)
+ADAPTIVE_TIMEOUTS_ENABLED = True  # False: timeout de lectura del catálogo (DEFAULT_TIMEOUT)
+TIMEOUT_WINDOW = 50            # Latencias recientes que se guardan por ventana
+TIMEOUT_QUANTILE = 0.99        # Cuantil de las latencias recientes que se toma como base
+TIMEOUT_FACTOR = 1.5           # Margen sobre el cuantil
+TIMEOUT_MIN_SAMPLES = 5        # Mediciones necesarias en una ventana (proveedor, familia y clase, o clase)
+TIMEOUT_MIN = 1.0              # Segundos; nunca se aprende un timeout menor
+TIMEOUT_MAX = 20.0             # Segundos; nunca se aprende un timeout mayor
+TIMEOUT_CONNECT = 2.0          # Segundos para establecer la conexión (TCP + TLS)
+
+# Salud de proveedores y circuit breaker (compartido por todas las sesiones del contenedor)
+HEALTH_WINDOW = 20             # Resultados recientes que se guardan por proveedor
+HEALTH_MIN_CALLS = 4           # Mínimo de resultados antes de evaluar la tasa de fallos
+HEALTH_FAILURE_RATE = 0.5      # Tasa de fallos que abre el circuito
+HEALTH_CONSECUTIVE_FAILURES = 3  # Fallos seguidos que abren el circuito
+HEALTH_OPEN_SECONDS = 60       # Segundos con el circuito abierto antes de enviar una sonda (half-open)
+HEALTH_SYNC_INTERVAL = 5       # Segundos mínimos entre sincronizaciones con el estado compartido
+
+# Estado compartido entre contenedores "warm": None (solo en memoria del contenedor), "memory",
+# "file" (archivo JSON, p. ej. en un volumen EFS) o "dynamodb" (tabla con clave de partición "pk")
+SHARED_STATE_BACKEND = None
+SHARED_STATE_PATH = "/tmp/alexa_chatgpt_state.json"
+SHARED_STATE_TABLE = "alexa-chatgpt-state"
+
+# Límites de uso por API key (rate_limits.py)
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_RPM = {"groq": 30, "cerebras": 30, "gemini": 15}   # Peticiones por minuto por familia
+RATE_LIMIT_PER_MODEL = ("groq", "cerebras", "gemini")  # Familias que limitan por modelo y no por key
+RATE_LIMIT_DEFAULT_COOLDOWN = 20   # Segundos a evitar la key tras un 429 sin Retry-After ni reinicio
+RATE_LIMIT_MAX_COOLDOWN = 3600     # Tope de un enfriamiento (cabeceras absurdas o cuotas diarias)
+RATE_LIMIT_SYNC_INTERVAL = 5       # Segundos mínimos entre sincronizaciones con el estado compartido
+
+# Cuota diaria de los modelos gratuitos ":free" (free_quota.py)
+FREE_QUOTA_ENABLED = True
+FREE_QUOTA_PER_KEY = {"openrouter": 50}   # Peticiones por día (UTC) por key
+FREE_QUOTA_PER_MODEL = {}          # Modelo (p. ej. "deepseek/deepseek-r1:free") -> peticiones por día
+FREE_QUOTA_BACKEND = "file"        # Contadores: "file" (FREE_QUOTA_PATH), "shared", "memory" o None
+FREE_QUOTA_PATH = "/tmp/alexa_chatgpt_free_quota.json"
+FREE_QUOTA_SYNC_INTERVAL = 5       # Segundos mínimos entre escrituras de los contadores
+
+# Selección de proveedor según la latencia observada (FORCED_PROVIDER sigue teniendo prioridad)
+#   "p2c": elige dos al azar y se queda con el de menor latencia esperada
+#   "softmax": probabilidad proporcional a exp(-latencia / SELECTION_TEMPERATURE)
+#   "random": elección uniforme (comportamiento clásico)
+SELECTION_STRATEGY = "p2c"
+SELECTION_EXPLORATION_RATE = 0.1   # Probabilidad de elegir al azar para seguir midiendo proveedores poco usados
+SELECTION_EWMA_ALPHA = 0.3         # Peso de la última observación en la media móvil exponencial
+SELECTION_PRIOR_LATENCY = 3.0      # Latencia supuesta (s) de un proveedor sin mediciones
+SELECTION_FAILURE_PENALTY = 5.0    # Segundos que se suman a la latencia observada cuando el intento falla
+SELECTION_TEMPERATURE = 1.0        # Temperatura (s) de la estrategia softmax
+
+# Streaming (SSE): proveedores cuyo nombre empieza por alguno de estos prefijos piden la respuesta
+# en streaming. Incluye "gemini" para usar streamGenerateContent en gemini_20 / gemini_25.
+STREAMING_PROVIDER_PREFIXES = ["chutes"]
+STREAM_MAX_CHARS = 1200        # Se deja de leer el stream cuando ya hay este texto hablable (~200 palabras)
+
+# Presupuesto de generación acorde a una respuesta hablada (el prompt pide 120-180 palabras)
+SPOKEN_TARGET_WORDS = 150      # En streaming, se corta en el primer fin de oración tras estas palabras
+GENERATION_MAX_TOKENS = {      # Límite de tokens por clase de modelo
+    "standard": 400,           # ~180 palabras en español caben holgadamente
+    "reasoning": 800,          # Los modelos de razonamiento gastan tokens en <think> antes de responder
+}
+GENERATION_STOP_SEQUENCES = ["\n\n\n"]  # Solo modelos estándar; suele preceder a secciones añadidas al final
+REASONING_EFFORT = "low"       # reasoning_effort para modelos o3/o4 en la API de OpenAI y GitHub
+GEMINI_THINKING_BUDGET = 0     # Tokens de "thinking" para Gemini 2.5 (0 lo desactiva)
+
+# Ventana de conversación: tokens (estimados) de preguntas y respuestas previas que se envían por
+# turno, llenados desde el turno más reciente. Un turno típico (pregunta + respuesta hablada)
+# ronda los 250 tokens.
+HISTORY_TOKEN_BUDGET = {       # Por clase de modelo
+    "standard": 1500,
+    "reasoning": 1000,         # Prompts más cortos para compensar el tiempo de razonamiento
+}
+HISTORY_MAX_TURNS = 20         # Turnos guardados como máximo en la sesión
+
+# Resumen incremental de conversaciones largas (conversation_summary.py)
+SUMMARY_ENABLED = False
+SUMMARY_TRIGGER_TOKENS = 3000  # Tokens (estimados) del historial guardado a partir de los cuales se resume
+SUMMARY_KEEP_TURNS = 3         # Turnos recientes que se conservan literales
+SUMMARY_MAX_WORDS = 80         # Extensión pedida para el resumen
+SUMMARY_MAX_TOKENS = 200       # Límite de generación del resumen
+SUMMARY_PROVIDER = None        # None: el estándar más rápido observado que no sea ":free"
+SUMMARY_GRACE = 0.3            # Segundos que se espera el resumen una vez lista la respuesta
+
+# Estado de la conversación en los atributos de sesión de Alexa:
+#   "zlib": historial, proveedores y resumen en un único texto comprimido y versionado
+#   "json": atributos en JSON plano (comportamiento clásico); los blobs recibidos se siguen leyendo
+SESSION_CODEC = "zlib"
+SESSION_COMPRESSION_LEVEL = 1  # Nivel de zlib (1 = más rápido, 9 = más pequeño)
+
+# Memoria entre sesiones por usuario (resumen, últimos turnos y proveedor), leída al abrir la skill
+# y escrita al terminar la sesión: None (desactivada), "sqlite" (archivo local, para pruebas) o
+# "dynamodb" (tabla con clave de partición "id")
+USER_MEMORY_BACKEND = None
+USER_MEMORY_SQLITE_PATH = "/tmp/alexa_chatgpt_memory.db"
+USER_MEMORY_TABLE = "alexa-chatgpt-memory"
+USER_MEMORY_TTL_DAYS = 7       # Días tras los cuales se olvida la conversación anterior
+USER_MEMORY_MAX_TURNS = 2      # Últimos turnos literales que se recuerdan además del resumen
+
+# Caché de respuestas para preguntas sin contexto de conversación (p. ej. "¿qué es la fotosíntesis?")
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_MAX_ENTRIES = 512     # Entradas en memoria del contenedor (se expulsa la menos usada)
+ANSWER_CACHE_TTL = 6 * 3600        # Segundos de validez de una respuesta
+ANSWER_CACHE_SHARED = False        # Usar también el estado compartido (SHARED_STATE_BACKEND) como segundo nivel
+
+# Caché semántica para paráfrasis de preguntas sin contexto (requiere numpy, opcional)
+SEMANTIC_CACHE_ENABLED = False
+SEMANTIC_CACHE_MAX_ENTRIES = 2000  # Filas de la matriz de vectores (memoria = filas x dimensión x 4 bytes)
+SEMANTIC_CACHE_DIM = 256           # Dimensión de los vectores de n-gramas de caracteres
+SEMANTIC_CACHE_THRESHOLD = 0.8     # Similitud coseno mínima para reutilizar una respuesta
+
+# Arranque en frío: "lazy" difiere las importaciones que no necesita cada turno (requests/urllib3
+# hasta la primera llamada a un proveedor, el pool del modo hedged, etc.); "eager" las paga
+# durante la inicialización del contenedor
+STARTUP_MODE = "lazy"
+
+# Codificación JSON de los payloads de petición: "json" (biblioteca estándar) u "orjson" (más
+# rápido, dependencia opcional; si no está instalado se usa "json")
+JSON_ENCODER = "json"
+
+# Métricas por proveedor e intent en CloudWatch Embedded Metric Format: "emf" (líneas JSON en
+# stdout, una sola escritura al final de cada invocación), "memory" (pruebas) o None
+METRICS_SINK = "emf"
+METRICS_NAMESPACE = "AlexaChatGPT"
+
+# Grabación de tráfico para reproducirlo sin conexión (benchmarks/bench_replay.py): ruta del
+# archivo JSONL donde se añaden los envelopes (sin identificadores ni tokens) y las respuestas de
+# los proveedores. None desactiva la grabación; usar solo en un alias de pruebas
+TRAFFIC_RECORD_PATH = None
+
+# Diagnóstico de rendimiento (lambda/profiling.py). Se leen de las variables de entorno de la
+# función para poder activarlos en un alias sin volver a desplegar el código.
+# PHASE_TIMING=1 registra en el log, por invocación, el tiempo de cada fase (deserialización del
+# SDK, handler, historial, codificación, red, procesado de la respuesta, estado de sesión...)
+PHASE_TIMING = os.environ.get("PHASE_TIMING", "0") == "1"
+# PROFILE_MODE: None, "cprofile" (determinista, solo el hilo que atiende la invocación) o
+# "sampling" (muestrea las pilas de todos los hilos cada PROFILE_SAMPLING_INTERVAL segundos)
+PROFILE_MODE = os.environ.get("PROFILE_MODE") or None
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0.01"))  # Fracción de invocaciones perfiladas
+PROFILE_SAMPLING_INTERVAL = 0.005
+# "log" escribe un resumen compacto (funciones o pilas más costosas) en el log; cualquier otro
+# valor es un directorio local (p. ej. /tmp/profiles) donde se guarda un archivo por invocación
+PROFILE_OUTPUT = os.environ.get("PROFILE_OUTPUT", "log")
+PROFILE_TOP = 15                   # Líneas del resumen en el log
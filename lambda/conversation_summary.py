@@ -0,0 +1,50 @@
+# conversation_summary.py
+# Resumen incremental de conversaciones largas. Cuando el historial guardado en la sesión pasa
+# de SUMMARY_TRIGGER_TOKENS, los turnos más antiguos se resumen (junto con el resumen anterior)
+# en un texto breve que se guarda en la sesión y se envía antes de los turnos recientes, en
+# lugar de descartarlos y que el modelo pierda el contexto. Mientras está activo, el historial
+# guardado no se recorta al presupuesto de tokens de la ventana: lo acota el propio resumen.
+# El resumen conserva contexto, no ahorra tokens: la ventana ya limita los prompts de respuesta y
+# cada resumen vuelve a enviar los turnos que condensa (bench_summary.py da el balance neto). Por
+# eso viene desactivado y, activado, resume pocas veces y conserva varios turnos literales.
+
+from config import SUMMARY_TRIGGER_TOKENS, SUMMARY_KEEP_TURNS, SUMMARY_MAX_WORDS
+from history_window import turn_tokens
+
+SUMMARY_LABEL = "Resumen de la conversación anterior con el usuario: "
+
+
+def turns_to_fold(chat_history, trigger_tokens=SUMMARY_TRIGGER_TOKENS, keep_turns=SUMMARY_KEEP_TURNS):
+    """Número de turnos más antiguos que hay que resumir (0 si el historial no pasa el umbral)"""
+    if len(chat_history) <= keep_turns:
+        return 0
+    total = sum(turn_tokens(question, answer) for question, answer in chat_history)
+    if total <= trigger_tokens:
+        return 0
+    return len(chat_history) - keep_turns
+
+
+def summary_messages(previous_summary, turns, max_words=SUMMARY_MAX_WORDS):
+    """Mensajes (formato OpenAI) que piden integrar los turnos en el resumen anterior"""
+    lines = []
+    if previous_summary:
+        lines.append(f"Resumen previo: {previous_summary}")
+        lines.append("")
+    for question, answer in turns:
+        lines.append(f"Usuario: {question}")
+        lines.append(f"Asistente: {answer}")
+    return [
+        {"role": "system", "content": (
+            "Resumes conversaciones para que un asistente de voz pueda continuarlas. Escribe en español, "
+            f"en un solo párrafo de no más de {max_words} palabras, los temas tratados, los datos "
+            "concretos mencionados (nombres, fechas, cifras) y lo que el usuario quiere saber. "
+            "No añadas información nueva ni comentarios.")},
+        {"role": "user", "content": "\n".join(lines)},
+    ]
+
+
+def summary_message(summary, format_type="standard"):
+    """Mensaje con el resumen que se envía antes de los turnos recientes"""
+    if format_type == "gemini":
+        return {"role": "user", "parts": [{"text": SUMMARY_LABEL + summary}]}
+    return {"role": "system", "content": SUMMARY_LABEL + summary}
@@ -0,0 +1,188 @@
+# free_quota.py
+# Cuota diaria de los modelos gratuitos (":free" de OpenRouter). OpenRouter limita las peticiones
+# diarias a modelos gratuitos por API key (FREE_QUOTA_PER_KEY: 50 al día, 1000 si la cuenta tiene
+# créditos) y se pueden configurar también topes por modelo (FREE_QUOTA_PER_MODEL). Se cuentan las
+# peticiones enviadas por key y por modelo en el día (UTC) y, al llegar al tope o recibir un 429
+# de límite diario, la key o el modelo se dan por agotados hasta el reinicio, así ProviderManager
+# deja de elegirlos y vuelve a hacerlo en cuanto la cuota se reinicia. Los contadores se guardan
+# en un StateStore y se exponen con snapshot() y como métricas: con "file" (por defecto, en /tmp)
+# sobreviven mientras el contenedor siga "warm"; con "shared" (SHARED_STATE_BACKEND) se comparten
+# entre contenedores.
+
+import datetime
+import logging
+import threading
+import time
+
+from config import (FREE_QUOTA_ENABLED, FREE_QUOTA_PER_KEY, FREE_QUOTA_PER_MODEL, FREE_QUOTA_BACKEND, FREE_QUOTA_PATH,
+                    FREE_QUOTA_SYNC_INTERVAL)
+from state_store import InMemoryStateStore, FileStateStore
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "free_quota"
+
+# Mensajes de los 429 por cuota diaria ("Rate limit exceeded: free-models-per-day")
+_DAILY_MARKERS = ("per-day", "per day", "daily")
+
+
+def quota_day(now=None):
+    """Día de la cuota (UTC), que es cuando OpenRouter reinicia el contador"""
+    return datetime.datetime.fromtimestamp(now or time.time(), datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+def seconds_until_reset(now=None):
+    now = now or time.time()
+    today = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).date()
+    midnight = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time(),
+                                         tzinfo=datetime.timezone.utc)
+    return midnight.timestamp() - now
+
+
+def create_quota_store(backend=FREE_QUOTA_BACKEND, shared_store=None):
+    """"file" (FREE_QUOTA_PATH, local del contenedor), "memory", "shared" (el SHARED_STATE_BACKEND) o None"""
+    if backend == "file":
+        return FileStateStore(FREE_QUOTA_PATH)
+    if backend == "memory":
+        return InMemoryStateStore()
+    if backend == "shared":
+        return shared_store
+    return None
+
+
+class FreeQuotaTracker:
+    """Peticiones del día por key y por modelo gratuito, con los agotados hasta el reinicio"""
+
+    def __init__(self, store=None, enabled=FREE_QUOTA_ENABLED, per_key=FREE_QUOTA_PER_KEY,
+                 per_model=FREE_QUOTA_PER_MODEL):
+        self.store = store
+        self.enabled = enabled
+        self.per_key = per_key
+        self.per_model = per_model
+        self._lock = threading.Lock()
+        self._day = quota_day()
+        self._counts = {}
+        # Peticiones aún no publicadas en el store (se suman a lo que hayan contado otros contenedores)
+        self._pending = {}
+        self._exhausted = set()
+        self._last_sync = 0.0
+        if enabled:
+            self._sync(force=True)
+
+    @staticmethod
+    def counters_for(spec):
+        """(contador de la key, contador del modelo) de un proveedor gratuito"""
+        return spec.family, f"{spec.family}:{spec.model}"
+
+    def limit_for(self, counter):
+        family, _, model = counter.partition(":")
+        return self.per_model.get(model) if model else self.per_key.get(family)
+
+    def _roll_day(self):
+        day = quota_day()
+        if day != self._day:
+            logger.info(f"Cuota gratuita reiniciada ({self._day} -> {day})")
+            self._day, self._counts, self._pending, self._exhausted = day, {}, {}, set()
+
+    def _is_exhausted(self, counter):
+        limit = self.limit_for(counter)
+        return counter in self._exhausted or (limit is not None and self._counts.get(counter, 0) >= limit)
+
+    def is_available(self, spec):
+        """False si el proveedor es gratuito y su key o su modelo agotaron la cuota de hoy"""
+        if not self.enabled or not spec.free:
+            return True
+        self._sync()
+        with self._lock:
+            self._roll_day()
+            return not any(self._is_exhausted(counter) for counter in self.counters_for(spec))
+
+    def record_request(self, spec):
+        """Cuenta una petición enviada a un modelo gratuito; devuelve las restantes de su key (o None)"""
+        if not self.enabled or not spec.free:
+            return None
+        with self._lock:
+            self._roll_day()
+            for counter in self.counters_for(spec):
+                self._counts[counter] = self._counts.get(counter, 0) + 1
+                self._pending[counter] = self._pending.get(counter, 0) + 1
+            key_counter = spec.family
+            limit = self.limit_for(key_counter)
+            remaining = None if limit is None else max(0, limit - self._counts[key_counter])
+            reached = any(self._is_exhausted(counter) for counter in self.counters_for(spec))
+        # Al agotarse, publicarlo de inmediato para que los demás contenedores dejen de usarlo
+        self._sync(force=reached)
+        return remaining
+
+    def observe(self, spec, status, body=None):
+        """Un 429 de cuota diaria agota la key (free-models-per-day) o el modelo hasta el reinicio"""
+        if not self.enabled or not spec.free or status != 429 or not body:
+            return False
+        text = body.lower()
+        if not any(marker in text for marker in _DAILY_MARKERS):
+            return False
+        key_counter, model_counter = self.counters_for(spec)
+        counter = key_counter if "free-models-per-day" in text else model_counter
+        with self._lock:
+            self._roll_day()
+            self._exhausted.add(counter)
+        logger.warning(f"Cuota gratuita agotada para {counter} (vía {spec.name}); "
+                       f"se reinicia en {seconds_until_reset() / 3600:.1f}h")
+        self._sync(force=True)
+        return True
+
+    def snapshot(self):
+        """Uso del día por key y por modelo, con tope, restantes y si está agotado (planificación de capacidad)"""
+        with self._lock:
+            self._roll_day()
+            counters = {}
+            for counter in sorted(set(self._counts) | self._exhausted):
+                limit = self.limit_for(counter)
+                used = self._counts.get(counter, 0)
+                counters[counter] = {"used": used, "limit": limit,
+                                     "remaining": None if limit is None else max(0, limit - used),
+                                     "exhausted": self._is_exhausted(counter)}
+            return {"day": self._day, "reset_in": round(seconds_until_reset()), "counters": counters}
+
+    def _sync(self, force=False):
+        """Suma las peticiones pendientes al documento del store y adopta lo que hayan contado otros"""
+        if self.store is None:
+            return
+        now = time.time()
+        if not force and now - self._last_sync < FREE_QUOTA_SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        try:
+            remote = self.store.get(STATE_KEY) or {}
+            with self._lock:
+                self._roll_day()
+                day = self._day
+                if remote.get("day") != day:
+                    remote = {"day": day, "counts": {}, "exhausted": []}
+                pending = dict(self._pending)
+                counts = dict(remote.get("counts", {}))
+                for counter, delta in pending.items():
+                    counts[counter] = counts.get(counter, 0) + delta
+                exhausted = self._exhausted | set(remote.get("exhausted", []))
+                document = {"day": day, "counts": counts, "exhausted": sorted(exhausted)}
+            if document != remote:
+                self.store.put(STATE_KEY, document)
+            # Las peticiones pendientes solo se dan por publicadas si put no falló; si falla se
+            # reintentan en la siguiente sincronización y el tope diario no pierde ninguna
+            with self._lock:
+                if self._day != day:
+                    return
+                for counter, delta in pending.items():
+                    left = self._pending.get(counter, 0) - delta
+                    if left > 0:
+                        self._pending[counter] = left
+                    else:
+                        self._pending.pop(counter, None)
+                # Lo publicado más lo contado mientras se escribía
+                for counter, delta in self._pending.items():
+                    counts[counter] = counts.get(counter, 0) + delta
+                self._counts = counts
+                self._exhausted |= exhausted
+        except Exception as e:
+            # La cuota es una optimización: nunca debe romper el turno
+            logger.warning(f"No se pudo sincronizar la cuota gratuita: {str(e)}")
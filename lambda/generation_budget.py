@@ -0,0 +1,92 @@
+# generation_budget.py
+# Límites de generación pensados para respuestas habladas: tokens máximos y secuencias de parada
+# por clase de modelo, y el punto de corte de un stream en el primer fin de oración tras
+# alcanzar el número de palabras objetivo.
+
+import re
+
+from config import GENERATION_MAX_TOKENS, GENERATION_STOP_SEQUENCES, SPOKEN_TARGET_WORDS
+
+# Modelos que razonan antes de responder (<think> o tokens de razonamiento ocultos)
+_REASONING_MODEL = re.compile(r'deepseek-r1|r1-distill|r1t-chimera|qwq|mai-ds-r1|(^|/)o[34](-\w+)?$', re.IGNORECASE)
+_O_SERIES_MODEL = re.compile(r'(^|/)o[34](-\w+)?$')
+# Fin de oración: signo de cierre seguido de espacio/salto de línea (o comillas de cierre)
+_SENTENCE_END = re.compile(r'[.!?…]["»”)]?(?=\s)')
+_WORD = re.compile(r'\S+')
+
+
+def model_class(model):
+    """Clasifica el modelo en "reasoning" o "standard" a partir de su nombre"""
+    return "reasoning" if _REASONING_MODEL.search(model) else "standard"
+
+
+def is_o_series(model):
+    """Modelos o3/o4 de OpenAI: no admiten temperature y usan max_completion_tokens"""
+    return bool(_O_SERIES_MODEL.search(model))
+
+
+def max_tokens_for(model):
+    return GENERATION_MAX_TOKENS[model_class(model)]
+
+
+def stop_sequences_for(model):
+    """Secuencias de parada; los modelos de razonamiento no las reciben para no cortar su <think>"""
+    if model_class(model) == "reasoning":
+        return []
+    return list(GENERATION_STOP_SEQUENCES)
+
+
+def spoken_cutoff(text, target_words=SPOKEN_TARGET_WORDS):
+    """
+    Posición del primer fin de oración después de target_words palabras, o None si aún no se
+    alcanzó. Se usa para cerrar el stream cuando ya hay una respuesta completa para hablar.
+    """
+    words = 0
+    for match in _WORD.finditer(text):
+        words += 1
+        if words >= target_words:
+            end = _SENTENCE_END.search(text, match.start())
+            return end.end() if end else None
+    return None
+
+
+class SpokenProgress:
+    """
+    Versión incremental de spoken_cutoff para streams: recibe el texto hablable por trozos y
+    lleva la cuenta de caracteres y palabras sin volver a recorrer lo ya recibido. complete pasa
+    a True en el primer fin de oración tras target_words palabras.
+    """
+
+    def __init__(self, target_words=SPOKEN_TARGET_WORDS):
+        self.target_words = target_words
+        self.chars = 0
+        self.words = 0
+        self.complete = False
+        self._in_word = False
+        # Texto desde la palabra objetivo que aún no se revisó (o los 2 últimos caracteres, por
+        # si el fin de oración queda partido entre trozos)
+        self._tail = None
+
+    def feed(self, text):
+        """Añade texto hablable; devuelve complete"""
+        if not text or self.complete:
+            return self.complete
+        self.chars += len(text)
+        if self._tail is None:
+            for match in _WORD.finditer(text):
+                # Una palabra partida entre dos trozos se cuenta una sola vez
+                if match.start() > 0 or not self._in_word:
+                    self.words += 1
+                if self.words >= self.target_words:
+                    self._tail = text[match.start():]
+                    break
+            self._in_word = not text[-1].isspace()
+            if self._tail is None:
+                return False
+        else:
+            self._tail += text
+        if _SENTENCE_END.search(self._tail):
+            self.complete = True
+        else:
+            self._tail = self._tail[-2:]
+        return self.complete
@@ -0,0 +1,68 @@
+# history_window.py
+# Ventana de conversación por presupuesto de tokens: en lugar de enviar siempre las últimas N
+# preguntas y respuestas, se estima cuántos tokens ocupa cada turno con una aproximación local
+# (sin cargar tokenizadores) según la familia de tokenizador del modelo, y se llenan los tokens
+# disponibles desde el turno más reciente hacia atrás.
+
+import re
+
+# Caracteres por token aproximados para texto en español según la familia de tokenizador.
+# Los tokenizadores con vocabularios más grandes (o200k de OpenAI, Gemini) agrupan más caracteres.
+CHARS_PER_TOKEN = {
+    "openai": 3.6,
+    "gemini": 3.8,
+    "llama": 3.3,
+    "qwen": 3.0,
+    "deepseek": 3.1,
+    "default": 3.0,
+}
+MESSAGE_OVERHEAD_TOKENS = 4  # Rol y delimitadores de cada mensaje en la plantilla de chat
+
+_TOKENIZER_FAMILY = (
+    ("gemini", re.compile(r'gemini', re.IGNORECASE)),
+    ("openai", re.compile(r'gpt|(^|/)o[34](-\w+)?$', re.IGNORECASE)),
+    ("deepseek", re.compile(r'deepseek|mai-ds', re.IGNORECASE)),
+    ("qwen", re.compile(r'qwen|qwq', re.IGNORECASE)),
+    ("llama", re.compile(r'llama|nemotron', re.IGNORECASE)),
+)
+
+
+def tokenizer_family(model):
+    """Familia de tokenizador aproximada a partir del nombre del modelo"""
+    for family, pattern in _TOKENIZER_FAMILY:
+        if pattern.search(model):
+            return family
+    return "default"
+
+
+def estimate_tokens(text, family="default"):
+    """
+    Estimación rápida de tokens por número de caracteres según la familia de tokenizador. Se
+    calcula en cada intento para todo el historial, así que debe costar O(1) por mensaje: un
+    recorrido por palabras con expresiones regulares costaba más que construir el cuerpo entero.
+    """
+    if not text:
+        return 0
+    return max(1, int(len(text) / CHARS_PER_TOKEN.get(family, CHARS_PER_TOKEN["default"]) + 0.5))
+
+
+def turn_tokens(question, answer, family="default"):
+    """Tokens de un par pregunta/respuesta incluyendo el costo fijo de los dos mensajes"""
+    return estimate_tokens(question, family) + estimate_tokens(answer, family) + 2 * MESSAGE_OVERHEAD_TOKENS
+
+
+def pack_history(chat_history, budget, family="default"):
+    """
+    Devuelve el sufijo más largo de chat_history (turnos completos y en orden) que cabe en
+    budget tokens. Se recorre desde el turno más reciente y se para en el primero que no cabe,
+    para no dejar huecos en la conversación.
+    """
+    used = 0
+    start = len(chat_history)
+    for index in range(len(chat_history) - 1, -1, -1):
+        question, answer = chat_history[index]
+        used += turn_tokens(question, answer, family)
+        if used > budget:
+            break
+        start = index
+    return chat_history[start:]
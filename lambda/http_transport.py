@@ -0,0 +1,133 @@
+# http_transport.py
+# Capa de transporte HTTP compartida por todos los proveedores de IA.
+# Mantiene una requests.Session con pool keep-alive por URL base (esquema + host) a nivel de
+# módulo, de modo que las invocaciones "warm" de Lambda reutilizan las conexiones TCP/TLS
+# abiertas en lugar de pagar DNS + handshake en cada turno.
+# requests (y urllib3) se importan en la primera petición: los turnos que no llaman a un proveedor
+# (LaunchRequest, ayuda, respuestas en caché) no pagan esa importación en el arranque en frío.
+
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+from config import HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF, HTTP_IDLE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# URL base -> {"session": requests.Session, "last_used": float}
+_sessions = {}
+_lock = threading.Lock()
+
+# Bytes por lectura del cuerpo cuando se controla el tiempo total de la respuesta
+BODY_CHUNK_SIZE = 16 * 1024
+
+requests = None
+
+
+def load_requests():
+    """Importa requests la primera vez que se necesita y devuelve el módulo"""
+    global requests
+    if requests is None:
+        import requests as requests_module
+        requests = requests_module
+    return requests
+
+
+def base_url(url):
+    """Devuelve el esquema + host de una URL, que es la clave del pool de conexiones"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _build_session():
+    """Crea una Session con adaptador de pool y reintentos solo ante errores de conexión"""
+    load_requests()
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    # Solo se reintentan fallos al establecer la conexión: la petición no llegó al proveedor,
+    # así que no hay riesgo de pagar dos veces por la misma generación.
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url):
+    """Obtiene la Session asociada a la URL base, descartando antes las que estuvieron inactivas demasiado tiempo"""
+    key = base_url(url)
+    now = time.monotonic()
+    with _lock:
+        # El servidor (o un NAT intermedio) probablemente ya cerró esas conexiones,
+        # sobre todo tras un congelamiento del contenedor entre invocaciones
+        _close_idle_locked(now, HTTP_IDLE_TIMEOUT)
+        entry = _sessions.get(key)
+        if entry is None:
+            entry = {"session": _build_session(), "last_used": now}
+            _sessions[key] = entry
+        entry["last_used"] = now
+        return entry["session"]
+
+
+def post(url, total_timeout=None, **kwargs):
+    """
+    Envía un POST reutilizando la conexión keep-alive del host correspondiente. total_timeout
+    (segundos desde el envío, solo sin stream) limita la respuesta completa: el timeout de requests
+    se aplica a cada lectura del socket, y un servidor que envía bytes poco a poco no lo agota
+    """
+    session = get_session(url)
+    if total_timeout is None or kwargs.get("stream"):
+        return session.post(url, **kwargs)
+    deadline = time.monotonic() + total_timeout
+    kwargs["stream"] = True
+    response = session.post(url, **kwargs)
+    try:
+        # read1 (urllib3 2) devuelve lo que haya llegado; read espera a llenar el bloque, así que con
+        # urllib3 1 el tiempo total solo se comprueba cada BODY_CHUNK_SIZE bytes
+        read = getattr(response.raw, "read1", None) or response.raw.read
+        chunks = []
+        while True:
+            if time.monotonic() > deadline:
+                raise requests.exceptions.ReadTimeout(f"Respuesta incompleta tras {total_timeout:.1f}s: {url}")
+            chunk = read(BODY_CHUNK_SIZE, decode_content=True)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        # Cuerpo ya leído: text y json() funcionan igual que sin stream
+        response._content = b"".join(chunks)
+        response._content_consumed = True
+    finally:
+        # Leído entero devuelve la conexión al pool; cortado a medias la cierra
+        response.close()
+    return response
+
+
+def _close_idle_locked(now, max_idle):
+    for key in [k for k, e in _sessions.items() if now - e["last_used"] > max_idle]:
+        _sessions.pop(key)["session"].close()
+        logger.info(f"Sesión HTTP cerrada por inactividad: {key}")
+
+
+def close_idle_sessions(max_idle=HTTP_IDLE_TIMEOUT):
+    """Cierra las Sessions que llevan más de max_idle segundos sin usarse"""
+    with _lock:
+        _close_idle_locked(time.monotonic(), max_idle)
+
+
+def close_all_sessions():
+    """Cierra todas las conexiones abiertas (útil en pruebas y benchmarks)"""
+    with _lock:
+        for entry in _sessions.values():
+            entry["session"].close()
+        _sessions.clear()
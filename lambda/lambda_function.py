@@ -1,16 +1,47 @@
 from ask_sdk_core.dispatch_components import AbstractExceptionHandler
 from ask_sdk_core.dispatch_components import AbstractRequestHandler
-from ask_sdk_core.skill_builder import SkillBuilder
+from ask_sdk_core.dispatch_components import AbstractRequestInterceptor
+from ask_sdk_core.dispatch_components import AbstractResponseInterceptor
+from ask_sdk_core.skill_builder import CustomSkillBuilder
 from ask_sdk_core.handler_input import HandlerInput
 from ask_sdk_model import Response
 import ask_sdk_core.utils as ask_utils
-import requests
 import logging
 import json
 import random
 import os
 import re
+import time
+import http_transport
+import metrics
+import profiling
+from turn_deadline import TurnDeadline
+from provider_health import HealthRegistry, classify_outcome
+from rate_limits import RateLimitRegistry
+from free_quota import FreeQuotaTracker, create_quota_store
+from provider_selection import LatencySelector
+from adaptive_timeouts import TimeoutEstimator
+from provider_catalog import compile_catalog, build_indexes
+from streaming import read_stream, openai_delta, gemini_delta, speakable_text, SpeakableFilter
+from answer_cache import AnswerCache
+from generation_budget import is_o_series, stop_sequences_for, spoken_cutoff, SpokenProgress
+from state_store import create_state_store
+from request_templates import RequestTemplate, PreparedRequest, encode_json
+from history_window import pack_history, estimate_tokens
+from conversation_summary import turns_to_fold, summary_messages, summary_message
+from session_codec import load_session, store_session
+from user_memory import create_persistence_adapter, load_user_memory, restore_memory, save_user_memory
 from config import API_KEY, GITHUB_TOKEN, OPENROUTER_API_KEY, CEREBRAS_API_KEY, GEMINI_API_KEY, FORCED_PROVIDER, COUNTRY, TONE, DEEPINFRA_API_KEY, DEEPSEEK_API_KEY, MOONSHOT_API_KEY, CHUTES_API_KEY, GROQ_API_KEY
+from config import FALLBACK_MODE, FALLBACK_AVOID_FAILURE_DOMAINS, HEDGE_DELAY, HEDGE_MAX_IN_FLIGHT, HEDGE_MAX_ATTEMPTS
+from config import STREAMING_PROVIDER_PREFIXES, STREAM_MAX_CHARS
+from config import SPOKEN_TARGET_WORDS, REASONING_EFFORT, GEMINI_THINKING_BUDGET
+from config import ANSWER_CACHE_ENABLED, ANSWER_CACHE_SHARED, SEMANTIC_CACHE_ENABLED
+from config import STARTUP_MODE, PROVIDER_ENGINE, TRAFFIC_RECORD_PATH
+from config import HISTORY_TOKEN_BUDGET, HISTORY_MAX_TURNS
+from config import SUMMARY_ENABLED, SUMMARY_MAX_TOKENS, SUMMARY_PROVIDER, SUMMARY_GRACE
+
+# Solo se importa con TRAFFIC_RECORD_PATH (al final del módulo): trae hashlib y copy al arranque en frío
+traffic_recorder = None
 
 # =====================================================================
 # CONFIGURACIÓN Y CONSTANTES GLOBALES
@@ -34,12 +65,6 @@ retry_prompts = [
     "No logré obtener respuesta. ¿Quieres reintentar tu pregunta?"
 ]
 
-CONTENT_TYPE_JSON = "application/json"
-
-# Constantes para OpenRouter
-OPENROUTER_REFERER = "https://alexa-chatgpt.com"
-OPENROUTER_TITLE = "Alexa ChatGPT Skill"
-
 # IMPORTANTE: En producción, configurar estas variables
 api_key = API_KEY
 github_token = GITHUB_TOKEN
@@ -52,9 +77,6 @@ moonshot_api_key = MOONSHOT_API_KEY
 chutes_api_key = CHUTES_API_KEY
 groq_api_key = GROQ_API_KEY
 
-DEFAULT_MAX_TOKENS = 800
-DEFAULT_TIMEOUT = 7
-
 def is_valid_key(key):
     """Valida si una API_KEY es válida: no None, no vacía, no termina en API_KEY o TOKEN"""
     if key is None or key == '':
@@ -73,21 +95,17 @@ logger.setLevel(logging.INFO)
 class ProviderManager:
     """Maneja la configuración y selección de proveedores de IA"""
 
-    # URLs constantes para evitar duplicación
-    CEREBRAS_URL = "https://api.cerebras.ai/v1/chat/completions"
-    GEMINI_20_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-    GEMINI_25_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent"
-    OPENAI_URL = "https://api.openai.com/v1/chat/completions"
-    GITHUB_URL = "https://models.github.ai/inference/chat/completions"
-    DEEPINFRA_URL = "https://api.deepinfra.com/v1/openai/chat/completions"
-    OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
-    MOONSHOT_URL = "https://api.moonshot.cn/v1/chat/completions"
-    CHUTES_URL = "https://llm.chutes.ai/v1/chat/completions"
-    GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
-
     def __init__(self):
         self.providers = self._configure_providers()
         self.available_providers = self._get_available_providers()
+        self.by_host, self.by_family, self.by_model, self.by_capability = build_indexes(self.providers.values())
+        # Estado a nivel de contenedor: sobrevive entre sesiones mientras el contenedor siga "warm"
+        self.state_store = create_state_store()
+        self.health = HealthRegistry(store=self.state_store)
+        self.rate_limits = RateLimitRegistry(store=self.state_store)
+        self.free_quota = FreeQuotaTracker(store=create_quota_store(shared_store=self.state_store))
+        self.selector = LatencySelector()
+        self.timeouts = TimeoutEstimator()
 
         if not self.available_providers:
             logger.error("No hay API keys configuradas")
@@ -96,650 +114,64 @@ class ProviderManager:
         logger.info(f"Proveedores disponibles: {self.available_providers}")
 
     def _configure_providers(self):
-        """Configura la información de todos los proveedores, dividiendo por origen para mejor mantenimiento"""
-        providers = {}
-        providers.update(self._get_gemini_providers())
-        providers.update(self._get_openai_providers())
-        providers.update(self._get_github_providers())
-        providers.update(self._get_openrouter_providers())
-        providers.update(self._get_cerebras_providers())
-        providers.update(self._get_deepinfra_providers())
-        providers.update(self._get_moonshot_providers())
-        providers.update(self._get_chutes_providers())
-        providers.update(self._get_groq_providers())
-        return providers
-
-    def _get_gemini_providers(self):
-        return {
-            # Gemini 2.0 Flash (Google API directo, solo texto)
-            "gemini_20": {
-                "url": self.GEMINI_20_URL,
-                "model": "gemini-2.0-flash",
-                "get_headers": lambda key: {"Content-Type": CONTENT_TYPE_JSON},
-                "get_key": lambda: gemini_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            # Gemini 2.5 Flash Preview (Google API directo, solo texto)
-            "gemini_25": {
-                "url": self.GEMINI_25_URL,
-                "model": "gemini-2.5-flash-preview-05-20",
-                "get_headers": lambda key: {"Content-Type": CONTENT_TYPE_JSON},
-                "get_key": lambda: gemini_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-        }
-
-    def _get_openai_providers(self):
-        return {
-            "openai": {
-                "url": self.OPENAI_URL,
-                "model": "gpt-4.1-mini",
-                "get_headers": lambda key: {
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": CONTENT_TYPE_JSON
-                },
-                "get_key": lambda: api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openai_gpt4o_mini": {
-                "url": self.OPENAI_URL,
-                "model": "gpt-4o-mini",
-                "get_headers": lambda key: {
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": CONTENT_TYPE_JSON
-                },
-                "get_key": lambda: api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openai_o4_mini": {
-                "url": self.OPENAI_URL,
-                "model": "o4-mini",
-                "get_headers": lambda key: {
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": CONTENT_TYPE_JSON
-                },
-                "get_key": lambda: api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openai_o3_mini": {
-                "url": self.OPENAI_URL,
-                "model": "o3-mini",
-                "get_headers": lambda key: {
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": CONTENT_TYPE_JSON
-                },
-                "get_key": lambda: api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-        }
-
-    def _get_github_providers(self):
-        return {
-            "github": {
-                "url": self.GITHUB_URL,
-                "model": "openai/gpt-4.1-mini",
-                "get_headers": lambda key: {
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": CONTENT_TYPE_JSON
-                },
-                "get_key": lambda: github_token,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "github_openai_o4_mini": {
-                "url": self.GITHUB_URL,
-                "model": "openai/o4-mini",
-                "get_headers": lambda key: {
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": CONTENT_TYPE_JSON
-                },
-                "get_key": lambda: github_token,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "github_openai_o3_mini": {
-                "url": self.GITHUB_URL,
-                "model": "openai/o3-mini",
-                "get_headers": lambda key: {
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": CONTENT_TYPE_JSON
-                },
-                "get_key": lambda: github_token,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "github_openai_gpt4o_mini": {
-                "url": self.GITHUB_URL,
-                "model": "openai/gpt-4o-mini",
-                "get_headers": lambda key: {
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": CONTENT_TYPE_JSON
-                },
-                "get_key": lambda: github_token,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-        }
-
-    def _get_openrouter_providers(self):
-        return {
-            "openrouter": {
-                "url": self.OPENROUTER_URL,
-                "model": "meta-llama/llama-4-maverick",
-                "get_headers": lambda key: {
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": CONTENT_TYPE_JSON,
-                    "HTTP-Referer": OPENROUTER_REFERER,
-                    "X-Title": OPENROUTER_TITLE
-                },
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_deepseek_r1": {
-                "url": self.OPENROUTER_URL,
-                "model": "deepseek/deepseek-r1",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_deepseek_r1_free": {
-                "url": self.OPENROUTER_URL,
-                "model": "deepseek/deepseek-r1:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_deepseek_r1_0528": {
-                "url": self.OPENROUTER_URL,
-                "model": "deepseek/deepseek-r1-0528",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_deepseek_r1_0528_free": {
-                "url": self.OPENROUTER_URL,
-                "model": "deepseek/deepseek-r1-0528:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_deepseek_chimera": {
-                "url": self.OPENROUTER_URL,
-                "model": "tngtech/deepseek-r1t-chimera:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_qwen3_235b_free": {
-                "url": self.OPENROUTER_URL,
-                "model": "qwen/qwen3-235b-a22b:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_qwen3_235b": {
-                "url": self.OPENROUTER_URL,
-                "model": "qwen/qwen3-235b-a22b",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_microsoft_mai": {
-                "url": self.OPENROUTER_URL,
-                "model": "microsoft/mai-ds-r1:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_llama_maverick": {
-                "url": self.OPENROUTER_URL,
-                "model": "meta-llama/llama-4-maverick:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_qwen_qwq_free": {
-                "url": self.OPENROUTER_URL,
-                "model": "qwen/qwq-32b:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_qwen_qwq": {
-                "url": self.OPENROUTER_URL,
-                "model": "qwen/qwq-32b",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_deepseek_chat_v3": {
-                "url": self.OPENROUTER_URL,
-                "model": "deepseek/deepseek-chat-v3-0324",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_deepseek_chat_v3_free": {
-                "url": self.OPENROUTER_URL,
-                "model": "deepseek/deepseek-chat-v3-0324:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_google_gemini_20": {
-                "url": self.OPENROUTER_URL,
-                "model": "google/gemini-2.0-flash-001",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_google_gemini_25": {
-                "url": self.OPENROUTER_URL,
-                "model": "google/gemini-2.5-flash-preview-05-20",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_openai_gpt41_mini": {
-                "url": self.OPENROUTER_URL,
-                "model": "openai/gpt-4.1-mini",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_openai_gpt4o_mini": {
-                "url": self.OPENROUTER_URL,
-                "model": "openai/gpt-4o-mini",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_openai_o4_mini": {
-                "url": self.OPENROUTER_URL,
-                "model": "openai/o4-mini",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_nvidia_llama31_nemotron_ultra_253b_free": {
-                "url": self.OPENROUTER_URL,
-                "model": "nvidia/llama-3.1-nemotron-ultra-253b-v1:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_meta_llama33_70b_instruct_free": {
-                "url": self.OPENROUTER_URL,
-                "model": "meta-llama/llama-3.3-70b-instruct:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "openrouter_meta_llama31_405b_free": {
-                "url": self.OPENROUTER_URL,
-                "model": "meta-llama/llama-3.1-405b:free",
-                "get_headers": self._get_openrouter_headers,
-                "get_key": lambda: openrouter_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-        }
-
-    def _get_cerebras_providers(self):
-        return {
-            "cerebras": {
-                "url": self.CEREBRAS_URL,
-                "model": "llama-4-scout-17b-16e-instruct",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: cerebras_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "cerebras_llama4_scout": {
-                "url": self.CEREBRAS_URL,
-                "model": "llama-4-scout-17b-16e-instruct",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: cerebras_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "cerebras_llama33_70b": {
-                "url": self.CEREBRAS_URL,
-                "model": "llama-3.3-70b",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: cerebras_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "cerebras_qwen3_32b": {
-                "url": self.CEREBRAS_URL,
-                "model": "qwen-3-32b",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: cerebras_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "cerebras_deepseek_r1_distill_llama_70b": {
-                "url": self.CEREBRAS_URL,
-                "model": "deepseek-r1-distill-llama-70b",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: cerebras_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-        }
-
-    def _get_deepinfra_providers(self):
-        return {
-            "deepinfra_deepseek_v3": {
-                "url": self.DEEPINFRA_URL,
-                "model": "deepseek-ai/DeepSeek-V3-0324",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: deepinfra_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "deepinfra_qwen_qwq_32b": {
-                "url": self.DEEPINFRA_URL,
-                "model": "Qwen/QwQ-32B",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: deepinfra_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "deepinfra_deepseek_r1": {
-                "url": self.DEEPINFRA_URL,
-                "model": "deepseek-ai/DeepSeek-R1",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: deepinfra_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "deepinfra_llama4_maverick": {
-                "url": self.DEEPINFRA_URL,
-                "model": "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: deepinfra_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "deepinfra_qwen3_32b": {
-                "url": self.DEEPINFRA_URL,
-                "model": "Qwen/Qwen3-32B",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: deepinfra_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "deepinfra_deepseek_r1_0528": {
-                "url": self.DEEPINFRA_URL,
-                "model": "deepseek-ai/DeepSeek-R1-0528",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: deepinfra_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
+        """Compila el catálogo declarativo de provider_catalog con las API keys de cada familia"""
+        keys = {
+            "gemini": gemini_api_key,
+            "openai": api_key,
+            "github": github_token,
+            "openrouter": openrouter_api_key,
+            "cerebras": cerebras_api_key,
+            "deepinfra": deepinfra_api_key,
+            "moonshot": moonshot_api_key,
+            "chutes": chutes_api_key,
+            "groq": groq_api_key,
         }
+        return compile_catalog(keys)
 
-    def _get_chutes_providers(self):
-        return {
-            "chutes_deepseek_r1_0528": {
-                "url": self.CHUTES_URL,
-                "model": "deepseek-ai/DeepSeek-R1-0528",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: chutes_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "chutes_deepseek_r1": {
-                "url": self.CHUTES_URL,
-                "model": "deepseek-ai/DeepSeek-R1",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: chutes_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "chutes_deepseek_v3": {
-                "url": self.CHUTES_URL,
-                "model": "deepseek-ai/DeepSeek-V3-0324",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: chutes_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "chutes_deepseek_chimera": {
-                "url": self.CHUTES_URL,
-                "model": "tngtech/DeepSeek-R1T-Chimera",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: chutes_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "chutes_qwen3_235b": {
-                "url": self.CHUTES_URL,
-                "model": "Qwen/Qwen3-235B-A22B",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: chutes_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "chutes_microsoft_mai": {
-                "url": self.CHUTES_URL,
-                "model": "microsoft/MAI-DS-R1-FP8",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: chutes_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            "chutes_glm4_32b": {
-                "url": self.CHUTES_URL,
-                "model": "THUDM/GLM-4-32B-0414",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: chutes_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-        }
+    def _get_available_providers(self):
+        """Determina qué proveedores están disponibles basado en las API keys válidas"""
+        # Solo agregar si la key es válida (no es None, vacía, ni valor por defecto)
+        return [name for name, spec in self.providers.items() if is_valid_key(spec.key)]
 
-    def _get_moonshot_providers(self):
-        return {
-            "moonshot": {
-                "url": self.MOONSHOT_URL,
-                "model": "moonshot-v1-8k",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: moonshot_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-        }
+    def providers_on_host(self, host):
+        """Nombres de los proveedores servidos desde un mismo host (mismo dominio de fallo)"""
+        return self.by_host.get(host, ())
 
-    def _get_groq_providers(self):
-        return {
-            # Compound Beta (Groq)
-            "groq_compound_beta": {
-                "url": self.GROQ_URL,
-                "model": "compound-beta",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: groq_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            # Compound Beta Mini (Groq)
-            "groq_compound_beta_mini": {
-                "url": self.GROQ_URL,
-                "model": "compound-beta-mini",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: groq_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            # Llama 4 Maverick (Groq)
-            "groq_llama4_maverick": {
-                "url": self.GROQ_URL,
-                "model": "meta-llama/llama-4-maverick-17b-128e-instruct",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: groq_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-            # Qwen QwQ 32B (Groq)
-            "groq_qwen_qwq_32b": {
-                "url": self.GROQ_URL,
-                "model": "qwen-qwq-32b",
-                "get_headers": self._get_bearer_headers,
-                "get_key": lambda: groq_api_key,
-                "max_tokens": DEFAULT_MAX_TOKENS,
-                "timeout": DEFAULT_TIMEOUT
-            },
-        }
+    def providers_of_model(self, model):
+        """Nombres de los proveedores que sirven un mismo modelo subyacente (base_model), en cualquier host"""
+        return self.by_model.get(model, ())
 
-    def _get_openrouter_headers(self, key):
-        """Headers estándar para OpenRouter"""
-        return {
-            "Authorization": f"Bearer {key}",
-            "Content-Type": CONTENT_TYPE_JSON,
-            "HTTP-Referer": OPENROUTER_REFERER,
-            "X-Title": OPENROUTER_TITLE
-        }
+    def providers_with_capability(self, capability):
+        """Nombres de los proveedores de una capacidad: 'standard', 'reasoning' o 'free'"""
+        return self.by_capability.get(capability, ())
 
-    def _get_bearer_headers(self, key):
-        """Headers estándar para proveedores tipo Bearer"""
-        return {
-            "Authorization": f"Bearer {key}",
-            "Content-Type": CONTENT_TYPE_JSON
-        }
+    def is_schedulable(self, provider_name):
+        """
+        El proveedor tiene el circuito cerrado (o admite sonda), su key no está limitada y, si es
+        gratuito, le queda cuota diaria
+        """
+        spec = self.providers[provider_name]
+        return (self.health.is_available(provider_name) and self.rate_limits.is_available(spec)
+                and self.free_quota.is_available(spec))
 
-    def _get_available_providers(self):
-        """Determina qué proveedores están disponibles basado en las API keys válidas"""
-        available = []
-        # Solo agregar si la key es válida (no es None, vacía, ni valor por defecto)
-        if is_valid_key(api_key):
-            available.extend([
-                "openai",
-                "openai_gpt4o_mini",
-                "openai_o4_mini",
-                "openai_o3_mini"
-            ])
-        if is_valid_key(github_token):
-            available.extend([
-                "github",
-                "github_openai_o4_mini",
-                "github_openai_o3_mini",
-                "github_openai_gpt4o_mini"
-            ])
-        if is_valid_key(openrouter_api_key):
-            available.extend([
-                # Modelos Llama
-                "openrouter",  # meta-llama/llama-4-maverick
-                "openrouter_llama_maverick",  # meta-llama/llama-4-maverick:free
-
-                # Modelos DeepSeek
-                "openrouter_deepseek_r1",  # deepseek/deepseek-r1
-                "openrouter_deepseek_r1_free",  # deepseek/deepseek-r1:free
-                "openrouter_deepseek_r1_0528",  # deepseek/deepseek-r1-0528
-                "openrouter_deepseek_r1_0528_free",  # deepseek/deepseek-r1-0528:free
-                "openrouter_deepseek_chimera",  # tngtech/deepseek-r1t-chimera:free
-                "openrouter_deepseek_chat_v3",  # deepseek/deepseek-chat-v3-0324
-                "openrouter_deepseek_chat_v3_free",  # deepseek/deepseek-chat-v3-0324:free
-
-                # Modelos Qwen
-                "openrouter_qwen3_235b",  # qwen/qwen3-235b-a22b
-                "openrouter_qwen3_235b_free",  # qwen/qwen3-235b-a22b:free
-                "openrouter_qwen_qwq_free",  # qwen/qwq-32b:free
-
-                # Modelos Microsoft
-                "openrouter_microsoft_mai",  # microsoft/mai-ds-r1:free
-
-                # Modelos OpenAI vía OpenRouter
-                "openrouter_openai_gpt41_mini",  # openai/gpt-4.1-mini
-                "openrouter_openai_gpt4o_mini",  # openai/gpt-4o-mini
-                "openrouter_openai_o4_mini",  # openai/o4-mini
-
-                # Modelos Google Gemini vía OpenRouter
-                "openrouter_google_gemini_20",  # google/gemini-2.0-flash-001
-                "openrouter_google_gemini_25",  # google/gemini-2.5-flash-preview-05-20
-
-                # Modelos NVIDIA y Meta nuevos
-                "openrouter_nvidia_llama31_nemotron_ultra_253b_free",  # nvidia/llama-3.1-nemotron-ultra-253b-v1:free
-                "openrouter_meta_llama33_70b_instruct_free",  # meta-llama/llama-3.3-70b-instruct:free
-                "openrouter_meta_llama31_405b_free",  # meta-llama/llama-3.1-405b:free
-            ])
-        if is_valid_key(gemini_api_key):
-            available.extend(["gemini_20", "gemini_25"])
-        if is_valid_key(cerebras_api_key):
-            available.extend([
-                "cerebras",
-                "cerebras_llama4_scout",
-                "cerebras_llama33_70b",
-                "cerebras_qwen3_32b",
-                "cerebras_deepseek_r1_distill_llama_70b"
-            ])
-        if is_valid_key(deepinfra_api_key):
-            available.extend([
-                "deepinfra_deepseek_v3",
-                "deepinfra_qwen_qwq_32b",
-                "deepinfra_deepseek_r1",
-                "deepinfra_llama4_maverick",
-                "deepinfra_qwen3_32b",
-                "deepinfra_deepseek_r1_0528"
-            ])
-        if is_valid_key(moonshot_api_key):
-            available.append("moonshot")
-        if is_valid_key(CHUTES_API_KEY):
-            available.extend([
-                "chutes_deepseek_r1_0528",
-                "chutes_deepseek_r1",
-                "chutes_deepseek_v3",
-                "chutes_deepseek_chimera",
-                "chutes_qwen3_235b",
-                "chutes_microsoft_mai",
-                "chutes_glm4_32b"
-            ])
-        if is_valid_key(groq_api_key):
-            available.extend([
-                "groq_compound_beta",
-                "groq_compound_beta_mini",
-                "groq_llama4_maverick",
-                "groq_qwen_qwq_32b"
-            ])
-
-        return available
+    def filter_schedulable(self, provider_names):
+        return [p for p in self.health.filter_available(provider_names)
+                if self.rate_limits.is_available(self.providers[p]) and self.free_quota.is_available(self.providers[p])]
 
     def select_random_provider(self):
         """Selecciona un proveedor aleatorio de los disponibles o el forzado si está definido"""
         if FORCED_PROVIDER and FORCED_PROVIDER in self.available_providers:
             return FORCED_PROVIDER
-        return random.choice(self.available_providers)
+        # Evitar proveedores con el circuito abierto o la key limitada, salvo que no quede ninguno
+        healthy = self.filter_schedulable(self.available_providers)
+        return self.selector.choose(healthy or self.available_providers)
 
     def get_next_provider(self, current_provider, failed_providers):
-        """Obtiene el siguiente proveedor disponible excluyendo los que han fallado"""
+        """
+        Obtiene el siguiente proveedor disponible excluyendo los que han fallado. Con
+        FALLBACK_AVOID_FAILURE_DOMAINS se prefieren, en este orden, proveedores de otro host y otro
+        modelo, de otro host, o de otro modelo que los que fallaron (o siguen en vuelo)
+        """
         available = [p for p in self.available_providers if p not in failed_providers]
         if not available:
             return None
@@ -748,12 +180,48 @@ class ProviderManager:
         if current_provider in available:
             available.remove(current_provider)
 
-        return random.choice(available) if available else None
+        candidates = self.filter_schedulable(available) or available
+        if FALLBACK_AVOID_FAILURE_DOMAINS:
+            tried = list(failed_providers) + ([current_provider] if current_provider else [])
+            candidates = self._outside_failure_domains(candidates, tried)
+        return self.selector.choose(candidates)
+
+    def _outside_failure_domains(self, candidates, tried):
+        """
+        Candidatos del primer nivel no vacío: ni el host ni el modelo de los probados, otro host,
+        otro modelo. Si todos comparten dominio con algún probado se devuelven todos.
+        """
+        hosts = {self.providers[p].host for p in tried if p in self.providers}
+        models = {self.providers[p].base_model for p in tried if p in self.providers}
+        specs = [self.providers[p] for p in candidates]
+        for keep in (lambda spec: spec.host not in hosts and spec.base_model not in models,
+                     lambda spec: spec.host not in hosts,
+                     lambda spec: spec.base_model not in models):
+            tier = [spec.name for spec in specs if keep(spec)]
+            if tier:
+                return tier
+        return candidates
 
     def get_provider_config(self, provider_name):
         """Obtiene la configuración de un proveedor específico"""
         return self.providers.get(provider_name)
 
+    def select_summary_provider(self):
+        """
+        Proveedor para resumir la conversación: SUMMARY_PROVIDER si está disponible o, si no, el de
+        menor latencia observada entre los modelos estándar con API OpenAI. Los ":free" se excluyen:
+        comparten la cuota diaria de la key con las respuestas y un resumen (aunque se descarte por
+        llegar tarde) no debe gastarla. Sin candidatos no se resume.
+        """
+        if SUMMARY_PROVIDER and SUMMARY_PROVIDER in self.available_providers:
+            return SUMMARY_PROVIDER
+        standard = set(self.providers_with_capability("standard"))
+        candidates = [p for p in self.filter_schedulable(self.available_providers)
+                      if p in standard and self.providers[p].api == "openai" and not self.providers[p].free]
+        if not candidates:
+            return None
+        return min(candidates, key=self.selector.expected_latency)
+
 # =====================================================================
 # CLASE PARA GENERAR RESPUESTAS DE IA
 # =====================================================================
@@ -761,14 +229,28 @@ class ProviderManager:
 class ResponseGenerator:
     """Maneja la generación de respuestas usando diferentes proveedores de IA"""
 
-    def __init__(self, provider_manager):
-        self.provider_manager = provider_manager
+    # Pool compartido entre invocaciones "warm" para el modo hedged. Las peticiones perdedoras
+    # no se pueden abortar a mitad de vuelo, así que se deja holgura para que terminen solas.
+    _hedge_executor = None
 
-    def generate_response(self, session_attr, new_question):
+    def __init__(self, provider_manager, answer_cache=None, semantic_cache=None):
+        self.provider_manager = provider_manager
+        self.answer_cache = answer_cache
+        self.semantic_cache = semantic_cache
+        # Plantillas de petición por proveedor, compiladas una vez por contenedor
+        self.system_prompt = self._get_system_prompt()
+        self.templates = {name: self._compile_template(provider_manager.get_provider_config(name))
+                          for name in provider_manager.available_providers}
+
+    def generate_response(self, session_attr, new_question, deadline=None):
         """
         Genera respuesta usando el proveedor actual con fallback automático en caso de error
         Devuelve (respuesta, tipo_de_error) donde tipo_de_error puede ser None, 'connection', 'other'
+        El deadline (TurnDeadline) limita el tiempo total del turno; si no se pasa, se crea uno nuevo.
         """
+        if deadline is None:
+            deadline = TurnDeadline()
+
         # Si hay un proveedor forzado, siempre usarlo
         if FORCED_PROVIDER and FORCED_PROVIDER in self.provider_manager.available_providers:
             session_attr["current_provider"] = FORCED_PROVIDER
@@ -780,25 +262,125 @@ class ResponseGenerator:
             failed_providers = session_attr.get("failed_providers", [])
 
         chat_history = session_attr.get("chat_history", [])
+        summary = session_attr.get("conversation_summary")
+
+        # Sin contexto de conversación la respuesta solo depende de la pregunta: probar las cachés
+        use_cache = not chat_history and not summary
+        if use_cache:
+            cached = self._get_cached_answer(new_question)
+            deadline.mark("cache")
+            if cached is not None:
+                return cached, None
 
         # Si no hay proveedor actual, seleccionar uno
         current_provider = self._ensure_valid_provider(session_attr, current_provider, failed_providers)
 
+        if not deadline.can_attempt():
+            return self._deadline_exhausted(deadline)
+
+        if FALLBACK_MODE == "hedged" and not (FORCED_PROVIDER and FORCED_PROVIDER in self.provider_manager.available_providers):
+            response, error_type = self._generate_hedged(session_attr, current_provider, chat_history, new_question, deadline,
+                                                         summary)
+        else:
+            response, error_type = self._generate_sequential(session_attr, current_provider, failed_providers,
+                                                             chat_history, new_question, deadline, summary)
+
+        # Si la respuesta fue exitosa, limpiar la lista de proveedores fallidos
+        if error_type is None:
+            session_attr["failed_providers"] = []
+            if use_cache:
+                self._cache_answer(new_question, remove_think_tags(response))
+
+        return response, error_type
+
+    def _get_cached_answer(self, new_question):
+        """Busca primero por pregunta normalizada exacta y después por similitud (paráfrasis)"""
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(new_question)
+            if cached is not None:
+                logger.info(f"Respuesta servida desde caché: {self.answer_cache.stats()}")
+                return cached
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.get(new_question)
+            if cached is not None:
+                logger.info(f"Respuesta servida desde caché semántica: {self.semantic_cache.stats()}")
+                if self.answer_cache is not None:
+                    # La próxima vez esta misma formulación acierta sin calcular vectores
+                    self.answer_cache.put(new_question, cached)
+                return cached
+        return None
+
+    def _cache_answer(self, new_question, answer):
+        if self.answer_cache is not None:
+            self.answer_cache.put(new_question, answer)
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(new_question, answer)
+
+    def start_fold(self, session_attr, deadline):
+        """
+        Si el historial de la sesión pasó el umbral, lanza en paralelo a la respuesta el resumen de
+        los turnos más antiguos (junto con el resumen anterior). Devuelve lo que necesita
+        finish_fold, o None si no hay nada que resumir.
+        """
+        chat_history = session_attr.get("chat_history", [])
+        count = turns_to_fold(chat_history)
+        if not count or not deadline.can_attempt():
+            return None
+        provider_name = self.provider_manager.select_summary_provider()
+        if not provider_name:
+            return None
+        provider = self.provider_manager.get_provider_config(provider_name)
+        data = {
+            "model": provider.model,
+            "messages": summary_messages(session_attr.get("conversation_summary"), chat_history[:count]),
+            "max_tokens": SUMMARY_MAX_TOKENS,
+            "temperature": 0.2,
+        }
+        future = self._submit_attempt(provider_name, None, None, deadline, custom_data=data)
+        return future, provider_name, count
+
+    def finish_fold(self, session_attr, pending, deadline):
+        """
+        Espera el resumen lanzado por start_fold, ya con la respuesta lista, como mucho SUMMARY_GRACE
+        segundos (y nunca más de lo que queda del turno): un proveedor de resúmenes lento no debe
+        retrasar la respuesta. Lo guarda en session_attr["conversation_summary"] y quita del
+        historial los turnos resumidos. Si falla o no llega a tiempo, el historial se deja como estaba
+        y se reintenta en otro turno.
+        """
+        if pending is None:
+            return False
+        future, provider_name, count = pending
+        try:
+            summary, error_type = future.result(timeout=min(SUMMARY_GRACE, deadline.remaining()))
+        except Exception as e:
+            # Con el motor asyncio se cancela en vuelo; con hilos termina en segundo plano y se descarta
+            future.cancel()
+            logger.warning(f"El resumen de la conversación con {provider_name} no llegó a tiempo: {type(e).__name__}")
+            return False
+        summary = remove_think_tags(summary) if error_type is None else None
+        if not summary:
+            logger.warning(f"No se pudo resumir la conversación con {provider_name}: {error_type}")
+            return False
+        session_attr["conversation_summary"] = summary
+        session_attr["chat_history"] = session_attr["chat_history"][count:]
+        logger.info(f"Conversación resumida con {provider_name}: {count} turnos en {len(summary)} caracteres")
+        return True
+
+    def _generate_sequential(self, session_attr, current_provider, failed_providers, chat_history, new_question, deadline,
+                             summary=None):
+        """Prueba el proveedor actual y, si falla, hace fallback secuencial a otros"""
         logger.info(f"Intentando con proveedor principal: {current_provider}")
 
         # Intentar con el proveedor actual
-        response, error_type = self._try_provider(current_provider, chat_history, new_question)
+        response, error_type = self._try_provider(current_provider, chat_history, new_question, deadline, summary)
 
         logger.info(f"Resultado del proveedor {current_provider}: error_type={error_type}, respuesta_vacia={not response or not response.strip()}")
 
         # Hacer fallback si hay error de conexión o respuesta vacía
         if ((error_type == "connection" or not response or not response.strip()) and current_provider not in failed_providers):
             if not (FORCED_PROVIDER and FORCED_PROVIDER in self.provider_manager.available_providers):
-                response, error_type = self._handle_fallback(session_attr, current_provider, chat_history, new_question)
-
-        # Si la respuesta fue exitosa, limpiar la lista de proveedores fallidos
-        if error_type is None:
-            session_attr["failed_providers"] = []
+                response, error_type = self._handle_fallback(session_attr, current_provider, chat_history, new_question,
+                                                             deadline, summary)
 
         return response, error_type
 
@@ -808,10 +390,13 @@ class ResponseGenerator:
         if FORCED_PROVIDER and FORCED_PROVIDER in self.provider_manager.available_providers:
             session_attr["current_provider"] = FORCED_PROVIDER
             return FORCED_PROVIDER
-        if not current_provider or current_provider in failed_providers:
-            available = [p for p in self.provider_manager.available_providers if p not in failed_providers]
-            if available:
-                current_provider = random.choice(available)
+        if (not current_provider or current_provider in failed_providers
+                or current_provider not in self.provider_manager.providers
+                or not self.provider_manager.is_schedulable(current_provider)):
+            # Proveedor ausente, fallido en esta sesión, con el circuito abierto o con la key limitada
+            next_provider = self.provider_manager.get_next_provider(None, failed_providers)
+            if next_provider:
+                current_provider = next_provider
                 session_attr["current_provider"] = current_provider
             else:
                 # Si todos han fallado, reiniciar la lista de fallos y intentar de nuevo
@@ -821,7 +406,7 @@ class ResponseGenerator:
 
         return current_provider
 
-    def _handle_fallback(self, session_attr, current_provider, chat_history, new_question):
+    def _handle_fallback(self, session_attr, current_provider, chat_history, new_question, deadline, summary=None):
         """Maneja el fallback a otros proveedores en caso de error"""
         # Si hay FORCED_PROVIDER, no hacer fallback
         if FORCED_PROVIDER and FORCED_PROVIDER in self.provider_manager.available_providers:
@@ -833,12 +418,15 @@ class ResponseGenerator:
 
         # Intentar hasta 3 proveedores diferentes
         for attempt in range(3):
+            if not deadline.can_attempt():
+                return self._deadline_exhausted(deadline)
+
             next_provider = self.provider_manager.get_next_provider(current_provider, session_attr["failed_providers"])
 
             if next_provider:
                 session_attr["current_provider"] = next_provider
                 logger.info(f"Fallback intento {attempt + 1}: Cambiando a proveedor: {next_provider}")
-                response, error_type = self._try_provider(next_provider, chat_history, new_question)
+                response, error_type = self._try_provider(next_provider, chat_history, new_question, deadline, summary)
                 logger.info(f"Resultado del fallback {next_provider}: error_type={error_type}")
 
                 if error_type is None:
@@ -855,41 +443,194 @@ class ResponseGenerator:
                 break
 
         # Si aún hay error después de todos los intentos
+        return self._all_providers_failed(session_attr)
+
+    def _all_providers_failed(self, session_attr):
+        """Reinicia el estado de proveedores y devuelve el mensaje de error general"""
         session_attr["failed_providers"] = []
         session_attr["current_provider"] = self.provider_manager.select_random_provider()
         response = "Lo siento, todos los servicios de inteligencia artificial están temporalmente no disponibles. Por favor, inténtalo de nuevo en unos minutos."
         logger.error("Todos los proveedores fallaron, devolviendo mensaje de error")
         return response, "connection"
 
-    def _try_provider(self, provider_name, chat_history, new_question):
+    def _deadline_exhausted(self, deadline):
+        """Respuesta cuando ya no queda tiempo en el turno para probar otro proveedor"""
+        logger.warning(f"Presupuesto del turno agotado, se pedirá reintentar: {deadline.summary()}")
+        return "Error: Se agotó el tiempo disponible para responder", "connection"
+
+    @classmethod
+    def _get_hedge_executor(cls):
+        if cls._hedge_executor is None:
+            from concurrent.futures import ThreadPoolExecutor  # solo se usa en modo hedged
+            cls._hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_ATTEMPTS * 2, thread_name_prefix="hedge")
+        return cls._hedge_executor
+
+    def _submit_attempt(self, provider_name, chat_history, new_question, deadline, summary=None, custom_data=None):
+        """
+        Lanza _try_provider en segundo plano y devuelve un concurrent.futures.Future con su
+        resultado. En el motor síncrono cada intento ocupa un hilo del pool hedged.
+        """
+        return self._get_hedge_executor().submit(self._try_provider, provider_name, chat_history, new_question, deadline,
+                                                 summary, custom_data)
+
+    def _generate_hedged(self, session_attr, current_provider, chat_history, new_question, deadline, summary=None):
+        """
+        Lanza el proveedor principal y, si no contesta en HEDGE_DELAY segundos (o falla), lanza otro
+        en paralelo hasta HEDGE_MAX_IN_FLIGHT simultáneos. Devuelve la primera respuesta válida;
+        las peticiones restantes se cancelan (el motor síncrono solo puede cancelar las que no
+        empezaron; el asyncio aborta también las que están en vuelo).
+        """
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        in_flight = {}
+        launched = []
+
+        def launch(provider_name):
+            logger.info(f"Hedged: lanzando proveedor {provider_name} (intento {len(launched) + 1})")
+            launched.append(provider_name)
+            future = self._submit_attempt(provider_name, chat_history, new_question, deadline, summary)
+            in_flight[future] = provider_name
+
+        launch(current_provider)
+        while in_flight:
+            can_hedge = (len(in_flight) < HEDGE_MAX_IN_FLIGHT and len(launched) < HEDGE_MAX_ATTEMPTS
+                         and deadline.can_attempt())
+            wait_time = min(HEDGE_DELAY, deadline.remaining()) if can_hedge else deadline.remaining()
+            done, _ = wait(list(in_flight), timeout=wait_time, return_when=FIRST_COMPLETED)
+            if not done and deadline.remaining() <= 0:
+                # Las peticiones en vuelo se abandonan: ya no llegarían a tiempo
+                return self._deadline_exhausted(deadline)
+
+            for future in done:
+                provider_name = in_flight.pop(future)
+                response, error_type = future.result()
+                logger.info(f"Resultado hedged de {provider_name}: error_type={error_type}")
+                if error_type is None and response and response.strip():
+                    for pending in in_flight:
+                        pending.cancel()
+                    session_attr["current_provider"] = provider_name
+                    return response, None
+                session_attr["failed_providers"].append(provider_name)
+
+            # Lanzar otro proveedor si venció la espera o si alguno falló y quedan intentos
+            if len(in_flight) < HEDGE_MAX_IN_FLIGHT and len(launched) < HEDGE_MAX_ATTEMPTS and deadline.can_attempt():
+                next_provider = self.provider_manager.get_next_provider(
+                    launched[-1], session_attr["failed_providers"] + launched)
+                if next_provider:
+                    launch(next_provider)
+
+        if not deadline.can_attempt():
+            return self._deadline_exhausted(deadline)
+        return self._all_providers_failed(session_attr)
+
+    def _try_provider(self, provider_name, chat_history, new_question, deadline=None, summary=None, custom_data=None):
         """
         Intenta obtener respuesta de un proveedor específico
         Devuelve (respuesta, tipo_de_error) donde tipo_de_error puede ser None, 'connection', 'other'
+        custom_data envía ese payload tal cual en lugar de la plantilla (solo proveedores OpenAI-compatibles)
         """
-        try:
-            provider = self.provider_manager.get_provider_config(provider_name)
-            if not provider:
-                logger.error(f"Proveedor {provider_name} no encontrado en configuración")
-                return f"Error: Proveedor {provider_name} no configurado", "other"
-
-            key = provider["get_key"]()
-            if not self._validate_api_key(key):
-                return f"Error: API key no configurada para {provider_name}", "other"
-
-            # Determinar el tipo de proveedor y procesar la respuesta
-            if provider_name in ["gemini_20", "gemini_25"]:
-                return self._handle_gemini_request(provider, key, chat_history, new_question, provider_name)
-            else:
-                return self._handle_standard_request(provider, key, chat_history, new_question, provider_name)
+        if deadline is None:
+            deadline = TurnDeadline()
+        attempt = self._new_attempt(provider_name, custom_data is not None)
+        response, error_type = self._request_provider(provider_name, chat_history, new_question, deadline, attempt,
+                                                      summary, custom_data)
+        self._finish_attempt(attempt, deadline, error_type)
+        return response, error_type
 
+    @staticmethod
+    def _new_attempt(provider_name, summary_request=False):
+        """Datos del intento que rellenan las capas inferiores (status HTTP, excepción de red, tokens...)"""
+        return {"provider": provider_name, "kind": "resumen" if summary_request else "proveedor", "sent": False,
+                "status": None, "exception": None, "latency": None, "headers_time": None, "ttft": None,
+                "tokens_per_second": None, "prompt_tokens": None, "completion_tokens": None,
+                "timeouts": None, "started": time.monotonic()}
+
+    def _finish_attempt(self, attempt, deadline, error_type):
+        """Mide la duración del intento y, si llegó a enviarse, registra su resultado"""
+        attempt["latency"] = time.monotonic() - attempt["started"]
+        deadline.record(f"{attempt['kind']}:{attempt['provider']}", attempt["latency"])
+        if attempt["sent"]:
+            self._record_attempt(attempt, error_type)
+
+    def _record_attempt(self, attempt, error_type):
+        """Alimenta el registro de salud y las latencias del contenedor con el resultado de un intento real"""
+        outcome = classify_outcome(error_type, attempt["status"], attempt["exception"])
+        self.provider_manager.health.record(attempt["provider"], outcome)
+        self.provider_manager.selector.observe(attempt["provider"], attempt["latency"], attempt["ttft"],
+                                               success=outcome == "success")
+        # Los errores rápidos (429, 5xx, conexión rechazada o sin conectar a tiempo) no dicen cuánto
+        # tarda el proveedor en responder: no alimentan el timeout de lectura
+        if (attempt["timeouts"] is not None and attempt["kind"] == "proveedor"
+                and outcome in ("success", "timeout")):
+            self.provider_manager.timeouts.observe(self.provider_manager.get_provider_config(attempt["provider"]),
+                                                   attempt["timeouts"], attempt["latency"], attempt["ttft"],
+                                                   timed_out=outcome == "timeout")
+        self._record_attempt_metrics(attempt, outcome)
+
+    @staticmethod
+    def _record_attempt_metrics(attempt, outcome):
+        """
+        Métricas EMF del intento con el proveedor como dimensión. Solo los fallos, poco frecuentes,
+        llevan además el resultado (Failures por Provider y Outcome)
+        """
+        registry = metrics.registry
+        if not registry.enabled:
+            return
+        provider_name = attempt["provider"]
+        if outcome != "success":
+            registry.record("Failures", 1, "Count", Provider=provider_name, Outcome=outcome)
+
+        def ms(seconds):
+            return seconds * 1000 if seconds is not None else None
+
+        timeouts = attempt["timeouts"]
+        # Un proveedor siempre usa la misma espera (primer token en streaming o respuesta completa)
+        learned = ms(timeouts.limit) if timeouts is not None and timeouts.learned else None
+        registry.record_all((
+            ("Attempts", 1, "Count"),
+            ("AttemptTime", ms(attempt["latency"]), "Milliseconds"),
+            ("TimeToHeaders", ms(attempt["headers_time"]), "Milliseconds"),
+            ("TimeToFirstToken", ms(attempt["ttft"]), "Milliseconds"),
+            ("LearnedTimeout", learned, "Milliseconds"),
+            ("TokensPerSecond", attempt["tokens_per_second"], "Count/Second"),
+            ("PromptTokens", attempt["prompt_tokens"], "Count"),
+            ("CompletionTokens", attempt["completion_tokens"], "Count"),
+        ), Provider=provider_name)
+
+    def _request_provider(self, provider_name, chat_history, new_question, deadline, attempt, summary=None, custom_data=None):
+        """Resuelve la configuración del proveedor y traduce las excepciones de red a tipos de error"""
+        requests = http_transport.load_requests()
+        try:
+            provider, error = self._usable_provider(provider_name)
+            if error:
+                return error
+            if not self.provider_manager.free_quota.is_available(provider):
+                return self._quota_exhausted(provider)
+            if not self.provider_manager.rate_limits.acquire(provider):
+                return self._rate_limited(provider)
+            self._count_free_request(provider)
+
+            # Construir la petición según el tipo de proveedor y procesar la respuesta
+            attempt["sent"] = True
+            self.provider_manager.health.before_attempt(provider_name)
+            request = self._prepare_request(provider, chat_history, new_question, summary, custom_data, deadline.timer)
+            return self._send_request(provider, request, deadline, attempt)
+
+        except requests.exceptions.ConnectTimeout:
+            logger.error(f"Timeout al conectar con {provider_name}")
+            attempt["exception"] = "connection"
+            return f"Error: Problema de conexión con {provider_name}", "connection"
         except requests.exceptions.Timeout:
             logger.error(f"Timeout en {provider_name}")
+            attempt["exception"] = "timeout"
             return f"Error: Tiempo de espera agotado para {provider_name}", "connection"
         except requests.exceptions.ConnectionError:
             logger.error(f"Error de conexión en {provider_name}")
+            attempt["exception"] = "connection"
             return f"Error: Problema de conexión con {provider_name}", "connection"
         except requests.exceptions.RequestException as e:
             logger.error(f"Error de request en {provider_name}: {str(e)}")
+            attempt["exception"] = "connection"
             return f"Error: Problema de comunicación con {provider_name}", "connection"
         except KeyError as e:
             logger.error(f"Error de configuración en {provider_name}: {str(e)}")
@@ -898,17 +639,70 @@ class ResponseGenerator:
             logger.error(f"Error inesperado en {provider_name}: {str(e)}")
             return f"Error: Problema inesperado con {provider_name}", "other"
 
+    @staticmethod
+    def _rate_limited(provider):
+        """El proveedor no se llega a enviar: su key está limitada; se trata como error de conexión para hacer fallback"""
+        logger.info(f"Proveedor {provider.name} evitado por límite de uso")
+        metrics.registry.record("RateLimitDeferred", 1, "Count", Provider=provider.name)
+        return f"Error: Límite de uso alcanzado en {provider.name}", "connection"
+
+    @staticmethod
+    def _quota_exhausted(provider):
+        """El modelo gratuito ya agotó la cuota de hoy: no se envía y se hace fallback"""
+        logger.info(f"Proveedor {provider.name} evitado: cuota gratuita diaria agotada")
+        metrics.registry.record("FreeQuotaDeferred", 1, "Count", Provider=provider.name)
+        return f"Error: Cuota gratuita agotada en {provider.name}", "connection"
+
+    def _count_free_request(self, provider):
+        """Cuenta la petición en la cuota diaria si el modelo es gratuito y publica lo que le queda a su key"""
+        remaining = self.provider_manager.free_quota.record_request(provider)
+        if remaining is not None:
+            metrics.registry.record("FreeQuotaRemaining", remaining, "Count", QuotaKey=provider.family)
+
+    def _observe_limits(self, provider, response):
+        """
+        Aprende los límites de uso de las cabeceras y del cuerpo de un 429 (retryDelay de Gemini,
+        cuota diaria de los modelos gratuitos de OpenRouter)
+        """
+        body = response.text if response.status_code == 429 else None
+        cooldown = self.provider_manager.rate_limits.observe(provider, response.status_code, response.headers, body)
+        if cooldown:
+            metrics.registry.record("RateLimitCooldown", cooldown, "Seconds", Provider=provider.name)
+        self.provider_manager.free_quota.observe(provider, response.status_code, body)
+
+    def _usable_provider(self, provider_name):
+        """Devuelve (configuración, None) o (None, (respuesta, tipo_de_error)) si el proveedor no se puede usar"""
+        provider = self.provider_manager.get_provider_config(provider_name)
+        if not provider:
+            logger.error(f"Proveedor {provider_name} no encontrado en configuración")
+            return None, (f"Error: Proveedor {provider_name} no configurado", "other")
+        if not self._validate_api_key(provider.key):
+            return None, (f"Error: API key no configurada para {provider_name}", "other")
+        return provider, None
+
     def _validate_api_key(self, key):
         """Valida que la API key esté configurada"""
         return key and key != "YOUR_API_KEY"
 
-    def _build_chat_history(self, chat_history, new_question, system_prompt=None, format_type="standard"):
-        """Construye el historial de chat en el formato requerido (standard o gemini)"""
+    def _build_chat_history(self, chat_history, new_question, system_prompt=None, format_type="standard", provider=None,
+                            summary=None):
+        """
+        Construye el historial de chat en el formato requerido (standard o gemini). Se envían el
+        resumen de la conversación (si lo hay) y los turnos más recientes que caben en el
+        presupuesto de tokens de historial del proveedor.
+        """
+        budget = provider.history_budget if provider is not None else HISTORY_TOKEN_BUDGET["standard"]
+        tokenizer = provider.tokenizer if provider is not None else "default"
+        if summary:
+            budget -= estimate_tokens(summary, tokenizer)
+        window = pack_history(chat_history, budget, tokenizer)
         if format_type == "gemini":
             contents = []
             if system_prompt:
                 contents.append({"role": "user", "parts": [{"text": system_prompt}]})
-            for question, answer in chat_history[-6:]:
+            if summary:
+                contents.append(summary_message(summary, format_type))
+            for question, answer in window:
                 contents.append({"role": "user", "parts": [{"text": question}]})
                 contents.append({"role": "model", "parts": [{"text": answer}]})
             contents.append({"role": "user", "parts": [{"text": new_question}]})
@@ -917,43 +711,107 @@ class ResponseGenerator:
             messages = []
             if system_prompt:
                 messages.append({"role": "system", "content": system_prompt})
-            for question, answer in chat_history[-6:]:
+            if summary:
+                messages.append(summary_message(summary, format_type))
+            for question, answer in window:
                 messages.append({"role": "user", "content": question})
                 messages.append({"role": "assistant", "content": answer})
             messages.append({"role": "user", "content": new_question})
             return messages
 
-    def _handle_gemini_request(self, provider, key, chat_history, new_question, provider_name):
-        """Maneja las peticiones específicas para Gemini (Google API directo)"""
-        headers = provider["get_headers"](key)
-        url = f"{provider['url']}?key={key}"
-        timeout = provider.get("timeout", 8)
-        system_prompt = self._get_system_prompt()
-        contents = self._build_chat_history(chat_history, new_question, system_prompt, format_type="gemini")
-        data = {"contents": contents}
-        logger.info(f"Enviando request a Gemini directo: {provider_name}")
-        response = requests.post(url, headers=headers, data=json.dumps(data), timeout=timeout)
-        return self._process_gemini_response(response, provider_name)
-
-    def _send_standard_request(self, provider, key, messages, provider_name, custom_data=None):
-        """Envía una petición estándar (OpenAI, OpenRouter, Cerebras, Moonshot, etc.)"""
-        headers = provider["get_headers"](key)
-        url = provider["url"]
-        model = provider["model"]
-        timeout = provider.get("timeout", DEFAULT_TIMEOUT)
+    def _compile_template(self, provider):
+        """Precompila los campos fijos del payload y el mensaje del sistema de un proveedor"""
+        if provider.api == "gemini":
+            static_fields = {"generationConfig": self._build_gemini_generation_config(provider)}
+            system_message = {"role": "user", "parts": [{"text": self.system_prompt}]}
+            return RequestTemplate(provider.name, static_fields, "contents", system_message,
+                                   stream=self._should_stream(provider.name))
+        static_fields = self._build_request_data(provider, provider.model, None, provider.name)
+        del static_fields["messages"]
+        system_message = {"role": "system", "content": self.system_prompt}
+        return RequestTemplate(provider.name, static_fields, "messages", system_message,
+                               stream=bool(static_fields.get("stream")))
+
+    def _get_template(self, provider):
+        template = self.templates.get(provider.name)
+        if template is None:
+            template = self.templates[provider.name] = self._compile_template(provider)
+        return template
+
+    def _prepare_request(self, provider, chat_history, new_question, summary=None, custom_data=None,
+                         timer=profiling.NULL_TIMER):
+        """
+        URL, cuerpo y forma de leer la respuesta de una petición (común a los motores sync y asyncio).
+        custom_data se envía tal cual en lugar de la plantilla (solo proveedores OpenAI-compatibles).
+        """
         if custom_data is not None:
-            data = custom_data
-        else:
-            data = self._build_request_data(provider, model, messages, provider_name)
-        logger.info(f"Enviando request a {provider_name} con modelo {model}")
-        response = requests.post(url, headers=headers, data=json.dumps(data), timeout=timeout)
-        return self._process_standard_response(response, provider_name)
-
-    def _handle_standard_request(self, provider, key, chat_history, new_question, provider_name):
-        """Maneja las peticiones estándar (OpenAI, OpenRouter, Cerebras, etc.)"""
-        system_prompt = self._get_system_prompt()
-        messages = self._build_chat_history(chat_history, new_question, system_prompt, format_type="standard")
-        return self._send_standard_request(provider, key, messages, provider_name)
+            with timer.phase("codificacion"):
+                body = encode_json(custom_data)
+            return PreparedRequest(provider.url, body, bool(custom_data.get("stream")), openai_delta,
+                                   self._process_standard_response)
+        template = self._get_template(provider)
+        if provider.api == "gemini":
+            # Gemini (Google API directo): la key va en la URL y el mensaje del sistema ya está en la plantilla
+            if template.stream:
+                url = f"{provider.url.replace(':generateContent', ':streamGenerateContent')}?alt=sse&key={provider.key}"
+            else:
+                url = f"{provider.url}?key={provider.key}"
+            with timer.phase("historial"):
+                contents = self._build_chat_history(chat_history, new_question, format_type="gemini", provider=provider,
+                                                    summary=summary)
+            with timer.phase("codificacion"):
+                body = template.render(contents)
+            return PreparedRequest(url, body, template.stream, gemini_delta, self._process_gemini_response)
+        # Estándar (OpenAI, OpenRouter, Cerebras, Moonshot, etc.): historial sin el mensaje del sistema
+        with timer.phase("historial"):
+            messages = self._build_chat_history(chat_history, new_question, format_type="standard", provider=provider,
+                                                summary=summary)
+        with timer.phase("codificacion"):
+            body = template.render(messages)
+        return PreparedRequest(provider.url, body, template.stream, openai_delta, self._process_standard_response)
+
+    def _send_request(self, provider, request, deadline, attempt):
+        """Envía la petición con el cliente HTTP síncrono (http_transport) y procesa la respuesta"""
+        timeouts = self._attempt_timeouts(provider, request, deadline, attempt)
+        logger.info(f"Enviando request a {provider.name} con modelo {provider.model}")
+        started = time.monotonic()
+        with deadline.timer.phase("red"):
+            response = http_transport.post(request.url, headers=provider.headers, data=request.body,
+                                           timeout=(timeouts.connect, timeouts.read), stream=request.stream,
+                                           total_timeout=timeouts.read)
+        attempt["status"] = response.status_code
+        if request.stream:
+            # En streaming post() vuelve al recibir las cabeceras: conexión + espera hasta el primer byte
+            attempt["headers_time"] = time.monotonic() - started
+        if request.stream and response.ok:
+            self._observe_limits(provider, response)
+            with deadline.timer.phase("stream"):
+                result = read_stream(response, request.extract_delta, started,
+                                     should_stop=self._stream_stopper(deadline),
+                                     first_token_timeout=timeouts.first_token)
+            if traffic_recorder is not None and traffic_recorder.is_recording():
+                traffic_recorder.record_provider(provider.name, request, attempt, response.status_code, response.headers,
+                                                 stream_result=result)
+            return self._process_stream_result(result, provider.name, attempt)
+        if traffic_recorder is not None and traffic_recorder.is_recording():
+            traffic_recorder.record_provider(provider.name, request, attempt, response.status_code, response.headers,
+                                             body=response.text)
+        self._observe_limits(provider, response)
+        # Incluye la lectura del cuerpo y response.json()
+        with deadline.timer.phase("procesar_respuesta"):
+            return request.process(response, provider.name, attempt)
+
+    def _build_gemini_generation_config(self, provider):
+        """Límites de generación de Gemini equivalentes a los de los proveedores estándar"""
+        model = provider.model
+        config = {"maxOutputTokens": provider.max_tokens}
+        stop = stop_sequences_for(model)
+        if stop:
+            config["stopSequences"] = stop
+        if model.startswith("gemini-2.5"):
+            # Gemini 2.5 "piensa" por defecto; para respuestas habladas cortas no compensa la latencia
+            config["thinkingConfig"] = {"thinkingBudget": GEMINI_THINKING_BUDGET}
+        return config
 
     def _get_system_prompt(self):
         """Genera el prompt del sistema optimizado para conversaciones en español"""
@@ -970,24 +828,30 @@ REGLAS CLAVE PARA RESPONDER:
 Tu misión es ser un interlocutor conversador, útil e intelectualmente estimulante: que las personas en {COUNTRY} disfruten charlar contigo, aprecien la calidad de tu expresión y encuentren valor en tus respuestas."""
 
     def _build_request_data(self, provider, model, messages, provider_name):
-        """Construye los datos de la petición según el tipo de proveedor"""
+        """
+        Construye los datos de la petición según el tipo de proveedor. Se usa al compilar la
+        plantilla del proveedor; en cada turno solo se empalman los mensajes.
+        """
 
         # Detectar si es un modelo de la serie "o" (o3, o4) que tiene restricciones especiales
-        # Usar regex para detectar cualquier variación de modelos o3/o4
-        import re
-        is_o_series_model = bool(re.search(r'(^|/)o[34](-\w+)?$', model))
+        is_o_series_model = is_o_series(model)
 
         # Base data - solo incluir temperature si el modelo lo soporta
+        # El límite de tokens depende de la clase de modelo (estándar o de razonamiento)
         data = {
             "model": model,
             "messages": messages,
-            "max_tokens": provider.get("max_tokens", 800),
+            "max_tokens": provider.max_tokens,
         }
 
         # Solo agregar temperature si no es un modelo de la serie "o"
         if not is_o_series_model:
             data["temperature"] = 0.8
 
+        stop = stop_sequences_for(model)
+        if stop:
+            data["stop"] = stop
+
         # Ajustes específicos por proveedor
         if provider_name.startswith("github"):
             # Para todos los modelos de GitHub, usar max_completion_tokens
@@ -995,6 +859,8 @@ Tu misión es ser un interlocutor conversador, útil e intelectualmente estimula
             # Solo agregar top_p si no es modelo de serie "o"
             if not is_o_series_model:
                 data["top_p"] = 0.9
+            else:
+                data["reasoning_effort"] = REASONING_EFFORT
         elif provider_name.startswith("cerebras"):
             data.update({
                 "stream": False,
@@ -1004,7 +870,6 @@ Tu misión es ser un interlocutor conversador, útil e intelectualmente estimula
             })
         elif provider_name.startswith("chutes"):
             data.update({
-                "stream": True,
                 "top_p": 0.9
             })
         elif any(provider_name.startswith(prefix) for prefix in ["openrouter", "deepseek", "qwen", "microsoft", "llama", "google"]):
@@ -1022,15 +887,71 @@ Tu misión es ser un interlocutor conversador, útil e intelectualmente estimula
             # Para modelos OpenAI que usan la serie "o" (o3, o4), usar max_completion_tokens
             if is_o_series_model:
                 data["max_completion_tokens"] = data.pop("max_tokens", 800)
+                data["reasoning_effort"] = REASONING_EFFORT
             else:
                 data.update({
                     "presence_penalty": 0.2,
                     "frequency_penalty": 0.2
                 })
 
+        if self._should_stream(provider_name):
+            data["stream"] = True
+
         return data
 
-    def _process_gemini_response(self, response, provider_name):
+    def _should_stream(self, provider_name):
+        """Indica si el proveedor debe responder en streaming (SSE)"""
+        return any(provider_name.startswith(prefix) for prefix in STREAMING_PROVIDER_PREFIXES)
+
+    def _attempt_timeouts(self, provider, request, deadline, attempt):
+        """Timeouts de conexión y de lectura (o de primer token en streaming) del intento, aprendidos por proveedor"""
+        timeouts = self.provider_manager.timeouts.timeouts_for(provider, request.stream, deadline,
+                                                               adaptive=attempt["kind"] == "proveedor")
+        attempt["timeouts"] = timeouts
+        return timeouts
+
+    def _stream_stopper(self, deadline):
+        """Criterio para dejar de leer un stream SSE antes de que el proveedor termine"""
+        speakable = SpeakableFilter()
+        progress = SpokenProgress(SPOKEN_TARGET_WORDS)
+
+        def should_stop(new_text):
+            # Cortar en el primer fin de oración tras SPOKEN_TARGET_WORDS palabras hablables,
+            # al llegar al máximo de caracteres o cuando se acaba el tiempo del turno. Solo se
+            # revisa el texto nuevo: el coste por trozo no crece con la longitud de la respuesta.
+            progress.feed(speakable.feed(new_text))
+            return deadline.remaining() <= 0 or progress.chars >= STREAM_MAX_CHARS or progress.complete
+        return should_stop
+
+    def _process_stream_result(self, result, provider_name, attempt):
+        """Procesa una respuesta SSE ya leída (OpenAI-compatible o Gemini) con el mismo contrato que las demás"""
+        attempt["ttft"] = result["ttft"]
+        attempt["tokens_per_second"] = result["tokens_per_second"]
+        if result["timed_out"]:
+            attempt["exception"] = "timeout"
+        # Sin "usage" en el stream: cada evento suele traer un token
+        attempt["completion_tokens"] = result["chunks"]
+        content = result["text"].strip()
+        if result["stopped_early"]:
+            # Quedarse solo con oraciones completas de la parte hablable
+            spoken = speakable_text(result["text"])
+            cutoff = spoken_cutoff(spoken, SPOKEN_TARGET_WORDS)
+            content = (spoken[:cutoff] if cutoff else spoken).strip()
+
+        if result["error"] and not content:
+            logger.error(f"Error en el stream de {provider_name}: {result['error']}")
+            return f"Error: {result['error']}", "connection"
+        if not content:
+            logger.error(f"Respuesta vacía en el stream de {provider_name}")
+            return f"Error: Respuesta vacía de {provider_name}", "connection"
+
+        ttft_ms = round(result["ttft"] * 1000) if result["ttft"] is not None else None
+        tps = round(result["tokens_per_second"], 1) if result["tokens_per_second"] else None
+        logger.info(f"Respuesta exitosa en streaming de {provider_name}: {len(content)} caracteres, "
+                    f"ttft={ttft_ms}ms, tokens/s={tps}, cortada={result['stopped_early']}")
+        return content, None
+
+    def _process_gemini_response(self, response, provider_name, attempt=None):
         """Procesa la respuesta de Gemini"""
         if not response.ok:
             return self._handle_http_error(response, provider_name)
@@ -1041,6 +962,11 @@ Tu misión es ser un interlocutor conversador, útil e intelectualmente estimula
             logger.error("Error parseando JSON de Gemini: %s", str(e))
             return "Error: Respuesta inválida de Gemini", "other"
 
+        if attempt is not None:
+            usage = response_data.get("usageMetadata") or {}
+            attempt["prompt_tokens"] = usage.get("promptTokenCount")
+            attempt["completion_tokens"] = usage.get("candidatesTokenCount")
+
         logger.info(f"Respuesta JSON recibida de Gemini: {list(response_data.keys())}")
 
         # Gemini responde con 'candidates' y dentro 'content'->'parts'
@@ -1062,7 +988,7 @@ Tu misión es ser un interlocutor conversador, útil e intelectualmente estimula
             logger.error(f"Error en respuesta de Gemini: {error_msg}, keys={list(response_data.keys())}")
             return f"Error: {error_msg}", "connection"
 
-    def _process_standard_response(self, response, provider_name):
+    def _process_standard_response(self, response, provider_name, attempt=None):
         """Procesa la respuesta estándar (OpenAI, OpenRouter, etc.)"""
         if not response.ok:
             return self._handle_http_error(response, provider_name)
@@ -1073,6 +999,11 @@ Tu misión es ser un interlocutor conversador, útil e intelectualmente estimula
             logger.error(f"Error parseando JSON de {provider_name}: {str(e)}")
             return f"Error: Respuesta inválida de {provider_name}", "other"
 
+        if attempt is not None:
+            usage = response_data.get("usage") or {}
+            attempt["prompt_tokens"] = usage.get("prompt_tokens")
+            attempt["completion_tokens"] = usage.get("completion_tokens")
+
         logger.info(f"Respuesta JSON recibida de {provider_name}: {list(response_data.keys())}")
 
         if 'choices' in response_data and len(response_data['choices']) > 0:
@@ -1105,11 +1036,139 @@ Tu misión es ser un interlocutor conversador, útil e intelectualmente estimula
 
         logger.error(f"Error HTTP en {provider_name}: {error_msg}")
 
-        # Solo considerar error de conexión si es 5xx
-        if response.status_code >= 500:
+        # Error de conexión (hay fallback) si es 5xx o 429: la key está limitada y otro proveedor sí puede responder
+        if response.status_code >= 500 or response.status_code == 429:
             return f"Error {error_msg}", "connection"
         return f"Error {error_msg}", "other"
 
+class AsyncResponseGenerator(ResponseGenerator):
+    """
+    Motor asyncio (PROVIDER_ENGINE = "asyncio"): mismo contrato que ResponseGenerator, pero cada
+    petición a un proveedor es una tarea en el event loop compartido de async_transport en lugar
+    de ocupar un hilo. En modo hedged (y al resumir en paralelo) las peticiones perdedoras se
+    cancelan en vuelo y sus conexiones se cierran.
+    """
+
+    def __init__(self, provider_manager, answer_cache=None, semantic_cache=None, engine=None):
+        import async_transport  # httpx es una dependencia opcional (ImportError si falta)
+        super().__init__(provider_manager, answer_cache, semantic_cache)
+        self.engine = engine or async_transport.get_engine()
+
+    def _submit_attempt(self, provider_name, chat_history, new_question, deadline, summary=None, custom_data=None):
+        """Programa el intento en el event loop; cancelar el Future aborta la petición"""
+        return self.engine.submit(self._try_provider_async(provider_name, chat_history, new_question, deadline, summary,
+                                                           custom_data))
+
+    def _try_provider(self, provider_name, chat_history, new_question, deadline=None, summary=None, custom_data=None):
+        """Versión bloqueante para el modo secuencial: espera al intento lanzado en el event loop"""
+        if deadline is None:
+            deadline = TurnDeadline()
+        return self._submit_attempt(provider_name, chat_history, new_question, deadline, summary, custom_data).result()
+
+    async def _try_provider_async(self, provider_name, chat_history, new_question, deadline, summary=None,
+                                  custom_data=None):
+        import asyncio
+        attempt = self._new_attempt(provider_name, custom_data is not None)
+        try:
+            response, error_type = await self._request_provider_async(provider_name, chat_history, new_question,
+                                                                      deadline, attempt, summary, custom_data)
+        except asyncio.CancelledError:
+            # Perdió la carrera: no es un fallo del proveedor, pero tardó al menos esto; sin esta
+            # cota el selector no aprendería nunca que el proveedor es lento
+            if attempt["sent"]:
+                self.provider_manager.selector.observe(provider_name, time.monotonic() - attempt["started"])
+            raise
+        self._finish_attempt(attempt, deadline, error_type)
+        return response, error_type
+
+    async def _request_provider_async(self, provider_name, chat_history, new_question, deadline, attempt, summary=None,
+                                      custom_data=None):
+        """Igual que _request_provider, con las excepciones de httpx"""
+        from async_transport import load_httpx
+        httpx = load_httpx()
+        try:
+            provider, error = self._usable_provider(provider_name)
+            if error:
+                return error
+            if not self.provider_manager.free_quota.is_available(provider):
+                return self._quota_exhausted(provider)
+            if not self.provider_manager.rate_limits.acquire(provider):
+                return self._rate_limited(provider)
+            self._count_free_request(provider)
+            attempt["sent"] = True
+            self.provider_manager.health.before_attempt(provider_name)
+            request = self._prepare_request(provider, chat_history, new_question, summary, custom_data, deadline.timer)
+            return await self._send_request_async(provider, request, deadline, attempt)
+
+        except httpx.ConnectTimeout:
+            logger.error(f"Timeout al conectar con {provider_name}")
+            attempt["exception"] = "connection"
+            return f"Error: Problema de conexión con {provider_name}", "connection"
+        except httpx.TimeoutException:
+            logger.error(f"Timeout en {provider_name}")
+            attempt["exception"] = "timeout"
+            return f"Error: Tiempo de espera agotado para {provider_name}", "connection"
+        except httpx.TransportError:
+            logger.error(f"Error de conexión en {provider_name}")
+            attempt["exception"] = "connection"
+            return f"Error: Problema de conexión con {provider_name}", "connection"
+        except httpx.HTTPError as e:
+            logger.error(f"Error de request en {provider_name}: {str(e)}")
+            attempt["exception"] = "connection"
+            return f"Error: Problema de comunicación con {provider_name}", "connection"
+        except KeyError as e:
+            logger.error(f"Error de configuración en {provider_name}: {str(e)}")
+            return f"Error: Configuración incompleta para {provider_name}", "other"
+        except Exception as e:
+            logger.error(f"Error inesperado en {provider_name}: {str(e)}")
+            return f"Error: Problema inesperado con {provider_name}", "other"
+
+    async def _send_request_async(self, provider, request, deadline, attempt):
+        """Envía la petición con el cliente asíncrono y procesa la respuesta con los mismos procesadores"""
+        from async_transport import BufferedResponse, read_stream_async
+        timeouts = self._attempt_timeouts(provider, request, deadline, attempt)
+        logger.info(f"Enviando request asíncrono a {provider.name} con modelo {provider.model}")
+        started = time.monotonic()
+        with deadline.timer.phase("red"):
+            response = await self.engine.send(request.url, provider.headers, request.body,
+                                              (timeouts.connect, timeouts.read), stream=request.stream,
+                                              total_timeout=timeouts.read)
+        attempt["status"] = response.status_code
+        if request.stream:
+            attempt["headers_time"] = time.monotonic() - started
+        if request.stream:
+            if response.status_code < 400:
+                self._observe_limits(provider, response)
+                with deadline.timer.phase("stream"):
+                    result = await read_stream_async(response, request.extract_delta, started,
+                                                     should_stop=self._stream_stopper(deadline),
+                                                     first_token_timeout=timeouts.first_token)
+                if traffic_recorder is not None and traffic_recorder.is_recording():
+                    traffic_recorder.record_provider(provider.name, request, attempt, response.status_code,
+                                                     response.headers, stream_result=result)
+                return self._process_stream_result(result, provider.name, attempt)
+            # Respuesta de error pedida en streaming: leer el cuerpo para poder procesarlo
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        if traffic_recorder is not None and traffic_recorder.is_recording():
+            traffic_recorder.record_provider(provider.name, request, attempt, response.status_code, response.headers,
+                                             body=response.text)
+        self._observe_limits(provider, response)
+        with deadline.timer.phase("procesar_respuesta"):
+            return request.process(BufferedResponse(response), provider.name, attempt)
+
+
+def create_response_generator(provider_manager, answer_cache=None, semantic_cache=None, engine=PROVIDER_ENGINE):
+    """Generador del motor configurado en PROVIDER_ENGINE; sin httpx se usa el motor síncrono"""
+    if engine == "asyncio":
+        try:
+            return AsyncResponseGenerator(provider_manager, answer_cache, semantic_cache)
+        except ImportError:
+            logger.warning("PROVIDER_ENGINE = 'asyncio' requiere httpx; se usa el motor síncrono")
+    return ResponseGenerator(provider_manager, answer_cache, semantic_cache)
+
 def remove_think_tags(text):
     """Elimina cualquier bloque <think>...</think> del texto (incluyendo etiquetas)."""
     if not text:
@@ -1117,13 +1176,43 @@ def remove_think_tags(text):
     return re.sub(r'<think>[\s\S]*?</think>', '', text, flags=re.IGNORECASE).strip()
 
 # Inicializar instancias globales
+if STARTUP_MODE == "eager":
+    # Pagar durante el init del contenedor las importaciones que el modo "lazy" deja para el primer uso
+    http_transport.load_requests()
 provider_manager = ProviderManager()
-response_generator = ResponseGenerator(provider_manager)
+answer_cache = AnswerCache(shared_store=provider_manager.state_store if ANSWER_CACHE_SHARED else None) if ANSWER_CACHE_ENABLED else None
+semantic_cache = None
+if SEMANTIC_CACHE_ENABLED:
+    try:
+        from semantic_cache import SemanticCache  # numpy es una dependencia opcional
+        semantic_cache = SemanticCache()
+    except ImportError:
+        logger.warning("SEMANTIC_CACHE_ENABLED requiere numpy; la caché semántica queda desactivada")
+response_generator = create_response_generator(provider_manager, answer_cache, semantic_cache)
 
 # =====================================================================
 # HANDLERS DE ALEXA SKILL
 # =====================================================================
 
+class TurnDeadlineRequestInterceptor(AbstractRequestInterceptor):
+    """Crea el presupuesto de tiempo del turno en cuanto llega el envelope"""
+    def process(self, handler_input):
+        # type: (HandlerInput) -> None
+        timer = profiling.current_timer()
+        # Desde el inicio de la invocación: deserialización del envelope y creación del HandlerInput
+        timer.mark("sdk_entrada")
+        handler_input.attributes_manager.request_attributes["deadline"] = TurnDeadline.from_lambda_context(
+            handler_input.context, timer=timer)
+
+class SessionStateResponseInterceptor(AbstractResponseInterceptor):
+    """Empaqueta el estado de la conversación en los atributos de sesión antes de responder"""
+    def process(self, handler_input, response):
+        # type: (HandlerInput, Response) -> None
+        timer = profiling.current_timer()
+        timer.mark("handler")
+        store_session(handler_input)
+        timer.mark("estado_sesion")
+
 class LaunchRequestHandler(AbstractRequestHandler):
     """Handler for Skill Launch."""
     def can_handle(self, handler_input):
@@ -1133,16 +1222,24 @@ class LaunchRequestHandler(AbstractRequestHandler):
     def handle(self, handler_input):
         speak_output = "Hola, soy tu asistente inteligente. ¿En qué puedo ayudarte hoy?"
 
-        session_attr = handler_input.attributes_manager.session_attributes
+        session_attr = load_session(handler_input)
         session_attr["chat_history"] = []
-        # Seleccionar proveedor forzado o aleatorio al inicio de la sesión
+        # Retomar lo que se recuerda del usuario (resumen, últimos turnos y proveedor) con un único get
+        restored = restore_memory(load_user_memory(handler_input))
+        remembered_provider = restored.pop("current_provider", None)
+        session_attr.update(restored)
+        # Seleccionar proveedor forzado, el de la sesión anterior si sigue sano, o uno nuevo
         if FORCED_PROVIDER and FORCED_PROVIDER in provider_manager.available_providers:
             session_attr["current_provider"] = FORCED_PROVIDER
+        elif (remembered_provider in provider_manager.available_providers
+              and provider_manager.is_schedulable(remembered_provider)):
+            session_attr["current_provider"] = remembered_provider
         else:
             session_attr["current_provider"] = provider_manager.select_random_provider()
         session_attr["failed_providers"] = []
 
-        logger.info(f"Sesión iniciada con proveedor: {session_attr['current_provider']}")
+        logger.info(f"Sesión iniciada con proveedor: {session_attr['current_provider']} "
+                    f"(memoria: {sorted(restored) or 'ninguna'})")
 
         return (
             handler_input.response_builder
@@ -1172,7 +1269,7 @@ class GptQueryIntentHandler(AbstractRequestHandler):
                         .response
                 )
 
-            session_attr = handler_input.attributes_manager.session_attributes
+            session_attr = load_session(handler_input)
             # Mantener memoria durante toda la sesión
             if "chat_history" not in session_attr:
                 session_attr["chat_history"] = []
@@ -1184,12 +1281,22 @@ class GptQueryIntentHandler(AbstractRequestHandler):
             if "failed_providers" not in session_attr:
                 session_attr["failed_providers"] = []
 
-            response, error_type = response_generator.generate_response(session_attr, query)
+            deadline = handler_input.attributes_manager.request_attributes.get("deadline") or TurnDeadline()
+            deadline.mark("preparacion")
+            # El resumen de los turnos antiguos se genera en paralelo a la respuesta y se usa desde el siguiente turno
+            pending_fold = response_generator.start_fold(session_attr, deadline) if SUMMARY_ENABLED else None
+            response, error_type = response_generator.generate_response(session_attr, query, deadline)
+            with deadline.timer.phase("espera_resumen"):
+                response_generator.finish_fold(session_attr, pending_fold, deadline)
+            depth = sum(1 for phase, _ in deadline.phases if phase.startswith("proveedor:"))
+            metrics.registry.record("FallbackDepth", depth, "Count", Intent="GptQueryIntent")
 
             logger.info(f"Respuesta final - error_type: {error_type}, longitud_respuesta: {len(response) if response else 0}")
+            logger.info(f"Tiempos del turno: {deadline.summary()}")
 
             # Limpiar la respuesta de <think>...</think>
-            response_clean = remove_think_tags(response)
+            with deadline.timer.phase("limpieza"):
+                response_clean = remove_think_tags(response)
 
             # Si hay error de conexión/modelo, invitar a reintentar
             if error_type == "connection":
@@ -1208,9 +1315,12 @@ class GptQueryIntentHandler(AbstractRequestHandler):
             # Solo agregar al historial si la respuesta fue exitosa (no contiene "Error")
             if error_type is None:
                 session_attr["chat_history"].append((query, response_clean))
-                # Mantener solo las últimas 8 interacciones para optimizar tokens
-                if len(session_attr["chat_history"]) > 8:
-                    session_attr["chat_history"] = session_attr["chat_history"][-8:]
+                session_attr["chat_history"] = session_attr["chat_history"][-HISTORY_MAX_TURNS:]
+                if not SUMMARY_ENABLED:
+                    # Guardar solo los turnos que cualquier proveedor podría llegar a enviar; con el
+                    # resumen activo se guardan hasta que se resumen, o se perderían sin resumir
+                    session_attr["chat_history"] = pack_history(session_attr["chat_history"],
+                                                                max(HISTORY_TOKEN_BUDGET.values()))
 
             return (
                 handler_input.response_builder
@@ -1270,6 +1380,8 @@ class CancelOrStopIntentHandler(AbstractRequestHandler):
 
     def handle(self, handler_input):
         speak_output = "¡Hasta pronto! Espero haberte sido de ayuda. Puedes volver a preguntarme cuando quieras."
+        # Al cerrar la sesión desde la skill Alexa no envía SessionEndedRequest: guardar aquí la memoria
+        save_user_memory(handler_input, load_session(handler_input))
         return (
             handler_input.response_builder
                 .speak(speak_output)
@@ -1299,7 +1411,7 @@ class NewTopicIntentHandler(AbstractRequestHandler):
                 ask_utils.is_intent_name("NewTopicIntent")(handler_input))
 
     def handle(self, handler_input):
-        session_attr = handler_input.attributes_manager.session_attributes
+        session_attr = load_session(handler_input)
 
         # Prevenir loop: si ya se reinició el tema en este turno, no volver a hacerlo
         if session_attr.get("just_restarted_topic"):
@@ -1313,8 +1425,9 @@ class NewTopicIntentHandler(AbstractRequestHandler):
                     .response
             )
 
-        # Limpiar historial pero mantener el proveedor actual
+        # Limpiar historial (y su resumen) pero mantener el proveedor actual
         session_attr["chat_history"] = []
+        session_attr.pop("conversation_summary", None)
         session_attr["just_restarted_topic"] = True
 
         speak_output = "¡Perfecto! Empecemos con un tema nuevo. ¿Sobre qué te gustaría conversar ahora?"
@@ -1359,13 +1472,14 @@ class SessionEndedRequestHandler(AbstractRequestHandler):
 
     def handle(self, handler_input):
         # type: (HandlerInput) -> Response
-        session_attr = handler_input.attributes_manager.session_attributes
+        session_attr = load_session(handler_input)
         current_provider = session_attr.get("current_provider", "unknown")
         reason = "Desconocida"
         if handler_input.request_envelope.request and hasattr(handler_input.request_envelope.request, 'reason'):
             reason = handler_input.request_envelope.request.reason
 
         logger.info(f"Sesión terminada. Proveedor usado: {current_provider}. Razón: {reason}")
+        save_user_memory(handler_input, session_attr)
         # El SDK espera un objeto Response, incluso si está vacío para SessionEndedRequest
         return handler_input.response_builder.response
 
@@ -1373,7 +1487,11 @@ class SessionEndedRequestHandler(AbstractRequestHandler):
 # CONFIGURACIÓN DE LA SKILL Y LAMBDA HANDLER
 # =====================================================================
 
-sb = SkillBuilder()
+# Memoria entre sesiones (USER_MEMORY_BACKEND); sin backend la skill no guarda nada entre sesiones
+sb = CustomSkillBuilder(persistence_adapter=create_persistence_adapter())
+
+sb.add_global_request_interceptor(TurnDeadlineRequestInterceptor())
+sb.add_global_response_interceptor(SessionStateResponseInterceptor())
 
 sb.add_request_handler(LaunchRequestHandler())
 sb.add_request_handler(GptQueryIntentHandler())
@@ -1384,4 +1502,9 @@ sb.add_request_handler(FallbackIntentHandler())
 sb.add_request_handler(SessionEndedRequestHandler())
 sb.add_exception_handler(CatchAllExceptionHandler())
 
-lambda_handler = sb.lambda_handler()
+# Tiempos por fase y perfilado (PHASE_TIMING, PROFILE_MODE): sin ellos el handler del SDK no se envuelve
+lambda_handler = metrics.metered_handler(profiling.profiled_handler(sb.lambda_handler(), metrics.request_label))
+if TRAFFIC_RECORD_PATH:
+    import traffic_recorder
+    traffic_recorder.start_recording(TRAFFIC_RECORD_PATH)
+    lambda_handler = traffic_recorder.recording_handler(lambda_handler)
@@ -0,0 +1,140 @@
+# metrics.py
+# Métricas por proveedor y por intent en CloudWatch Embedded Metric Format (EMF). Durante la
+# invocación se acumulan los valores en memoria (agrupados por dimensiones) y al terminar se
+# escribe un documento JSON por grupo en stdout, que Lambda envía a CloudWatch Logs y CloudWatch
+# convierte en métricas sin llamadas de red adicionales. Cada métrica lleva la lista de valores
+# observados (como máximo EMF_MAX_VALUES), así que en CloudWatch se pueden pedir percentiles.
+# Cada grupo de dimensiones es un documento más que serializar: un intento correcto se anota en un
+# solo grupo (el del proveedor), y todos los documentos se escriben juntos con un único flush.
+# Con METRICS_SINK = "memory" los documentos se guardan en una lista (pruebas y benchmarks).
+
+import json
+import sys
+import threading
+import time
+
+from config import METRICS_SINK, METRICS_NAMESPACE
+
+# Límite de valores por métrica en un documento EMF
+EMF_MAX_VALUES = 100
+
+
+class StdoutSink:
+    """Escribe cada documento EMF en una línea de stdout (CloudWatch Logs en Lambda)"""
+
+    def emit(self, documents):
+        sys.stdout.write("".join(json.dumps(document, ensure_ascii=False, separators=(",", ":")) + "\n"
+                                 for document in documents))
+        sys.stdout.flush()
+
+
+class MemorySink:
+    """Guarda los documentos emitidos en memoria"""
+
+    def __init__(self):
+        self.documents = []
+
+    def emit(self, documents):
+        self.documents.extend(documents)
+
+    def values(self, name, **dimensions):
+        """Todos los valores emitidos de una métrica con esas dimensiones"""
+        found = []
+        for document in self.documents:
+            if name in document and all(document.get(k) == v for k, v in dimensions.items()):
+                found.extend(document[name])
+        return found
+
+
+class MetricsRegistry:
+    """Acumula métricas de la invocación en curso; se vacía en cada flush()"""
+
+    def __init__(self, namespace=METRICS_NAMESPACE, sink=None):
+        self.namespace = namespace
+        self.sink = sink
+        self._lock = threading.Lock()
+        # (dimensiones ordenadas) -> {métrica: (unidad, [valores])}
+        self._groups = {}
+
+    @property
+    def enabled(self):
+        return self.sink is not None
+
+    def record(self, name, value, unit="Milliseconds", **dimensions):
+        """Anota un valor; las dimensiones con valor None se omiten"""
+        if self.sink is None or value is None:
+            return
+        self.record_all(((name, value, unit),), **dimensions)
+
+    def record_all(self, entries, **dimensions):
+        """Anota varios (nombre, valor, unidad) con las mismas dimensiones; los valores None se omiten"""
+        if self.sink is None:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in dimensions.items() if v is not None))
+        with self._lock:
+            metrics = self._groups.setdefault(key, {})
+            for name, value, unit in entries:
+                if value is None:
+                    continue
+                values = metrics.setdefault(name, (unit, []))[1]
+                if len(values) < EMF_MAX_VALUES:
+                    values.append(round(value, 3) if isinstance(value, float) else value)
+
+    def flush(self):
+        """Emite un documento EMF por grupo de dimensiones, todos de una vez, y vacía el acumulado"""
+        if self.sink is None:
+            return
+        with self._lock:
+            groups, self._groups = self._groups, {}
+        if not groups:
+            return
+        timestamp = int(time.time() * 1000)
+        documents = []
+        for key, metrics in groups.items():
+            document = {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [[name for name, _ in key]],
+                        "Metrics": [{"Name": name, "Unit": unit} for name, (unit, _) in metrics.items()],
+                    }],
+                },
+            }
+            document.update(key)
+            for name, (_, values) in metrics.items():
+                document[name] = values
+            documents.append(document)
+        self.sink.emit(documents)
+
+
+def create_registry(sink=METRICS_SINK):
+    """Registro con el sink configurado: "emf" (stdout), "memory" o None (desactivado)"""
+    if sink == "emf":
+        return MetricsRegistry(sink=StdoutSink())
+    if sink == "memory":
+        return MetricsRegistry(sink=MemorySink())
+    return MetricsRegistry(sink=None)
+
+
+registry = create_registry()
+
+
+def request_label(event):
+    """Nombre del intent (o tipo de petición) de un envelope de Alexa"""
+    request = event.get("request", {})
+    if request.get("type") == "IntentRequest":
+        return request.get("intent", {}).get("name")
+    return request.get("type")
+
+
+def metered_handler(handler):
+    """Envuelve el lambda_handler del SDK: mide la invocación por intent y emite las métricas al terminar"""
+    def lambda_handler(event, context):
+        started = time.monotonic()
+        try:
+            return handler(event, context)
+        finally:
+            registry.record("InvocationTime", (time.monotonic() - started) * 1000, Intent=request_label(event))
+            registry.flush()
+    return lambda_handler
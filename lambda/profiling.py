@@ -0,0 +1,253 @@
+# profiling.py
+# Diagnóstico de rendimiento por invocación, desactivado por defecto.
+# - Tiempos por fase (PHASE_TIMING): un PhaseTimer por invocación acumula cuánto duró cada fase
+#   (deserialización del SDK, handler, historial, codificación, espera de red, procesado de la
+#   respuesta...) y se escribe una línea en el log al terminar. Sin PHASE_TIMING el temporizador es
+#   NULL_TIMER, cuyas operaciones no hacen nada y no reservan memoria.
+# - Perfilado (PROFILE_MODE): para una fracción de las invocaciones se captura un perfil cProfile
+#   o un muestreo de pilas y se escribe compacto en el log o en un archivo en PROFILE_OUTPUT.
+# Las fases del hilo principal se marcan con current_timer(); los intentos a proveedores (que
+# pueden ir en otros hilos o en el bucle asyncio) usan el temporizador guardado en el TurnDeadline.
+
+import collections
+import contextvars
+import io
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+from config import PHASE_TIMING, PROFILE_MODE, PROFILE_SAMPLE_RATE, PROFILE_SAMPLING_INTERVAL, PROFILE_OUTPUT, PROFILE_TOP
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Profundidad máxima de las pilas muestreadas
+_MAX_STACK_DEPTH = 64
+
+
+class _NullPhase:
+    """Context manager vacío compartido por todas las fases de NULL_TIMER"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullTimer:
+    """Temporizador desactivado: mismo interfaz que PhaseTimer sin ningún costo"""
+    enabled = False
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+    def mark(self, name):
+        pass
+
+    def add(self, name, seconds):
+        pass
+
+    def summary(self):
+        return ""
+
+
+NULL_TIMER = NullTimer()
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "started")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class PhaseTimer:
+    """
+    Tiempo acumulado por fase de una invocación. mark() mide fases consecutivas del hilo
+    principal; phase() mide un bloque y suma si se repite (p. ej. la red de varios intentos en
+    paralelo, así que la suma de las fases puede superar el total).
+    """
+    enabled = True
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._last_mark = self.started_at
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    def mark(self, name):
+        """Registra la fase que termina ahora, desde la marca anterior"""
+        now = time.perf_counter()
+        self.add(name, now - self._last_mark)
+        self._last_mark = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    def summary(self):
+        """Línea compacta para logs: total y cada fase en milisegundos, en orden de aparición"""
+        with self._lock:
+            parts = [f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.totals.items()]
+        return f"total={self.elapsed() * 1000:.1f}ms " + " ".join(parts)
+
+
+_current_timer = contextvars.ContextVar("phase_timer", default=NULL_TIMER)
+
+
+def current_timer():
+    """Temporizador de la invocación en curso (NULL_TIMER si PHASE_TIMING está desactivado)"""
+    return _current_timer.get()
+
+
+class CProfileCapture:
+    """Perfil determinista con cProfile del hilo que atiende la invocación"""
+    suffix = ".prof"
+
+    def start(self):
+        import cProfile
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def report(self, limit):
+        """Las funciones con más tiempo acumulado, como texto de pstats"""
+        import pstats
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).strip_dirs().sort_stats("cumulative").print_stats(limit)
+        return "\n".join(line for line in stream.getvalue().splitlines() if line.strip())
+
+    def dump(self, path):
+        """Archivo de pstats, para abrir con snakeviz o python -m pstats"""
+        self.profile.dump_stats(path)
+
+
+class SamplingProfiler:
+    """
+    Muestrea las pilas de todos los hilos (incluidos los intentos en paralelo y el bucle asyncio)
+    cada interval segundos desde un hilo propio. Su costo no depende de cuántas funciones se
+    llamen, a diferencia de cProfile. Las pilas se acumulan en formato "folded" (raíz;...;hoja).
+    """
+    suffix = ".folded"
+
+    def __init__(self, interval=PROFILE_SAMPLING_INTERVAL):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        # La primera muestra es inmediata para no perder las invocaciones más cortas que el intervalo
+        while True:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self.stacks[self._fold(frame)] += 1
+            self.samples += 1
+            if self._stop.wait(self.interval):
+                return
+
+    @staticmethod
+    def _fold(frame):
+        names = []
+        while frame is not None and len(names) < _MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def report(self, limit):
+        """Las pilas más frecuentes con su número de muestras (solo los últimos marcos de cada una)"""
+        lines = [f"{self.samples} muestras cada {self.interval * 1000:.0f}ms"]
+        for stack, count in self.stacks.most_common(limit):
+            lines.append(f"{count:5d} {';'.join(stack.split(';')[-6:])}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Pilas completas en formato folded, para flamegraph.pl o speedscope"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+def create_profiler(mode=PROFILE_MODE):
+    if mode == "cprofile":
+        return CProfileCapture()
+    if mode == "sampling":
+        return SamplingProfiler()
+    return None
+
+
+def _write_profile(profiler, label, output):
+    if output == "log":
+        logger.info(f"Perfil de la invocación ({label}):\n{profiler.report(PROFILE_TOP)}")
+        return
+    os.makedirs(output, exist_ok=True)
+    path = os.path.join(output, f"{int(time.time() * 1000)}-{label}{profiler.suffix}")
+    profiler.dump(path)
+    logger.info(f"Perfil de la invocación ({label}) guardado en {path}")
+
+
+def profiled_handler(handler, label_for=lambda event: None):
+    """
+    Envuelve el lambda_handler con los tiempos por fase y el perfilado. Si ambos están
+    desactivados se devuelve el handler sin envolver, así que no cuestan nada.
+    """
+    if not PHASE_TIMING and not PROFILE_MODE:
+        return handler
+
+    def lambda_handler(event, context):
+        timer = PhaseTimer() if PHASE_TIMING else NULL_TIMER
+        token = _current_timer.set(timer)
+        profiler = None
+        if PROFILE_MODE and random.random() < PROFILE_SAMPLE_RATE:
+            profiler = create_profiler(PROFILE_MODE)
+            profiler.start()
+        try:
+            return handler(event, context)
+        finally:
+            timer.mark("sdk_salida")
+            _current_timer.reset(token)
+            label = label_for(event) or "invocacion"
+            if profiler is not None:
+                profiler.stop()
+                try:
+                    _write_profile(profiler, label, PROFILE_OUTPUT)
+                except OSError as e:
+                    logger.warning(f"No se pudo guardar el perfil: {e}")
+            if timer.enabled:
+                logger.info(f"Fases de la invocación ({label}): {timer.summary()}")
+    return lambda_handler
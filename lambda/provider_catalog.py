@@ -0,0 +1,214 @@
+# provider_catalog.py
+# Catálogo declarativo de proveedores de IA. Cada familia (API + URL + estilo de headers) y cada
+# modelo se describen una sola vez en tablas de datos; al arrancar el contenedor se compilan en
+# registros inmutables (namedtuple) con los headers ya construidos para la API key de la familia.
+# Para agregar un modelo basta con añadir una fila a PROVIDERS.
+
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from config import GENERATION_MAX_TOKENS, HISTORY_TOKEN_BUDGET
+from generation_budget import model_class
+from history_window import tokenizer_family
+
+CONTENT_TYPE_JSON = "application/json"
+
+# Constantes para OpenRouter
+OPENROUTER_REFERER = "https://alexa-chatgpt.com"
+OPENROUTER_TITLE = "Alexa ChatGPT Skill"
+
+DEFAULT_TIMEOUT = 7
+
+# familia: (formato de la API, URL, estilo de headers). En Gemini la URL depende del modelo.
+FAMILIES = {
+    "gemini": ("gemini", "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent", "plain"),
+    "openai": ("openai", "https://api.openai.com/v1/chat/completions", "bearer"),
+    "github": ("openai", "https://models.github.ai/inference/chat/completions", "bearer"),
+    "openrouter": ("openai", "https://openrouter.ai/api/v1/chat/completions", "openrouter"),
+    "cerebras": ("openai", "https://api.cerebras.ai/v1/chat/completions", "bearer"),
+    "deepinfra": ("openai", "https://api.deepinfra.com/v1/openai/chat/completions", "bearer"),
+    "moonshot": ("openai", "https://api.moonshot.cn/v1/chat/completions", "bearer"),
+    "chutes": ("openai", "https://llm.chutes.ai/v1/chat/completions", "bearer"),
+    "groq": ("openai", "https://api.groq.com/openai/v1/chat/completions", "bearer"),
+}
+
+# (nombre del proveedor, familia, modelo)
+PROVIDERS = (
+    # Gemini (Google API directo, solo texto)
+    ("gemini_20", "gemini", "gemini-2.0-flash"),
+    ("gemini_25", "gemini", "gemini-2.5-flash-preview-05-20"),
+
+    ("openai", "openai", "gpt-4.1-mini"),
+    ("openai_gpt4o_mini", "openai", "gpt-4o-mini"),
+    ("openai_o4_mini", "openai", "o4-mini"),
+    ("openai_o3_mini", "openai", "o3-mini"),
+
+    ("github", "github", "openai/gpt-4.1-mini"),
+    ("github_openai_o4_mini", "github", "openai/o4-mini"),
+    ("github_openai_o3_mini", "github", "openai/o3-mini"),
+    ("github_openai_gpt4o_mini", "github", "openai/gpt-4o-mini"),
+
+    # OpenRouter: modelos Llama
+    ("openrouter", "openrouter", "meta-llama/llama-4-maverick"),
+    ("openrouter_llama_maverick", "openrouter", "meta-llama/llama-4-maverick:free"),
+    # OpenRouter: modelos DeepSeek
+    ("openrouter_deepseek_r1", "openrouter", "deepseek/deepseek-r1"),
+    ("openrouter_deepseek_r1_free", "openrouter", "deepseek/deepseek-r1:free"),
+    ("openrouter_deepseek_r1_0528", "openrouter", "deepseek/deepseek-r1-0528"),
+    ("openrouter_deepseek_r1_0528_free", "openrouter", "deepseek/deepseek-r1-0528:free"),
+    ("openrouter_deepseek_chimera", "openrouter", "tngtech/deepseek-r1t-chimera:free"),
+    ("openrouter_deepseek_chat_v3", "openrouter", "deepseek/deepseek-chat-v3-0324"),
+    ("openrouter_deepseek_chat_v3_free", "openrouter", "deepseek/deepseek-chat-v3-0324:free"),
+    # OpenRouter: modelos Qwen
+    ("openrouter_qwen3_235b", "openrouter", "qwen/qwen3-235b-a22b"),
+    ("openrouter_qwen3_235b_free", "openrouter", "qwen/qwen3-235b-a22b:free"),
+    ("openrouter_qwen_qwq", "openrouter", "qwen/qwq-32b"),
+    ("openrouter_qwen_qwq_free", "openrouter", "qwen/qwq-32b:free"),
+    # OpenRouter: modelos Microsoft
+    ("openrouter_microsoft_mai", "openrouter", "microsoft/mai-ds-r1:free"),
+    # OpenRouter: modelos OpenAI
+    ("openrouter_openai_gpt41_mini", "openrouter", "openai/gpt-4.1-mini"),
+    ("openrouter_openai_gpt4o_mini", "openrouter", "openai/gpt-4o-mini"),
+    ("openrouter_openai_o4_mini", "openrouter", "openai/o4-mini"),
+    # OpenRouter: modelos Google Gemini
+    ("openrouter_google_gemini_20", "openrouter", "google/gemini-2.0-flash-001"),
+    ("openrouter_google_gemini_25", "openrouter", "google/gemini-2.5-flash-preview-05-20"),
+    # OpenRouter: modelos NVIDIA y Meta
+    ("openrouter_nvidia_llama31_nemotron_ultra_253b_free", "openrouter", "nvidia/llama-3.1-nemotron-ultra-253b-v1:free"),
+    ("openrouter_meta_llama33_70b_instruct_free", "openrouter", "meta-llama/llama-3.3-70b-instruct:free"),
+    ("openrouter_meta_llama31_405b_free", "openrouter", "meta-llama/llama-3.1-405b:free"),
+
+    ("cerebras", "cerebras", "llama-4-scout-17b-16e-instruct"),
+    ("cerebras_llama4_scout", "cerebras", "llama-4-scout-17b-16e-instruct"),
+    ("cerebras_llama33_70b", "cerebras", "llama-3.3-70b"),
+    ("cerebras_qwen3_32b", "cerebras", "qwen-3-32b"),
+    ("cerebras_deepseek_r1_distill_llama_70b", "cerebras", "deepseek-r1-distill-llama-70b"),
+
+    ("deepinfra_deepseek_v3", "deepinfra", "deepseek-ai/DeepSeek-V3-0324"),
+    ("deepinfra_qwen_qwq_32b", "deepinfra", "Qwen/QwQ-32B"),
+    ("deepinfra_deepseek_r1", "deepinfra", "deepseek-ai/DeepSeek-R1"),
+    ("deepinfra_llama4_maverick", "deepinfra", "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8"),
+    ("deepinfra_qwen3_32b", "deepinfra", "Qwen/Qwen3-32B"),
+    ("deepinfra_deepseek_r1_0528", "deepinfra", "deepseek-ai/DeepSeek-R1-0528"),
+
+    ("moonshot", "moonshot", "moonshot-v1-8k"),
+
+    ("chutes_deepseek_r1_0528", "chutes", "deepseek-ai/DeepSeek-R1-0528"),
+    ("chutes_deepseek_r1", "chutes", "deepseek-ai/DeepSeek-R1"),
+    ("chutes_deepseek_v3", "chutes", "deepseek-ai/DeepSeek-V3-0324"),
+    ("chutes_deepseek_chimera", "chutes", "tngtech/DeepSeek-R1T-Chimera"),
+    ("chutes_qwen3_235b", "chutes", "Qwen/Qwen3-235B-A22B"),
+    ("chutes_microsoft_mai", "chutes", "microsoft/MAI-DS-R1-FP8"),
+    ("chutes_glm4_32b", "chutes", "THUDM/GLM-4-32B-0414"),
+
+    ("groq_compound_beta", "groq", "compound-beta"),
+    ("groq_compound_beta_mini", "groq", "compound-beta-mini"),
+    ("groq_llama4_maverick", "groq", "meta-llama/llama-4-maverick-17b-128e-instruct"),
+    ("groq_qwen_qwq_32b", "groq", "qwen-qwq-32b"),
+)
+
+# Nombres distintos del mismo modelo en distintos hosts (ya normalizados con base_model)
+MODEL_ALIASES = {
+    "gemini-2.0-flash-001": "gemini-2.0-flash",
+    "deepseek-chat-v3-0324": "deepseek-v3-0324",
+    "qwen-qwq-32b": "qwq-32b",
+    "qwen-3-32b": "qwen3-32b",
+    "llama-4-maverick": "llama-4-maverick-17b-128e-instruct",
+    "llama-3.3-70b-instruct": "llama-3.3-70b",
+}
+
+# Registro compilado de un proveedor. namedtuple no tiene __dict__ por instancia y es inmutable:
+# para cambiar un campo (p. ej. la URL en un benchmark) se usa spec._replace(url=...).
+ProviderSpec = namedtuple("ProviderSpec", [
+    "name",         # nombre lógico del proveedor ("openrouter_deepseek_r1")
+    "family",       # familia / cuenta ("openrouter")
+    "api",          # formato de la petición: "openai" (chat/completions) o "gemini"
+    "url",
+    "host",
+    "model",
+    "base_model",   # modelo subyacente, común a todos los hosts que lo sirven (dominio de fallo)
+    "key",          # API key de la familia (None si no está configurada)
+    "headers",      # headers HTTP ya construidos para esa key; no se deben modificar
+    "timeout",
+    "max_tokens",   # límite de generación según la clase de modelo
+    "model_class",  # "standard" o "reasoning"
+    "free",         # variante gratuita (":free") con cuota diaria propia
+    "tokenizer",    # familia de tokenizador para estimar tokens ("openai", "llama", "qwen"...)
+    "history_budget",  # tokens de historial de conversación que se envían por turno
+])
+
+
+def base_model(model):
+    """
+    Modelo subyacente de un identificador de modelo: sin organización, variante ":free" ni sufijo
+    de cuantización ("deepseek-ai/DeepSeek-R1" y "deepseek/deepseek-r1:free" -> "deepseek-r1")
+    """
+    name = model.rsplit("/", 1)[-1].split(":", 1)[0].lower()
+    if name.endswith("-fp8"):
+        name = name[:-len("-fp8")]
+    return MODEL_ALIASES.get(name, name)
+
+
+def build_headers(style, key):
+    """Headers HTTP de una familia para una API key"""
+    if style == "plain":
+        # Gemini recibe la key en la URL
+        return {"Content-Type": CONTENT_TYPE_JSON}
+    headers = {
+        "Authorization": f"Bearer {key}",
+        "Content-Type": CONTENT_TYPE_JSON
+    }
+    if style == "openrouter":
+        headers["HTTP-Referer"] = OPENROUTER_REFERER
+        headers["X-Title"] = OPENROUTER_TITLE
+    return headers
+
+
+def compile_catalog(keys, providers=PROVIDERS, families=FAMILIES):
+    """
+    Compila las tablas en un dict nombre -> ProviderSpec (en el orden del catálogo).
+    keys es un dict familia -> API key. Los headers se construyen una vez por familia y
+    todos los proveedores de esa familia comparten el mismo dict.
+    """
+    # Datos por familia (headers y host) y por modelo (clase, límites de tokens y tokenizador) se calculan una sola vez
+    by_family = {}
+    by_model = {}
+    compiled = {}
+    for name, family, model in providers:
+        family_data = by_family.get(family)
+        if family_data is None:
+            api, url, style = families[family]
+            key = keys.get(family)
+            family_data = by_family[family] = (api, url, urlsplit(url).netloc, key, build_headers(style, key))
+        api, url, host, key, headers = family_data
+        model_data = by_model.get(model)
+        if model_data is None:
+            cls = model_class(model)
+            model_data = by_model[model] = (GENERATION_MAX_TOKENS[cls], cls, model.endswith(":free"),
+                                            tokenizer_family(model), HISTORY_TOKEN_BUDGET[cls])
+        compiled[name] = ProviderSpec(name, family, api, url.format(model=model) if api == "gemini" else url,
+                                      host, model, base_model(model), key, headers, DEFAULT_TIMEOUT, *model_data)
+    return compiled
+
+
+def build_indexes(specs):
+    """
+    Índices de proveedores por host, familia, modelo subyacente y capacidad ("standard",
+    "reasoning", "free"), como tuplas en el orden del catálogo.
+    """
+    by_host = {}
+    by_family = {}
+    by_model = {}
+    by_capability = {}
+    for spec in specs:
+        by_host.setdefault(spec.host, []).append(spec.name)
+        by_model.setdefault(spec.base_model, []).append(spec.name)
+        by_family.setdefault(spec.family, []).append(spec.name)
+        by_capability.setdefault(spec.model_class, []).append(spec.name)
+        if spec.free:
+            by_capability.setdefault("free", []).append(spec.name)
+
+    def freeze(index):
+        return {k: tuple(v) for k, v in index.items()}
+
+    return freeze(by_host), freeze(by_family), freeze(by_model), freeze(by_capability)
@@ -0,0 +1,182 @@
+# provider_health.py
+# Registro de salud de proveedores a nivel de contenedor, con circuit breaker por proveedor.
+# Sobrevive entre sesiones mientras el contenedor esté "warm" y opcionalmente se sincroniza
+# con un StateStore compartido para que otros contenedores vean los mismos fallos.
+
+import logging
+import threading
+import time
+from collections import deque
+
+from config import (HEALTH_WINDOW, HEALTH_MIN_CALLS, HEALTH_FAILURE_RATE, HEALTH_CONSECUTIVE_FAILURES,
+                    HEALTH_OPEN_SECONDS, HEALTH_SYNC_INTERVAL)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Resultados que cuentan como fallo del proveedor (un 4xx suele ser problema de la petición)
+FAILURE_OUTCOMES = ("timeout", "connection", "http_5xx", "http_429", "empty")
+
+STATE_KEY = "provider_health"
+
+
+def classify_outcome(error_type, status=None, exception_kind=None):
+    """Traduce el resultado de un intento a una categoría: success, timeout, http_429, http_5xx, etc."""
+    if error_type is None:
+        return "success"
+    if exception_kind:
+        return exception_kind
+    if status == 429:
+        return "http_429"
+    if status is not None and status >= 500:
+        return "http_5xx"
+    if status is not None and status >= 400:
+        return "http_4xx"
+    # Respuesta 200 sin texto utilizable: se trata como fallo de conexión, igual que el fallback
+    return "empty" if error_type == "connection" else "invalid"
+
+
+class ProviderHealth:
+    """Ventana móvil de resultados y estado del circuit breaker de un proveedor"""
+
+    def __init__(self, window=HEALTH_WINDOW):
+        self.outcomes = deque(maxlen=window)
+        self.counts = {}
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.probe_started_at = 0.0
+        self.updated_at = 0.0
+
+    def success_rate(self):
+        if not self.outcomes:
+            return 1.0
+        return sum(1 for o in self.outcomes if o == "success") / len(self.outcomes)
+
+    def to_dict(self):
+        return {
+            "outcomes": list(self.outcomes),
+            "counts": self.counts,
+            "state": self.state,
+            "opened_at": self.opened_at,
+            "consecutive_failures": self.consecutive_failures,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        health = cls()
+        health.outcomes.extend(data.get("outcomes", []))
+        health.counts = dict(data.get("counts", {}))
+        health.state = data.get("state", CLOSED)
+        health.opened_at = data.get("opened_at", 0.0)
+        health.consecutive_failures = data.get("consecutive_failures", 0)
+        health.updated_at = data.get("updated_at", 0.0)
+        return health
+
+
+class HealthRegistry:
+    """Marcador de salud de todos los proveedores del contenedor"""
+
+    def __init__(self, store=None, open_seconds=HEALTH_OPEN_SECONDS):
+        self.store = store
+        self.open_seconds = open_seconds
+        self._providers = {}
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._sync(force=True)
+
+    def _get(self, provider_name):
+        health = self._providers.get(provider_name)
+        if health is None:
+            health = self._providers[provider_name] = ProviderHealth()
+        return health
+
+    def is_available(self, provider_name, now=None):
+        """False si el circuito está abierto; en half-open solo deja pasar una sonda a la vez"""
+        now = now or time.time()
+        with self._lock:
+            health = self._providers.get(provider_name)
+            if health is None or health.state == CLOSED:
+                return True
+            if now - health.opened_at < self.open_seconds:
+                return False
+            # Pasó el tiempo de enfriamiento: permitir una sonda, salvo que ya haya otra en vuelo
+            return now - health.probe_started_at >= self.open_seconds
+
+    def filter_available(self, provider_names):
+        return [p for p in provider_names if self.is_available(p)]
+
+    def before_attempt(self, provider_name):
+        """Marca el inicio de un intento; si el circuito estaba abierto, este intento es la sonda"""
+        now = time.time()
+        with self._lock:
+            health = self._providers.get(provider_name)
+            if health and health.state != CLOSED and now - health.opened_at >= self.open_seconds:
+                health.state = HALF_OPEN
+                health.probe_started_at = now
+                logger.info(f"Circuito de {provider_name} en half-open, enviando sonda")
+
+    def record(self, provider_name, outcome):
+        """Registra el resultado de un intento y actualiza el circuit breaker"""
+        now = time.time()
+        with self._lock:
+            health = self._get(provider_name)
+            previous_state = health.state
+            health.outcomes.append(outcome)
+            health.counts[outcome] = health.counts.get(outcome, 0) + 1
+            health.updated_at = now
+
+            if outcome not in FAILURE_OUTCOMES:
+                health.consecutive_failures = 0
+                if health.state != CLOSED:
+                    logger.info(f"Circuito de {provider_name} cerrado tras respuesta exitosa")
+                    health.state = CLOSED
+                    health.outcomes.clear()
+                    health.outcomes.append(outcome)
+            else:
+                health.consecutive_failures += 1
+                failure_rate = 1.0 - health.success_rate()
+                if health.state == HALF_OPEN or health.consecutive_failures >= HEALTH_CONSECUTIVE_FAILURES or (
+                        len(health.outcomes) >= HEALTH_MIN_CALLS and failure_rate >= HEALTH_FAILURE_RATE):
+                    if health.state != OPEN:
+                        logger.warning(f"Circuito de {provider_name} abierto: último={outcome}, "
+                                       f"tasa_fallos={failure_rate:.2f}, consecutivos={health.consecutive_failures}")
+                    health.state = OPEN
+                    health.opened_at = now
+            state_changed = health.state != previous_state
+        # Los cambios de estado del circuito se publican de inmediato para los demás contenedores
+        self._sync(force=state_changed)
+
+    def snapshot(self):
+        """Estado legible de todos los proveedores (para logs y métricas)"""
+        with self._lock:
+            return {name: {"state": h.state, "success_rate": round(h.success_rate(), 2), "counts": dict(h.counts)}
+                    for name, h in self._providers.items()}
+
+    def _sync(self, force=False):
+        """Fusiona con el backend compartido (gana el estado más reciente de cada proveedor)"""
+        if self.store is None:
+            return
+        now = time.time()
+        if not force and now - self._last_sync < HEALTH_SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        try:
+            remote = self.store.get(STATE_KEY) or {}
+            with self._lock:
+                for name, data in remote.items():
+                    local = self._providers.get(name)
+                    if local is None or data.get("updated_at", 0) > local.updated_at:
+                        self._providers[name] = ProviderHealth.from_dict(data)
+                merged = {name: h.to_dict() for name, h in self._providers.items()}
+            # Sin cambios locales desde la última sincronización no se escribe: con DynamoDB cada put
+            # es una escritura bloqueante dentro del turno
+            if merged != remote:
+                self.store.put(STATE_KEY, merged)
+        except Exception as e:
+            # El estado compartido es una optimización: nunca debe romper el turno
+            logger.warning(f"No se pudo sincronizar la salud de proveedores: {str(e)}")
@@ -0,0 +1,86 @@
+# provider_selection.py
+# Selección ponderada de proveedores a partir de la latencia observada en el contenedor.
+# Mantiene una media móvil exponencial (EWMA) de la latencia total y del tiempo hasta el
+# primer token de cada proveedor, y reparte el tráfico hacia los más rápidos sin dejar de
+# explorar los que aún no tienen mediciones.
+
+import math
+import random
+import threading
+
+from config import (SELECTION_STRATEGY, SELECTION_EXPLORATION_RATE, SELECTION_EWMA_ALPHA,
+                    SELECTION_PRIOR_LATENCY, SELECTION_FAILURE_PENALTY, SELECTION_TEMPERATURE)
+
+
+class LatencyStats:
+    """Medias móviles de latencia de un proveedor"""
+    __slots__ = ("latency", "ttft", "samples")
+
+    def __init__(self):
+        self.latency = None
+        self.ttft = None
+        self.samples = 0
+
+
+def _ewma(previous, value, alpha):
+    return value if previous is None else alpha * value + (1 - alpha) * previous
+
+
+class LatencySelector:
+    """Elige proveedores según su latencia esperada (power-of-two-choices o softmax)"""
+
+    def __init__(self, strategy=SELECTION_STRATEGY, exploration_rate=SELECTION_EXPLORATION_RATE,
+                 alpha=SELECTION_EWMA_ALPHA, rng=None):
+        self.strategy = strategy
+        self.exploration_rate = exploration_rate
+        self.alpha = alpha
+        self.rng = rng or random.Random()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def observe(self, provider_name, latency, ttft=None, success=True):
+        """Registra la latencia (s) de un intento; los fallos se penalizan para que bajen de prioridad"""
+        if not success:
+            latency += SELECTION_FAILURE_PENALTY
+        with self._lock:
+            stats = self._stats.get(provider_name)
+            if stats is None:
+                stats = self._stats[provider_name] = LatencyStats()
+            stats.latency = _ewma(stats.latency, latency, self.alpha)
+            if ttft is not None:
+                stats.ttft = _ewma(stats.ttft, ttft, self.alpha)
+            stats.samples += 1
+
+    def expected_latency(self, provider_name):
+        stats = self._stats.get(provider_name)
+        if stats is None or stats.latency is None:
+            return SELECTION_PRIOR_LATENCY
+        return stats.latency
+
+    def choose(self, candidates):
+        """Elige un proveedor de la lista de candidatos"""
+        if not candidates:
+            return None
+        if len(candidates) == 1 or self.strategy == "random":
+            return self.rng.choice(candidates)
+
+        if self.rng.random() < self.exploration_rate:
+            # Exploración: priorizar los proveedores que todavía no se han medido
+            cold = [p for p in candidates if p not in self._stats]
+            return self.rng.choice(cold or candidates)
+
+        if self.strategy == "softmax":
+            weights = [math.exp(-self.expected_latency(p) / SELECTION_TEMPERATURE) for p in candidates]
+            return self.rng.choices(candidates, weights=weights)[0]
+
+        # Power of two choices: barato y evita que todo el tráfico vaya a un único proveedor
+        first, second = self.rng.sample(candidates, 2)
+        return first if self.expected_latency(first) <= self.expected_latency(second) else second
+
+    def snapshot(self):
+        """Latencias medias por proveedor en milisegundos (para logs y métricas)"""
+        with self._lock:
+            return {name: {"latency_ms": round(s.latency * 1000) if s.latency is not None else None,
+                           "ttft_ms": round(s.ttft * 1000) if s.ttft is not None else None,
+                           "samples": s.samples}
+                    for name, s in self._stats.items()}
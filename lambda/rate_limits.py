@@ -0,0 +1,263 @@
+# rate_limits.py
+# Planificador de límites de uso (rate limits) por API key. Los proveedores de una misma familia
+# comparten key, así que un 429 de uno suele significar que los demás también van a recibirlo:
+# el límite se lleva por "ámbito" (la familia o, en las familias que limitan por modelo, la
+# familia y el modelo) y todos los proveedores del ámbito se evitan hasta que se reinicie.
+# - Cubeta de tokens local con las peticiones por minuto conocidas (RATE_LIMIT_RPM), para no
+#   llegar al 429 en primer lugar. Los valores por defecto son los de los planes gratuitos y hay
+#   que ajustarlos al plan de cada cuenta; una familia sin entrada no tiene cubeta.
+# - Enfriamiento aprendido de las respuestas: Retry-After, x-ratelimit-* (OpenAI, Groq,
+#   OpenRouter) y retryDelay del cuerpo de error de Gemini.
+# Los enfriamientos se comparten con otros contenedores "warm" a través del StateStore
+# (SHARED_STATE_BACKEND), igual que la salud de los proveedores; las cubetas son locales de cada
+# contenedor.
+
+import email.utils
+import json
+import logging
+import re
+import threading
+import time
+
+from config import (RATE_LIMIT_ENABLED, RATE_LIMIT_RPM, RATE_LIMIT_PER_MODEL, RATE_LIMIT_DEFAULT_COOLDOWN,
+                    RATE_LIMIT_MAX_COOLDOWN, RATE_LIMIT_SYNC_INTERVAL)
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "rate_limits"
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value):
+    """Segundos de una duración "6m0s", "1.5s", "20ms" (OpenAI/Groq) o de un número de segundos"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def parse_retry_after(value, now):
+    """Segundos de espera de un Retry-After, en segundos o como fecha HTTP"""
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() - now
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_reset(value, now):
+    """Segundos hasta el reinicio: epoch en ms (OpenRouter), epoch en segundos o duración"""
+    seconds = parse_duration(value)
+    if seconds is None:
+        return None
+    if seconds > 1e12:
+        return seconds / 1000.0 - now
+    if seconds > 1e9:
+        return seconds - now
+    return seconds
+
+
+def retry_delay_from_body(body):
+    """retryDelay ("37s") del detalle RetryInfo de un error 429 de Gemini, si lo hay"""
+    try:
+        details = json.loads(body).get("error", {}).get("details", [])
+    except (ValueError, AttributeError):
+        return None
+    for detail in details if isinstance(details, list) else ():
+        if isinstance(detail, dict) and detail.get("retryDelay"):
+            return parse_duration(detail["retryDelay"])
+    return None
+
+
+def limits_from_response(status, headers, body=None, now=None):
+    """
+    (segundos de enfriamiento o None, peticiones restantes o None) de una respuesta. Hay
+    enfriamiento tras un 429 o cuando las cabeceras dicen que no quedan peticiones o tokens.
+    """
+    now = now or time.time()
+    headers = headers or {}
+    remaining = None
+    cooldown = None
+    # OpenAI y Groq: -requests y -tokens, con reinicio como duración; OpenRouter: sin sufijo, epoch en ms
+    for suffix in ("-requests", "-tokens", ""):
+        left = headers.get(f"x-ratelimit-remaining{suffix}")
+        if left is None:
+            continue
+        try:
+            left = int(float(left))
+        except ValueError:
+            continue
+        if suffix != "-tokens":
+            remaining = left if remaining is None else min(remaining, left)
+        reset = headers.get(f"x-ratelimit-reset{suffix}")
+        if left <= 0 and reset:
+            wait = parse_reset(reset, now)
+            if wait is not None:
+                cooldown = max(cooldown or 0.0, wait)
+    if status == 429:
+        retry_after = headers.get("retry-after")
+        wait = parse_retry_after(retry_after, now) if retry_after else None
+        if wait is None and body:
+            wait = retry_delay_from_body(body)
+        if wait is not None:
+            cooldown = max(cooldown or 0.0, wait)
+        elif cooldown is None:
+            cooldown = RATE_LIMIT_DEFAULT_COOLDOWN
+    if cooldown is not None:
+        cooldown = min(max(cooldown, 0.0), RATE_LIMIT_MAX_COOLDOWN)
+    return cooldown, remaining
+
+
+def scope_for(spec):
+    """
+    Ámbito del límite de un proveedor: la familia (su key), la familia y el modelo o, para los
+    modelos gratuitos, la familia y "free" (OpenRouter los limita aparte de los de pago)
+    """
+    if spec.family in RATE_LIMIT_PER_MODEL:
+        return f"{spec.family}:{spec.model}"
+    if spec.free:
+        return f"{spec.family}:free"
+    return spec.family
+
+
+class TokenBucket:
+    """Cubeta de tokens: per_minute peticiones por minuto con ráfagas de hasta per_minute"""
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, per_minute, now):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated_at = now
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self, now):
+        self._refill(now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def cap(self, remaining, now):
+        """Ajusta la cubeta a las peticiones restantes que informa el proveedor"""
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+
+
+class RateLimitRegistry:
+    """Cubetas y enfriamientos por ámbito de todos los proveedores del contenedor"""
+
+    def __init__(self, store=None, enabled=RATE_LIMIT_ENABLED, rpm=RATE_LIMIT_RPM):
+        self.store = store
+        self.enabled = enabled
+        self.rpm = rpm
+        self._buckets = {}
+        # ámbito -> epoch hasta el que no se debe usar
+        self._cooldowns = {}
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        if enabled:
+            self._sync(force=True)
+
+    def _bucket(self, spec, now):
+        scope = scope_for(spec)
+        bucket = self._buckets.get(scope)
+        if bucket is None and self.rpm.get(spec.family):
+            bucket = self._buckets[scope] = TokenBucket(self.rpm[spec.family], now)
+        return bucket
+
+    def is_available(self, spec, now=None):
+        """False si el ámbito del proveedor está enfriándose o sin tokens en su cubeta"""
+        if not self.enabled:
+            return True
+        self._sync()
+        now = now or time.time()
+        with self._lock:
+            if self._cooldowns.get(scope_for(spec), 0.0) > now:
+                return False
+            bucket = self._bucket(spec, now)
+            return bucket is None or bucket.available(now)
+
+    def acquire(self, spec):
+        """Reserva una petición para el proveedor; False si hay que evitarlo (no se debe enviar)"""
+        if not self.enabled:
+            return True
+        now = time.time()
+        with self._lock:
+            if self._cooldowns.get(scope_for(spec), 0.0) > now:
+                return False
+            bucket = self._bucket(spec, now)
+            return bucket is None or bucket.take(now)
+
+    def observe(self, spec, status, headers, body=None):
+        """
+        Aprende de la respuesta de un proveedor: ajusta la cubeta a las peticiones restantes y, tras
+        un 429 o sin peticiones restantes, enfría el ámbito. Devuelve los segundos de enfriamiento.
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        cooldown, remaining = limits_from_response(status, headers, body, now)
+        scope = scope_for(spec)
+        with self._lock:
+            if remaining is not None:
+                bucket = self._bucket(spec, now)
+                if bucket is not None:
+                    bucket.cap(remaining, now)
+            if not cooldown:
+                return None
+            self._cooldowns[scope] = max(self._cooldowns.get(scope, 0.0), now + cooldown)
+        logger.warning(f"Límite de uso en {scope} (vía {spec.name}, HTTP {status}): "
+                       f"se evitará durante {cooldown:.0f}s")
+        self._sync(force=True)
+        return cooldown
+
+    def snapshot(self):
+        """Segundos de enfriamiento restantes y tokens disponibles por ámbito (para logs y métricas)"""
+        now = time.time()
+        with self._lock:
+            state = {scope: {"cooldown": round(until - now, 1)} for scope, until in self._cooldowns.items()
+                     if until > now}
+            for scope, bucket in self._buckets.items():
+                bucket._refill(now)
+                state.setdefault(scope, {})["tokens"] = round(bucket.tokens, 1)
+        return state
+
+    def _sync(self, force=False):
+        """Fusiona los enfriamientos con el backend compartido (gana el más largo)"""
+        if self.store is None:
+            return
+        now = time.time()
+        if not force and now - self._last_sync < RATE_LIMIT_SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        try:
+            remote = self.store.get(STATE_KEY) or {}
+            with self._lock:
+                for scope, until in remote.items():
+                    if until > self._cooldowns.get(scope, 0.0):
+                        self._cooldowns[scope] = until
+                # Los enfriamientos vencidos no se vuelven a publicar
+                self._cooldowns = {scope: until for scope, until in self._cooldowns.items() if until > now}
+                merged = dict(self._cooldowns)
+            if merged != remote:
+                self.store.put(STATE_KEY, merged)
+        except Exception as e:
+            # El estado compartido es una optimización: nunca debe romper el turno
+            logger.warning(f"No se pudo sincronizar los límites de uso: {str(e)}")
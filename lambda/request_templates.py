@@ -0,0 +1,61 @@
+# request_templates.py
+# Plantillas de petición precompiladas por proveedor. Al arrancar el contenedor se codifican una
+# sola vez los campos fijos del payload (modelo, límites, parámetros de muestreo, stream) y el
+# mensaje del sistema; en cada turno solo se codifica el historial y se empalma entre ambos.
+# La codificación usa orjson si JSON_ENCODER = "orjson" y está instalado, si no json estándar.
+
+import json
+import logging
+from collections import namedtuple
+
+from config import JSON_ENCODER
+
+logger = logging.getLogger(__name__)
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _load_encoder(name):
+    """Devuelve una función objeto -> bytes (JSON compacto en UTF-8)"""
+    if name == "orjson":
+        try:
+            import orjson  # dependencia opcional
+            return orjson.dumps
+        except ImportError:
+            logger.warning("JSON_ENCODER = 'orjson' requiere orjson; se usa json estándar")
+    return _json_dumps
+
+
+encode_json = _load_encoder(JSON_ENCODER)
+
+# Petición lista para enviar: URL, cuerpo codificado, si se pide en streaming, extractor de los
+# eventos SSE y procesador de la respuesta completa. Es independiente del cliente HTTP.
+PreparedRequest = namedtuple("PreparedRequest", ["url", "body", "stream", "extract_delta", "process"])
+
+
+class RequestTemplate:
+    """
+    Payload de un proveedor con todo lo fijo ya codificado:
+    head = '{<campos fijos>,"messages":[<mensaje del sistema>' y en cada turno se añade
+    ',<historial>]}'. El historial no incluye el mensaje del sistema.
+    """
+
+    __slots__ = ("provider", "stream", "head", "encode")
+
+    def __init__(self, provider, static_fields, messages_key, system_message=None, stream=False, encode=None):
+        self.provider = provider
+        self.stream = stream
+        self.encode = encode or encode_json
+        fields = self.encode(static_fields)
+        # Se abre la lista de mensajes al final del objeto de campos fijos
+        head = fields[:-1] + (b"," if len(fields) > 2 else b"") + self.encode(messages_key) + b":["
+        if system_message is not None:
+            head += self.encode(system_message) + b","
+        self.head = head
+
+    def render(self, messages):
+        """Cuerpo de la petición (bytes) para el historial dado; messages no puede estar vacío"""
+        # encode(messages) es '[...]': se quita el corchete de apertura y se cierra el objeto
+        return self.head + self.encode(messages)[1:] + b"}"
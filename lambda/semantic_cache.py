@@ -0,0 +1,157 @@
+# semantic_cache.py
+# Caché semántica local para paráfrasis: "¿qué es la fotosíntesis?" y "explícame la fotosíntesis"
+# comparten respuesta. Cada pregunta normalizada se convierte en un vector de n-gramas de
+# caracteres con hashing (sin vocabulario, sin red ni GPU) y se busca el vecino más cercano por
+# similitud coseno con fuerza bruta sobre una matriz NumPy de tamaño fijo. Los números de la
+# pregunta deben coincidir exactamente: "¿cuánto es 2 más 2?" y "¿cuánto es 2 más 3?" se parecen
+# mucho en n-gramas pero no tienen la misma respuesta.
+
+import logging
+import math
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from answer_cache import normalize_query
+from config import SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_DIM, SEMANTIC_CACHE_THRESHOLD, ANSWER_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZES = (3, 4)
+
+_NUMBER = re.compile(r"\d+")
+
+
+def numbers_in(text):
+    """Números de una pregunta normalizada, en orden; dos preguntas solo comparten respuesta si coinciden"""
+    return tuple(_NUMBER.findall(text))
+
+
+def _features(text):
+    """n-gramas de caracteres (con bordes de palabra) más las palabras completas"""
+    counts = {}
+    padded = f" {text} "
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            gram = padded[i:i + n]
+            counts[gram] = counts.get(gram, 0) + 1
+    for word in text.split():
+        key = "w:" + word
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def vectorize(text, dim=SEMANTIC_CACHE_DIM):
+    """Vector L2-normalizado con hashing de características y signo para compensar colisiones"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, count in _features(text).items():
+        h = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if h & 0x80000000 else -1.0
+        vector[h % dim] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+class SemanticCache:
+    """Vecino más cercano por coseno sobre una matriz preasignada, con caducidad y expulsión LRU"""
+
+    def __init__(self, max_entries=SEMANTIC_CACHE_MAX_ENTRIES, dim=SEMANTIC_CACHE_DIM,
+                 threshold=SEMANTIC_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL):
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Memoria acotada desde el inicio: max_entries x dim float32
+        self.vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self.expires_at = np.zeros(max_entries, dtype=np.float64)
+        self.last_used = np.zeros(max_entries, dtype=np.float64)
+        self.answers = [None] * max_entries
+        self.numbers = [()] * max_entries
+        self.size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def nearest(self, vector):
+        """Índice y similitud de la entrada más parecida (fuerza bruta: un producto matriz-vector)"""
+        if self.size == 0:
+            return None, 0.0
+        similarities = self.vectors[:self.size] @ vector
+        index = int(np.argmax(similarities))
+        return index, float(similarities[index])
+
+    def best_match(self, vector, numbers, now):
+        """
+        Índice y similitud de la entrada vigente más parecida por encima del umbral y con los mismos
+        números, o (None, 0.0). Las caducadas se descartan antes de elegir (y quedan como primeras
+        candidatas a expulsión).
+        """
+        if self.size == 0:
+            return None, 0.0
+        similarities = self.vectors[:self.size] @ vector
+        expired = self.expires_at[:self.size] <= now
+        self.last_used[:self.size][expired] = 0.0
+        similarities[expired] = -1.0
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        for index in candidates[np.argsort(-similarities[candidates])]:
+            if self.numbers[index] == numbers:
+                return int(index), float(similarities[index])
+        return None, 0.0
+
+    def get(self, question):
+        """Respuesta de una pregunta suficientemente parecida, o None"""
+        normalized = normalize_query(question)
+        if normalized is None:
+            return None
+        vector = vectorize(normalized, self.dim)
+        now = time.time()
+        with self._lock:
+            index, similarity = self.best_match(vector, numbers_in(normalized), now)
+            if index is None:
+                self.misses += 1
+                return None
+            self.last_used[index] = now
+            self.hits += 1
+            logger.info(f"Acierto de caché semántica: similitud={similarity:.3f}")
+            return self.answers[index]
+
+    def put(self, question, answer):
+        normalized = normalize_query(question)
+        if normalized is None or not answer:
+            return
+        self.add_vector(vectorize(normalized, self.dim), answer, numbers_in(normalized))
+
+    def add_vector(self, vector, answer, numbers=()):
+        now = time.time()
+        with self._lock:
+            index, similarity = self.nearest(vector)
+            if index is None or similarity < 0.999 or self.numbers[index] != numbers:
+                if self.size < self.max_entries:
+                    index = self.size
+                    self.size += 1
+                else:
+                    index = int(np.argmin(self.last_used[:self.size]))
+                    self.evictions += 1
+            # Si la pregunta ya existía se actualiza su respuesta en el mismo sitio
+            self.vectors[index] = vector
+            self.answers[index] = answer
+            self.numbers[index] = numbers
+            self.expires_at[index] = now + self.ttl
+            self.last_used[index] = now
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": self.size,
+            "evictions": self.evictions,
+            "memory_kb": round(self.vectors.nbytes / 1024),
+        }
@@ -0,0 +1,75 @@
+# session_codec.py
+# Codificación compacta del estado de la conversación en los atributos de sesión de Alexa.
+# El historial, el proveedor actual, los proveedores fallidos y el resumen viajan en cada
+# petición y respuesta; en lugar de JSON plano se envían como un único texto versionado
+# "<versión>.<base64(zlib(JSON compacto))>" en el atributo STATE_KEY. Solo los handlers que
+# usan el estado lo decodifican (load_session); los demás devuelven el blob tal cual.
+
+import base64
+import json
+import logging
+import zlib
+
+from config import SESSION_CODEC, SESSION_COMPRESSION_LEVEL
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "state"
+CODEC_VERSION = "1"
+# Atributo de sesión -> clave corta dentro del blob
+PACKED_FIELDS = {
+    "chat_history": "h",
+    "current_provider": "p",
+    "failed_providers": "f",
+    "conversation_summary": "s",
+}
+_LOADED = "session_state_loaded"
+
+
+def encode_state(state, level=SESSION_COMPRESSION_LEVEL):
+    """Empaqueta los campos de PACKED_FIELDS presentes en state en un texto versionado"""
+    payload = {short: state[name] for name, short in PACKED_FIELDS.items() if state.get(name) is not None}
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return CODEC_VERSION + "." + base64.b64encode(zlib.compress(raw, level)).decode("ascii")
+
+
+def decode_state(blob):
+    """Devuelve los campos empaquetados en blob; un blob ilegible o de otra versión se descarta"""
+    version, _, data = blob.partition(".")
+    if version != CODEC_VERSION:
+        logger.warning(f"Versión de estado de sesión desconocida: {version!r}; se descarta")
+        return {}
+    try:
+        payload = json.loads(zlib.decompress(base64.b64decode(data)))
+    except (ValueError, zlib.error) as e:
+        logger.warning(f"Estado de sesión ilegible, se descarta: {str(e)}")
+        return {}
+    return {name: payload[short] for name, short in PACKED_FIELDS.items() if short in payload}
+
+
+def load_session(handler_input):
+    """
+    Atributos de sesión con el estado de la conversación ya decodificado. Solo decodifica la
+    primera vez en cada petición; los atributos en JSON plano (sesiones anteriores al códec o
+    SESSION_CODEC = "json") tienen prioridad sobre el blob.
+    """
+    attributes_manager = handler_input.attributes_manager
+    session_attr = attributes_manager.session_attributes
+    if not attributes_manager.request_attributes.get(_LOADED):
+        blob = session_attr.pop(STATE_KEY, None)
+        if blob:
+            for name, value in decode_state(blob).items():
+                session_attr.setdefault(name, value)
+        attributes_manager.request_attributes[_LOADED] = True
+    return session_attr
+
+
+def store_session(handler_input):
+    """Vuelve a empaquetar el estado antes de enviar la respuesta, si algún handler lo cargó"""
+    attributes_manager = handler_input.attributes_manager
+    if SESSION_CODEC != "zlib" or not attributes_manager.request_attributes.get(_LOADED):
+        return
+    session_attr = attributes_manager.session_attributes
+    state = {name: session_attr.pop(name) for name in PACKED_FIELDS if name in session_attr}
+    if state:
+        session_attr[STATE_KEY] = encode_state(state)
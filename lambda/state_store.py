@@ -0,0 +1,98 @@
+# state_store.py
+# Almacenamiento clave -> documento JSON para compartir estado entre contenedores "warm"
+# (salud de proveedores, límites de uso, etc.). Todos los backends exponen get/put.
+
+import json
+import logging
+import os
+import threading
+
+from config import SHARED_STATE_BACKEND, SHARED_STATE_PATH, SHARED_STATE_TABLE
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryStateStore:
+    """Backend en memoria: el estado solo vive dentro del contenedor actual (útil en pruebas)"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            return json.loads(value) if value is not None else None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = json.dumps(value)
+
+
+class FileStateStore:
+    """Backend en un archivo JSON local (o un volumen EFS montado compartido entre contenedores)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read_all(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer el estado compartido en {self.path}: {str(e)}")
+            return {}
+
+    def get(self, key):
+        with self._lock:
+            return self._read_all().get(key)
+
+    def put(self, key, value):
+        import tempfile  # Solo lo necesita este backend; evita su costo en el arranque en frío
+
+        with self._lock:
+            data = self._read_all()
+            data[key] = value
+            directory = os.path.dirname(os.path.abspath(self.path))
+            # Escritura atómica: nunca dejar un archivo a medio escribir para otro lector
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".state-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+
+class DynamoDBStateStore:
+    """
+    Backend sobre una tabla tipo DynamoDB con clave de partición "pk". Acepta cualquier objeto con
+    la interfaz get_item/put_item de boto3 (Table), lo que permite usar un sustituto local en pruebas.
+    """
+
+    def __init__(self, table=None, table_name=SHARED_STATE_TABLE):
+        if table is None:
+            import boto3  # Solo se importa si realmente se usa este backend
+            table = boto3.resource("dynamodb").Table(table_name)
+        self.table = table
+
+    def get(self, key):
+        item = self.table.get_item(Key={"pk": key}).get("Item")
+        return json.loads(item["data"]) if item else None
+
+    def put(self, key, value):
+        self.table.put_item(Item={"pk": key, "data": json.dumps(value)})
+
+
+def create_state_store(backend=SHARED_STATE_BACKEND):
+    """
+    Crea el backend configurado en SHARED_STATE_BACKEND ("memory", "file" o "dynamodb").
+    Devuelve None si no hay backend compartido configurado.
+    """
+    if backend == "memory":
+        return InMemoryStateStore()
+    if backend == "file":
+        return FileStateStore(SHARED_STATE_PATH)
+    if backend == "dynamodb":
+        return DynamoDBStateStore()
+    return None
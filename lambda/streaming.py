@@ -0,0 +1,208 @@
+# streaming.py
+# Lectura incremental de respuestas en streaming (Server-Sent Events) de los proveedores.
+# Soporta el formato OpenAI-compatible de /chat/completions ("data: {...choices[0].delta...}")
+# y el de Gemini streamGenerateContent?alt=sse ("data: {...candidates[0].content.parts...}").
+
+import json
+import re
+import time
+
+_THINK_BLOCK = re.compile(r'<think>[\s\S]*?</think>', re.IGNORECASE)
+_THINK_OPEN = re.compile(r'<think>', re.IGNORECASE)
+_THINK_CLOSE = re.compile(r'</think>', re.IGNORECASE)
+
+
+class SSEParser:
+    """Parser incremental de SSE: recibe bytes en trozos arbitrarios y devuelve los campos data completos"""
+
+    def __init__(self):
+        self._buffer = b""
+        self._data_lines = []
+
+    def feed(self, chunk):
+        """Añade bytes y devuelve la lista de eventos (texto de data) que quedaron completos"""
+        self._buffer += chunk
+        events = []
+        while True:
+            newline = self._buffer.find(b"\n")
+            if newline < 0:
+                break
+            line = self._buffer[:newline].rstrip(b"\r")
+            self._buffer = self._buffer[newline + 1:]
+            if not line:
+                # Línea vacía: fin del evento
+                if self._data_lines:
+                    events.append("\n".join(self._data_lines))
+                    self._data_lines = []
+            elif line.startswith(b"data:"):
+                value = line[5:]
+                if value.startswith(b" "):
+                    value = value[1:]
+                self._data_lines.append(value.decode("utf-8", errors="replace"))
+            # Se ignoran comentarios (":"), "event:", "id:" y "retry:"
+        return events
+
+    def flush(self):
+        """Devuelve el último evento si el servidor cerró sin la línea vacía final"""
+        if self._buffer.strip().startswith(b"data:"):
+            self.feed(b"\n")
+        events = ["\n".join(self._data_lines)] if self._data_lines else []
+        self._data_lines = []
+        return events
+
+
+def openai_delta(payload):
+    """Extrae (texto, error, fin) de un evento de /chat/completions en streaming"""
+    if payload == "[DONE]":
+        return "", None, True
+    data = json.loads(payload)
+    if "error" in data:
+        return "", data["error"].get("message", "Error en el stream"), True
+    choices = data.get("choices") or []
+    if not choices:
+        return "", None, False
+    delta = choices[0].get("delta") or {}
+    return delta.get("content") or "", None, choices[0].get("finish_reason") is not None
+
+
+def gemini_delta(payload):
+    """Extrae (texto, error, fin) de un evento de Gemini streamGenerateContent"""
+    data = json.loads(payload)
+    if "error" in data:
+        return "", data["error"].get("message", "Error en el stream"), True
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return "", None, False
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(p.get("text", "") for p in parts), None, candidates[0].get("finishReason") is not None
+
+
+def speakable_text(text):
+    """Texto que Alexa llegaría a decir: sin bloques <think> cerrados ni uno que siga abierto"""
+    text = _THINK_BLOCK.sub("", text)
+    match = _THINK_OPEN.search(text)
+    if match:
+        text = text[:match.start()]
+    return text
+
+
+class SpeakableFilter:
+    """
+    Versión incremental de speakable_text: recibe el texto del stream por trozos y devuelve solo
+    la parte hablable nueva, guardando una etiqueta <think> o </think> que quede partida entre trozos.
+    """
+
+    def __init__(self):
+        self._thinking = False
+        self._pending = ""
+
+    def feed(self, text):
+        text = self._pending + text
+        self._pending = ""
+        spoken = []
+        while text:
+            match = (_THINK_CLOSE if self._thinking else _THINK_OPEN).search(text)
+            if match:
+                if not self._thinking:
+                    spoken.append(text[:match.start()])
+                self._thinking = not self._thinking
+                text = text[match.end():]
+                continue
+            tag = "</think>" if self._thinking else "<think>"
+            start = text.rfind("<", max(0, len(text) - len(tag) + 1))
+            if start < 0 or not tag.startswith(text[start:].lower()):
+                start = len(text)
+            if not self._thinking:
+                spoken.append(text[:start])
+            self._pending = text[start:]
+            break
+        return "".join(spoken)
+
+
+class StreamReader:
+    """
+    Acumula el texto de un stream SSE a partir de trozos de bytes, sin depender del cliente HTTP
+    (lo usan read_stream con requests y el motor asyncio con su cliente asíncrono).
+    should_stop(texto_nuevo) recibe el texto llegado desde la llamada anterior (sin volver a
+    unir todo lo acumulado) y permite cortar la lectura en cuanto hay suficiente texto hablable.
+    first_token_timeout (s desde started_at) corta el stream si llegan eventos (p. ej. keep-alives)
+    pero no texto; si no llega nada lo corta el timeout de lectura del cliente.
+    """
+
+    def __init__(self, extract_delta, started_at, should_stop=None, first_token_timeout=None):
+        self.extract_delta = extract_delta
+        self.started_at = started_at
+        self.should_stop = should_stop
+        self.first_token_by = started_at + first_token_timeout if first_token_timeout is not None else None
+        self.parser = SSEParser()
+        self.pieces = []
+        self._checked = 0
+        self.result = {"text": "", "error": None, "ttft": None, "duration": None, "chunks": 0,
+                       "tokens_per_second": None, "stopped_early": False, "timed_out": False}
+
+    def _consume(self, payload):
+        try:
+            text, error, done = self.extract_delta(payload)
+        except ValueError:
+            # Evento malformado (p. ej. keep-alive no estándar): se ignora
+            return False
+        if error:
+            self.result["error"] = error
+        if text:
+            if self.result["ttft"] is None:
+                self.result["ttft"] = time.monotonic() - self.started_at
+            self.pieces.append(text)
+            self.result["chunks"] += 1
+        return done
+
+    def feed(self, chunk):
+        """Procesa un trozo del cuerpo; devuelve True si hay que dejar de leer"""
+        for payload in self.parser.feed(chunk):
+            if self._consume(payload):
+                return True
+        if self.result["ttft"] is None and self.first_token_by is not None and time.monotonic() >= self.first_token_by:
+            self.result["error"] = "Tiempo de espera del primer token agotado"
+            self.result["timed_out"] = True
+            return True
+        if self.should_stop and self.pieces:
+            new_text = "".join(self.pieces[self._checked:])
+            self._checked = len(self.pieces)
+            if self.should_stop(new_text):
+                self.result["stopped_early"] = True
+                return True
+        return False
+
+    def flush(self):
+        """El servidor cerró el stream: procesar el último evento incompleto"""
+        for payload in self.parser.flush():
+            self._consume(payload)
+
+    def finish(self):
+        """Devuelve el dict con text, error, ttft, duration, chunks, tokens_per_second, stopped_early y timed_out"""
+        result = self.result
+        result["text"] = "".join(self.pieces)
+        result["duration"] = time.monotonic() - self.started_at
+        if result["ttft"] is not None and result["duration"] > result["ttft"]:
+            # Cada evento suele traer un token: buena aproximación sin tokenizador
+            result["tokens_per_second"] = result["chunks"] / (result["duration"] - result["ttft"])
+        return result
+
+
+def read_stream(response, extract_delta, started_at, should_stop=None, first_token_timeout=None):
+    """
+    Consume un stream SSE de requests acumulando el texto. should_stop(texto_nuevo) permite cortar la
+    lectura (y cerrar la conexión) en cuanto hay suficiente texto hablable y first_token_timeout
+    la corta si el primer token no llega a tiempo.
+    Devuelve un dict con text, error, ttft, duration, chunks, tokens_per_second, stopped_early y timed_out.
+    """
+    reader = StreamReader(extract_delta, started_at, should_stop, first_token_timeout)
+    try:
+        for chunk in response.iter_content(chunk_size=None):
+            if reader.feed(chunk):
+                break
+        else:
+            reader.flush()
+    finally:
+        # Cerrar libera la conexión; si cortamos antes de tiempo, el proveedor deja de generar
+        response.close()
+    return reader.finish()
@@ -0,0 +1,144 @@
+# traffic_recorder.py
+# Grabación de tráfico real para reproducirlo sin conexión (benchmarks/bench_replay.py). Con
+# TRAFFIC_RECORD_PATH configurado se añade al archivo JSONL, por cada invocación, el envelope de
+# Alexa tal como llega (sin identificadores de usuario/dispositivo ni tokens) y, por cada petición
+# a un proveedor, su respuesta: status, cabeceras de rate limit, cuerpo (o texto del stream) y
+# tiempos. Las respuestas se indexan por una huella del último mensaje del usuario, que es lo que
+# el reproductor usa para servirlas aunque se elija otro proveedor.
+# Los atributos de sesión (historial de la conversación) se graban tal cual: son necesarios para
+# reproducir el turno.
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Campos de context.System y session que identifican al usuario o dan acceso a sus datos
+_SECRET_FIELDS = ("apiAccessToken", "accessToken", "consentToken", "permissions", "person")
+_ID_FIELDS = ("userId", "deviceId", "sessionId", "personId")
+_RATE_LIMIT_HEADERS = ("retry-after", "x-ratelimit-")
+
+_recorder = None
+
+
+def _pseudonym(value):
+    """Identificador estable y no reversible, para que las sesiones sigan agrupándose"""
+    return "anon-" + hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def _scrub(node):
+    if isinstance(node, dict):
+        for key in list(node):
+            if key in _SECRET_FIELDS:
+                del node[key]
+            elif key in _ID_FIELDS and isinstance(node[key], str):
+                node[key] = _pseudonym(node[key])
+            elif key != "attributes":
+                _scrub(node[key])
+    elif isinstance(node, list):
+        for item in node:
+            _scrub(item)
+
+
+def sanitize_envelope(event):
+    """Copia del envelope sin tokens ni permisos y con los identificadores seudonimizados"""
+    envelope = copy.deepcopy(event)
+    _scrub(envelope)
+    return envelope
+
+
+def last_user_text(payload):
+    """Texto del último mensaje del usuario de un payload OpenAI-compatible o Gemini"""
+    if payload.get("messages"):
+        return payload["messages"][-1].get("content", "")
+    if payload.get("contents"):
+        return " ".join(part.get("text", "") for part in payload["contents"][-1].get("parts", []))
+    return ""
+
+
+def prompt_key(body):
+    """Huella (crc32) del último mensaje del usuario de un cuerpo de petición en bytes"""
+    try:
+        text = last_user_text(json.loads(body))
+    except ValueError:
+        text = ""
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class TrafficRecorder:
+    """Escribe registros JSONL en un archivo, uno por línea, desde cualquier hilo"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def start_recording(path):
+    """Empieza a grabar en path (se añade al final si ya existe)"""
+    global _recorder
+    if _recorder is None:
+        _recorder = TrafficRecorder(path)
+        logger.info(f"Grabando tráfico en {path}")
+    return _recorder
+
+
+def stop_recording():
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+def is_recording():
+    return _recorder is not None
+
+
+def record_provider(provider_name, request, attempt, status, headers=None, body=None, stream_result=None):
+    """
+    Graba la respuesta de un proveedor a una petición preparada (PreparedRequest): el cuerpo
+    completo o, si fue en streaming, el texto acumulado y el tiempo hasta el primer token.
+    """
+    if _recorder is None:
+        return
+    record = {
+        "type": "provider",
+        "key": prompt_key(request.body),
+        "provider": provider_name,
+        "status": status,
+        "stream": stream_result is not None,
+        "latency": round(time.monotonic() - attempt["started"], 4),
+        "headers": {name.lower(): value for name, value in (headers or {}).items()
+                    if name.lower().startswith(_RATE_LIMIT_HEADERS)},
+    }
+    if stream_result is not None:
+        record["body"] = stream_result["text"]
+        record["ttft"] = round(stream_result["ttft"], 4) if stream_result["ttft"] is not None else None
+    else:
+        record["body"] = body
+    _recorder.write(record)
+
+
+def recording_handler(handler):
+    """Envuelve el lambda_handler del SDK para grabar cada envelope antes de atenderlo"""
+    def lambda_handler(event, context):
+        if _recorder is not None:
+            _recorder.write({"type": "envelope", "recorded_at": round(time.time(), 3),
+                             "envelope": sanitize_envelope(event)})
+        return handler(event, context)
+    return lambda_handler
@@ -0,0 +1,60 @@
+# turn_deadline.py
+# Presupuesto de tiempo de un turno de Alexa. Se crea al llegar el envelope y se pasa por
+# toda la cadena de proveedores para que cada intento use solo el tiempo que queda.
+# También lleva el temporizador de fases de la invocación (profiling.PhaseTimer) a los intentos,
+# que pueden ejecutarse en otros hilos o en el bucle asyncio.
+
+import time
+
+from profiling import NULL_TIMER
+from config import TURN_BUDGET, TURN_RESPONSE_RESERVE, MIN_ATTEMPT_TIME
+
+
+class TurnDeadline:
+    """Plazo absoluto de un turno con registro de las fases en las que se gastó el tiempo"""
+
+    def __init__(self, budget=TURN_BUDGET, reserve=TURN_RESPONSE_RESERVE, min_attempt=MIN_ATTEMPT_TIME, timer=NULL_TIMER):
+        self.started_at = time.monotonic()
+        self.budget = budget
+        self.reserve = reserve
+        self.min_attempt = min_attempt
+        self.phases = []
+        self._last_mark = self.started_at
+        self.timer = timer
+
+    @classmethod
+    def from_lambda_context(cls, context, budget=TURN_BUDGET, timer=NULL_TIMER):
+        """Ajusta el presupuesto al tiempo que le queda a la invocación de Lambda, si es menor"""
+        if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+            budget = min(budget, context.get_remaining_time_in_millis() / 1000.0)
+        return cls(budget=budget, timer=timer)
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def remaining(self):
+        """Segundos utilizables por los proveedores, descontando la reserva para responder"""
+        return max(0.0, self.budget - self.reserve - self.elapsed())
+
+    def can_attempt(self):
+        """Indica si queda tiempo suficiente para lanzar otro proveedor"""
+        return self.remaining() >= self.min_attempt
+
+    def timeout_for(self, provider_timeout):
+        """Timeout a usar en una petición: el del proveedor, recortado al tiempo restante"""
+        return min(provider_timeout, self.remaining())
+
+    def mark(self, phase):
+        """Registra cuánto duró la fase que termina ahora"""
+        now = time.monotonic()
+        self.phases.append((phase, now - self._last_mark))
+        self._last_mark = now
+
+    def record(self, phase, duration):
+        """Registra una fase medida por fuera (p. ej. intentos de proveedores en paralelo)"""
+        self.phases.append((phase, duration))
+
+    def summary(self):
+        """Resumen compacto para logs: total y duración de cada fase en milisegundos"""
+        parts = [f"{phase}={duration * 1000:.0f}ms" for phase, duration in self.phases]
+        return f"total={self.elapsed() * 1000:.0f}ms restante={self.remaining() * 1000:.0f}ms " + " ".join(parts)
@@ -0,0 +1,189 @@
+# user_memory.py
+# Memoria entre sesiones por usuario: el resumen de la conversación, los últimos turnos y el
+# proveedor con el que se habló, guardados con la interfaz de persistencia del ask-sdk
+# (AbstractPersistenceAdapter). Se lee con un único get al abrir la skill y se escribe una sola
+# vez al terminar la sesión, y solo si cambió, para no añadir E/S a cada turno.
+
+import json
+import logging
+import threading
+import time
+import zlib
+
+from ask_sdk_core.attributes_manager import AbstractPersistenceAdapter
+from ask_sdk_core.exceptions import PersistenceException
+
+from config import (USER_MEMORY_BACKEND, USER_MEMORY_SQLITE_PATH, USER_MEMORY_TABLE, USER_MEMORY_TTL_DAYS,
+                    USER_MEMORY_MAX_TURNS)
+
+logger = logging.getLogger(__name__)
+
+# Atributo de sesión con la huella de la memoria leída al abrir la skill
+FINGERPRINT_KEY = "memory_fingerprint"
+
+
+def user_id_keygen(request_envelope):
+    """Clave de partición: el userId de Alexa (cambia si el usuario deshabilita la skill)"""
+    return request_envelope.context.system.user.user_id
+
+
+class SQLitePersistenceAdapter(AbstractPersistenceAdapter):
+    """Backend en un archivo SQLite local; pensado para pruebas y benchmarks"""
+
+    def __init__(self, path=USER_MEMORY_SQLITE_PATH, partition_keygen=user_id_keygen):
+        self.path = path
+        self.partition_keygen = partition_keygen
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            import sqlite3  # Solo se importa si realmente se usa este backend
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS attributes (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        return self._connection
+
+    def get_attributes(self, request_envelope):
+        key = self.partition_keygen(request_envelope)
+        try:
+            with self._lock:
+                row = self._connect().execute("SELECT data FROM attributes WHERE id = ?", (key,)).fetchone()
+        except Exception as e:
+            raise PersistenceException(f"No se pudo leer la memoria de {self.path}: {str(e)}")
+        return json.loads(row[0]) if row else {}
+
+    def save_attributes(self, request_envelope, attributes):
+        key = self.partition_keygen(request_envelope)
+        try:
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute("INSERT OR REPLACE INTO attributes (id, data) VALUES (?, ?)",
+                                       (key, json.dumps(attributes, ensure_ascii=False)))
+        except Exception as e:
+            raise PersistenceException(f"No se pudo guardar la memoria en {self.path}: {str(e)}")
+
+    def delete_attributes(self, request_envelope):
+        key = self.partition_keygen(request_envelope)
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM attributes WHERE id = ?", (key,))
+
+
+class DynamoDBPersistenceAdapter(AbstractPersistenceAdapter):
+    """
+    Backend sobre una tabla tipo DynamoDB con clave de partición "id". Igual que en state_store,
+    acepta cualquier objeto con la interfaz get_item/put_item/delete_item de boto3 (Table).
+    """
+
+    def __init__(self, table=None, table_name=USER_MEMORY_TABLE, partition_keygen=user_id_keygen):
+        if table is None:
+            import boto3  # Solo se importa si realmente se usa este backend
+            table = boto3.resource("dynamodb").Table(table_name)
+        self.table = table
+        self.partition_keygen = partition_keygen
+
+    def get_attributes(self, request_envelope):
+        try:
+            item = self.table.get_item(Key={"id": self.partition_keygen(request_envelope)}).get("Item")
+        except Exception as e:
+            raise PersistenceException(f"No se pudo leer la memoria de DynamoDB: {str(e)}")
+        return json.loads(item["data"]) if item else {}
+
+    def save_attributes(self, request_envelope, attributes):
+        try:
+            self.table.put_item(Item={"id": self.partition_keygen(request_envelope),
+                                      "data": json.dumps(attributes, ensure_ascii=False)})
+        except Exception as e:
+            raise PersistenceException(f"No se pudo guardar la memoria en DynamoDB: {str(e)}")
+
+    def delete_attributes(self, request_envelope):
+        self.table.delete_item(Key={"id": self.partition_keygen(request_envelope)})
+
+
+def create_persistence_adapter(backend=USER_MEMORY_BACKEND):
+    """
+    Crea el backend configurado en USER_MEMORY_BACKEND ("sqlite" o "dynamodb").
+    Devuelve None si la memoria entre sesiones está desactivada.
+    """
+    if backend == "sqlite":
+        return SQLitePersistenceAdapter()
+    if backend == "dynamodb":
+        return DynamoDBPersistenceAdapter()
+    return None
+
+
+def memory_fingerprint(memory):
+    """Huella del contenido de la memoria (sin la fecha) para saber si hace falta escribirla"""
+    content = {k: v for k, v in memory.items() if k != "updated_at"}
+    return zlib.crc32(json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+
+
+def memory_from_session(session_attr, max_turns=USER_MEMORY_MAX_TURNS):
+    """Lo que se recuerda de una sesión: resumen, últimos turnos y proveedor"""
+    memory = {}
+    if session_attr.get("conversation_summary"):
+        memory["summary"] = session_attr["conversation_summary"]
+    recent = [list(turn) for turn in session_attr.get("chat_history", [])[-max_turns:]] if max_turns else []
+    if recent:
+        memory["recent"] = recent
+    if session_attr.get("current_provider"):
+        memory["provider"] = session_attr["current_provider"]
+    return memory
+
+
+def restore_memory(memory, ttl_days=USER_MEMORY_TTL_DAYS, now=None):
+    """Campos de sesión a partir de la memoria guardada; vacío si no hay memoria o caducó"""
+    if not memory:
+        return {}
+    now = time.time() if now is None else now
+    if now - memory.get("updated_at", 0) > ttl_days * 86400:
+        return {}
+    restored = {}
+    if memory.get("summary"):
+        restored["conversation_summary"] = memory["summary"]
+    if memory.get("recent"):
+        restored["chat_history"] = memory["recent"]
+    if memory.get("provider"):
+        restored["current_provider"] = memory["provider"]
+    return restored
+
+
+def load_user_memory(handler_input):
+    """
+    Lee la memoria del usuario (un único get) y anota su huella en la sesión. Si no hay backend
+    configurado o falla la lectura, devuelve {} y la sesión empieza de cero.
+    """
+    if USER_MEMORY_BACKEND is None:
+        return {}
+    attributes_manager = handler_input.attributes_manager
+    try:
+        memory = attributes_manager.persistent_attributes
+    except Exception as e:
+        logger.warning(f"No se pudo leer la memoria del usuario: {str(e)}")
+        return {}
+    attributes_manager.session_attributes[FINGERPRINT_KEY] = memory_fingerprint(memory)
+    return memory
+
+
+def save_user_memory(handler_input, session_attr):
+    """
+    Guarda la memoria al terminar la sesión, en una sola escritura y solo si cambió respecto a la
+    leída al abrir la skill. Devuelve True si se escribió.
+    """
+    if USER_MEMORY_BACKEND is None:
+        return False
+    memory = memory_from_session(session_attr)
+    if not memory or memory_fingerprint(memory) == session_attr.get(FINGERPRINT_KEY):
+        return False
+    memory["updated_at"] = int(time.time())
+    attributes_manager = handler_input.attributes_manager
+    try:
+        # Asignar sin leer: no hace falta otro get para sobrescribir la memoria completa
+        attributes_manager.persistent_attributes = memory
+        attributes_manager.save_persistent_attributes()
+    except Exception as e:
+        logger.warning(f"No se pudo guardar la memoria del usuario: {str(e)}")
+        return False
+    return True